@@ -0,0 +1,191 @@
+"""Per-legislator sponsorship aggregates, maintained one bill record at a time.
+
+Only additive counts are kept (bills sponsored, enacted, and the same per
+subject), and each bill's contribution is remembered in compact form, so a bill
+whose status changed can be subtracted and re-added without touching the rest.
+Rates are derived when the tables are written out.
+
+That compact row, title included, is kept for every bill, so the state grows
+with the Congress: 5.7 MB pickled for 13.5k synthetic bills, half of it titles.
+Parsing itself still holds one file at a time.
+
+Legislators are counted per bill they appear on and dropped when the last one
+goes. Their details come from the most recently updated bill status record.
+"""
+import os
+import pickle
+from collections import Counter, defaultdict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+REPS_COLUMNS = ['bioguide_id', 'name', 'gender', 'type', 'state', 'district', 'party', 'start', 'end',
+                'days_in_office']
+PARTIES = {'D': 'Democrat', 'R': 'Republican', 'I': 'Independent', 'ID': 'Independent', 'L': 'Libertarian'}
+STATE_VERSION = 2
+
+# what one bill contributes, kept so it can be taken back out
+BillRow = namedtuple('BillRow', ['bill_type', 'subject', 'title', 'sponsors', 'cosponsors', 'enacted'])
+
+
+class SponsorshipAggregates(object):
+
+    def __init__(self):
+        self.legislators = {}
+        # bioguide_id -> updateDate of the record their details came from
+        self.details_updated = {}
+        # bioguide_id -> how many bills they sponsor or cosponsor
+        self.appearances = Counter()
+        self.bills = {}
+        self.sponsored = Counter()
+        self.enacted = Counter()
+        # (bioguide_id, subject) -> count
+        self.subj_sponsored = Counter()
+        self.subj_enacted = Counter()
+        # bioguide_id -> {bill_id: None}, an insertion-ordered set
+        self.cosponsored = defaultdict(dict)
+
+    def add_legislator(self, info, updated=''):
+        # the newest record wins (a party switch, a new district); on a tie, the one applied last.
+        # sponsor and cosponsor entries carry the same fields
+        leg_id = info.get('bioguide_id')
+        if leg_id and updated >= self.details_updated.get(leg_id, ''):
+            self.legislators[leg_id] = info
+            self.details_updated[leg_id] = updated
+
+    def add_bill(self, record):
+        """Add a parsed bill record, replacing any earlier version of the same bill."""
+        self.remove_bill(record['bill_id'])
+        for info in record['sponsors'] + record['cosponsors']:
+            self.add_legislator(info, record.get('updated', ''))
+        row = BillRow(record['bill_type'], record['subjects_top_term'], record['title'],
+                      tuple(s['bioguide_id'] for s in record['sponsors']),
+                      tuple(c['bioguide_id'] for c in record['cosponsors']), record['enacted_as'])
+        self._apply(record['bill_id'], row, 1)
+        self.bills[record['bill_id']] = row
+
+    def remove_bill(self, bill_id):
+        row = self.bills.pop(bill_id, None)
+        if row is not None:
+            self._apply(bill_id, row, -1)
+        return row
+
+    def _apply(self, bill_id, row, sign):
+        for leg_id in set(row.sponsors + row.cosponsors):
+            if not leg_id:
+                continue
+            self.appearances[leg_id] += sign
+            if self.appearances[leg_id] == 0:
+                # on no bill any more, so not in the tables either
+                del self.appearances[leg_id], self.legislators[leg_id], self.details_updated[leg_id]
+        for leg_id in row.sponsors:
+            self.sponsored[leg_id] += sign
+            self.enacted[leg_id] += sign * row.enacted
+            if self.sponsored[leg_id] == 0:
+                del self.sponsored[leg_id], self.enacted[leg_id]
+            if row.subject:
+                self.subj_sponsored[leg_id, row.subject] += sign
+                self.subj_enacted[leg_id, row.subject] += sign * row.enacted
+                if self.subj_sponsored[leg_id, row.subject] == 0:
+                    del self.subj_sponsored[leg_id, row.subject], self.subj_enacted[leg_id, row.subject]
+        for leg_id in row.cosponsors:
+            if sign > 0:
+                self.cosponsored[leg_id][bill_id] = None
+            else:
+                self.cosponsored[leg_id].pop(bill_id, None)
+                if not self.cosponsored[leg_id]:
+                    del self.cosponsored[leg_id]
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((STATE_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            version, state = pickle.load(f)
+        if version != STATE_VERSION:
+            raise ValueError(f'{path} is aggregate state version {version}, expected {STATE_VERSION}; '
+                             'rerun the ingest with --full')
+        aggregates = cls()
+        aggregates.__dict__.update(state)
+        return aggregates
+
+    def bills_frame(self):
+        rows = [(bill_id, row.bill_type, row.subject, str(list(row.cosponsors)), len(row.cosponsors),
+                 len(row.cosponsors) + 1, row.enacted) for bill_id, row in self.bills.items()]
+        return pd.DataFrame(rows, columns=['bill_id', 'bill_type', 'subjects_top_term', 'cosponsors',
+                                           'num_cosponsors', 'num_support', 'enacted_as'])
+
+    def titles_frame(self):
+        return pd.DataFrame([(bill_id, row.title, row.enacted) for bill_id, row in self.bills.items()],
+                            columns=['bill_id', 'titles_text', 'enacted_as'])
+
+    def reps_frame(self, known_reps=None):
+        """all_congress_reps rows for everyone seen on a bill; known_reps fills in (and wins over) their details."""
+        rows = []
+        for leg_id, info in self.legislators.items():
+            rows.append({
+                'bioguide_id': leg_id,
+                'name': info.get('name', ''),
+                'gender': '',
+                'type': info.get('type', ''),
+                'state': info.get('state', ''),
+                'district': info.get('district') or '-',
+                'party': PARTIES.get(info.get('party', ''), info.get('party', '')),
+                'start': '',
+                'end': '',
+                'days_in_office': '',
+            })
+        reps = pd.DataFrame(rows, columns=REPS_COLUMNS)
+        if known_reps is not None and len(known_reps):
+            known = known_reps[REPS_COLUMNS].set_index('bioguide_id')
+            reps = reps.set_index('bioguide_id')
+            known = known[known.index.isin(reps.index)]
+            reps = known.combine_first(reps).reset_index()[REPS_COLUMNS]
+        # senators first, then by state and name, like the original export
+        reps['_sen'] = reps['type'] != 'sen'
+        return reps.sort_values(['_sen', 'state', 'name']).drop(columns='_sen').reset_index(drop=True)
+
+    def overall_frame(self, reps):
+        overall = _with_integer_days(reps)
+        ids = overall['bioguide_id']
+        overall['overall_bills_sponsored'] = [self.sponsored[i] for i in ids]
+        enacted = np.array([self.enacted[i] for i in ids], dtype=float)
+        sponsored = overall['overall_bills_sponsored'].values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overall['overall_pass_rate'] = np.where(sponsored > 0, enacted / sponsored, np.nan)
+        return overall
+
+    def by_subject_frame(self, reps):
+        by_leg = defaultdict(list)
+        for (leg_id, subject), count in self.subj_sponsored.items():
+            by_leg[leg_id].append((subject, float(count), self.subj_enacted[leg_id, subject] / count))
+        base = _with_integer_days(reps)
+        rows = []
+        for leg in base.itertuples(index=False, name=None):
+            subjects = sorted(by_leg.get(leg[0], []))
+            if not subjects:
+                rows.append(leg + ('not applicable', 'not applicable', 'not applicable'))
+            for subject in subjects:
+                rows.append(leg + subject)
+        return pd.DataFrame(rows, columns=list(base.columns) + [
+            'subjects_top_term', 'by_subj_bills_sponsored', 'by_subj_pass_rate'])
+
+    def cosponsorship_frame(self):
+        ids = sorted(i for i, bills in self.cosponsored.items() if bills)
+        return pd.DataFrame({
+            'cosponsors': ids,
+            'bills': [str(sorted(self.cosponsored[i])) for i in ids],
+            'num_bills_cosponsored': [len(self.cosponsored[i]) for i in ids],
+        })
+
+
+def _with_integer_days(reps):
+    # all_congress_reps keeps days_in_office as a timedelta string; the aggregate tables use whole days
+    out = reps.copy()
+    days = pd.to_timedelta(out['days_in_office'].replace('', np.nan), errors='coerce')
+    out['days_in_office'] = days.dt.days.fillna(0).astype(int)
+    return out
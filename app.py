@@ -1,16 +1,31 @@
 import dash
+import flask
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+import plotly
 import plotly.graph_objs as go
 
+import csv
+import glob
+import io
+import json
 import os
+import threading
 port = int(os.environ.get('PORT', 5000))
 
-import pandas as pd
 import numpy as np
-import sklearn
-import joblib
+
+import batch_predict
+import export
+from caching import LRUCache, SharedCache, TieredCache, code_version
+import leaderboards
+from congress_data import DEFAULT_BUDGET_MB, LEGACY_CONGRESS, PartitionCache, available_congresses, congress_label
+from instrumentation import instrument
+from legislator_store import CHAMBER_TYPES
+from bill_model import BillModel
+from title_model import normalize_title
 
 ########### Define your variables
 tabtitle='US Congress Deep Dive'
@@ -44,14 +59,21 @@ index_layout = html.Div(children=[
 
 # PAGE ONE
 
-congress_reps_df = pd.read_csv('./assets/data/all_congress_reps.csv')
-overall_sponsorship_df = pd.read_csv('./assets/data/overall_sponsorship_aggs.csv')
-spons_by_subj_df = pd.read_csv('./assets/data/sponsorship_by_subj_agg.csv')
-cosponsorship_info = pd.read_csv('./assets/data/cosponsorship_summary_info.csv')
-bill_summary_info = pd.read_csv('./assets/data/bills_and_passage_subject_and_type.csv')
-
-def get_summary(bioguide_id):
-    leg_vals = overall_sponsorship_df.loc[overall_sponsorship_df['bioguide_id'] == bioguide_id].values[0]
+# each Congress's tables are loaded the first time someone picks it, and the least
+# recently used ones are dropped once they add up to more than CONGRESS_CACHE_MB
+congress_data = PartitionCache(budget_bytes=int(os.environ.get('CONGRESS_CACHE_MB', DEFAULT_BUDGET_MB)) * 2 ** 20)
+available_congress_nums = available_congresses()
+default_congress = congress_data.get(LEGACY_CONGRESS)
+
+def get_congress(congress_num):
+    # a stale page or a hand-made request can name a Congress with no data; leave the page as it is
+    try:
+        return congress_data.get(congress_num)
+    except KeyError:
+        raise PreventUpdate
+
+def get_summary(congress, bioguide_id):
+    leg_vals = congress.store.summary(bioguide_id)
     if leg_vals[3] == 'rep':
         if leg_vals[5] == '0':
             line1 = 'Representative ' + leg_vals[1] + ', ' + leg_vals[6] + ' from ' + leg_vals[4] + ' (at-large district)'
@@ -60,7 +82,13 @@ def get_summary(bioguide_id):
     else:
         line1 = 'Senator ' + leg_vals[1] + ', ' + leg_vals[6] + ' from ' + leg_vals[4]
 
-    line2 = '    - ' + 'started term on ' + leg_vals[7] + ', ended term on ' + leg_vals[8] + f' (in office for {leg_vals[9]} days)'
+    # an ingested Congress without --legislators has no term dates, and 0 for days in office
+    if isinstance(leg_vals[7], str) and isinstance(leg_vals[8], str):
+        line2 = '    - ' + 'started term on ' + leg_vals[7] + ', ended term on ' + leg_vals[8]
+    else:
+        line2 = '    - ' + 'term dates unknown'
+    if leg_vals[9]:
+        line2 += f' (in office for {leg_vals[9]} days)'
     if leg_vals[10] == 0:
         line3 = '    - ' + 'sponsored ' + str(leg_vals[10]) + ' bills'
     elif leg_vals[10] == 1:
@@ -69,24 +97,112 @@ def get_summary(bioguide_id):
         line3 = '    - ' + 'sponsored ' + str(leg_vals[10]) + ' bills with an overall rate of passage of ' + str(np.round(leg_vals[11], 3))
     return [line1, line2, line3]
 
-def fix_string_list(cell):
-    real = []
-    for b in cell.split():
-        real.append(b.replace('[', '').replace(']', '').replace('\'', '').replace(',', ''))
-    return real
-
-def get_cosponsorship_summary(leg_id):
-    cospon_summary = []
-    leg = cosponsorship_info.loc[cosponsorship_info['cosponsors'] == leg_id]
-    leg_cospons = fix_string_list(leg['bills'].values[0])
-    leg_bills = bill_summary_info.loc[bill_summary_info['bill_id'].isin(leg_cospons)]
-    cospon_summary.append(f"    - cosponsored {leg['num_bills_cosponsored'].values[0]} bills with an overall rate of passage of {np.round(leg_bills['enacted_as'].mean(), 3)}")
-    leg_agg = leg_bills.groupby('subjects_top_term').agg(num_bills=('bill_id', 'size'), pass_rate=('enacted_as', 'mean')).reset_index()
-    for subj in leg_agg.values:
-        line = f'        - {subj[1]} {subj[0]} bills with a rate of passage of {subj[2]}'
-        cospon_summary.append(line)
+def get_cosponsorship_summary(congress, leg_id):
+    rows = congress.cosponsors.bills_cosponsored_by(leg_id)
+    if len(rows) == 0:
+        return ['    - cosponsored 0 bills']
+    bill_subjects = congress.bill_subjects
+    enacted = congress.bill_enacted[rows]
+    cospon_summary = [f"    - cosponsored {len(rows)} bills with an overall rate of passage of {np.round(enacted.mean(), 3)}"]
+
+    # bills with no top subject have code -1 and are left out of the breakdown, like the old groupby
+    codes = congress.bill_subject_codes[rows]
+    has_subj = codes >= 0
+    num_bills = np.bincount(codes[has_subj], minlength=len(bill_subjects))
+    num_passed = np.bincount(codes[has_subj], weights=enacted[has_subj], minlength=len(bill_subjects))
+    for i in np.flatnonzero(num_bills):
+        cospon_summary.append(f'        - {num_bills[i]} {bill_subjects[i]} bills with a rate of passage of {np.round(num_passed[i] / num_bills[i], 3)}')
     return cospon_summary
 
+def get_short_label(congress, bioguide_id):
+    # e.g. Senator Orrin Hatch (R) - UT, Representative Nancy Pelosi (D) - CA-12
+    leg_vals = congress.store.summary(bioguide_id)
+    if leg_vals[3] == 'rep':
+        district = leg_vals[4] if leg_vals[5] == '0' else leg_vals[4] + '-' + leg_vals[5]
+        return f'Representative {leg_vals[1]} ({leg_vals[6][0]}) - {district}'
+    return f'Senator {leg_vals[1]} ({leg_vals[6][0]}) - {leg_vals[4]}'
+
+def get_similar_legs(congress, leg_id, knn_num):
+    # built offline by `python similarity.py neighbours`; the index is the fallback
+    if congress.neighbour_table is not None and leg_id in congress.neighbour_table:
+        neighbours = congress.neighbour_table.lookup(leg_id, knn_num)
+    # nobody is similar to a legislator who never cosponsored anything
+    elif len(congress.cosponsors.bills_cosponsored_by(leg_id)) == 0 or leg_id not in congress.similarity_index:
+        return []
+    else:
+        neighbours = congress.similarity_index.query(leg_id, knn_num)
+    return [(get_short_label(congress, i), score) for i, score in neighbours if i in congress.store]
+
+def make_deep_dive_figure(congress, leg_id, subj):
+    if leg_id not in congress.store:
+        return {'data': [], 'layout': go.Layout(title='No Sponsored Bills')}
+    breakdown = congress.store.subject_breakdown(leg_id)
+    if not breakdown.subjects:
+        return {'data': [], 'layout': go.Layout(title='No Sponsored Bills')}
+
+    # a subject left over from the previous legislator, or a cleared dropdown, gets their overall chart
+    if subj == 'All' or subj not in breakdown.positions:
+        trace = go.Bar(x=breakdown.subjects, y=breakdown.sponsored,
+                        hovertext=[f'Passage Rate: {round(rate, 3)}' for rate in breakdown.pass_rate], hoverinfo="text",
+                        # marker=dict(color=color.tolist())
+        )
+        layout = go.Layout(title='Bills Sponsored By Subject',
+                            colorway=["#EF963B", "#EF533B"],# hovermode="closest",
+                            xaxis={'title': "Subject", 'titlefont': {'color': 'black', 'size': 14},
+                                   'tickfont': {'size': 9, 'color': 'black'}},
+                            yaxis={'title': "Number of bills", 'titlefont': {'color': 'black', 'size': 14, },
+                                   'tickfont': {'color': 'black'}})
+    else:
+        trace = go.Bar(x=[subj], y=[breakdown.pass_rate[breakdown.positions[subj]]])
+        layout = go.Layout(title=f'Rate of Passage for Sponsored {subj} Bills',
+                            colorway=["#EF963B", "#EF533B"],# hovermode="closest",
+                            xaxis={'title': "Subject", 'titlefont': {'color': 'black', 'size': 14},
+                                   'tickfont': {'size': 12, 'color': 'black'}},
+                            yaxis={'title': "Rate of Passage", 'titlefont': {'color': 'black', 'size': 14, },
+                                   'tickfont': {'color': 'black'}})
+    return {
+        'data':[trace],
+        'layout':layout
+    }
+
+# with SHARED_CACHE_DIR set (somewhere on /dev/shm is best), rendered figures and predictions go in mmap'd
+# tables there too, so whichever gunicorn worker computes one first computes it for all of them
+SHARED_CACHE_DIR = os.environ.get('SHARED_CACHE_DIR')
+# the tables outlive a deploy, so their keys carry a digest of the code (and plotly, which encodes the figures)
+# that filled them; entries from the old code are never hit and age out
+CODE_VERSION = code_version(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')),
+                            extra=(plotly.__version__,))
+
+def shared_cache(name, size_mb, slot_kb):
+    if not SHARED_CACHE_DIR:
+        return None
+    os.makedirs(SHARED_CACHE_DIR, exist_ok=True)
+    return SharedCache(os.path.join(SHARED_CACHE_DIR, name + '.cache'), size_mb=size_mb, slot_kb=slot_kb,
+                       namespace=CODE_VERSION)
+
+# building the plotly objects costs far more than looking up the data, so each (congress, legislator,
+# subject) figure is built once and kept as the plain dict plotly's encoder turns it into; a hit hands that
+# straight to Dash, and only the shared tier stores it as JSON. A rendered chart is a few KB, so the shared
+# tier uses 16 KB slots; SHARED_FIGURE_CACHE_MB=64 holds about 4000 of them
+figure_cache = TieredCache(LRUCache(maxsize=int(os.environ.get('FIGURE_CACHE_SIZE', 4096))),
+                           shared_cache('figures', int(os.environ.get('SHARED_FIGURE_CACHE_MB', 64)), 16),
+                           dumps=lambda figure: json.dumps(figure).encode(), loads=json.loads)
+
+def get_deep_dive_figure(congress_num, leg_id, subj):
+    """The figure as a plain dict, shared by every request for it: don't modify it."""
+    congress = get_congress(congress_num)
+    # keyed on the files the snapshot was read from, not its version, which is only
+    # per worker; a data reload never serves an old figure, in this worker or another
+    return figure_cache.get_or_compute(
+        (congress_num, congress.source_stamp, leg_id, subj),
+        lambda: json.loads(json.dumps(make_deep_dive_figure(congress, leg_id, subj),
+                                      cls=plotly.utils.PlotlyJSONEncoder)))
+
+def warm_figure_cache(congress_num):
+    # pre-renders everyone's "All" chart; FIGURE_CACHE_SIZE should be at least the number of legislators
+    for leg_id, _ in congress_data.get(congress_num).store.legislators():
+        get_deep_dive_figure(congress_num, leg_id, 'All')
+
 page_1_layout = html.Div([
     dcc.Markdown('#### Please select a legislator! [Or return home.](/)'),
 
@@ -114,11 +230,9 @@ Once you select an individual, you will be able to see their record in more deta
     dcc.Dropdown(
         id='congress-num-dropdown',
         style={'height': '30px', 'width': '37%', 'display': 'inline-block'},
-        # options= [{'label': i, 'value': i} for i in df['congress_num'].unique()],
-        # CURRENTLY HARDCODING IT IN TO BE 115 BECAUSE THAT'S THE ONLY ONE I HAVE
-        # AND I CBF TO FIX THE LABELING RN
-        options= [{'label': '115th (Jan 2017 - Jan 2019)', 'value': 115}],
-        value=115
+        options=[{'label': congress_label(i), 'value': i} for i in available_congress_nums],
+        value=LEGACY_CONGRESS,
+        clearable=False
     ),
 
     dcc.Dropdown(
@@ -131,7 +245,7 @@ Once you select an individual, you will be able to see their record in more deta
     dcc.Dropdown(
         id='state-dropdown',
         style={'height': '30px', 'width': '20%', 'display': 'inline-block'},
-        options=[{'label': i, 'value': i} for i in congress_reps_df['state'].sort_values().unique()] + [{'label': 'All', 'value': 'All'}],
+        options=default_congress.store.state_options,
         value='All'
     ),
 
@@ -139,7 +253,7 @@ Once you select an individual, you will be able to see their record in more deta
 
     dcc.Dropdown(
         id='legislator-dropdown',
-        options=[{'label': i, 'value': congress_reps_df.loc[congress_reps_df['name'] == i]['bioguide_id'].values[0]} for i in congress_reps_df['name'].unique()],
+        options=default_congress.store.options(),
         value='Select...'
     ),
 
@@ -159,113 +273,150 @@ Once you select an individual, you will be able to see their record in more deta
 
 # PAGE TWO
 
-house_one = "H.R.2519 - The American Legion 100th Anniversary Commemorative Coin Act (385; **passed**)"
-house_two = "H.R.930 - Lymphedema Treatment Act (385; introduced)"
-house_three = "H.R.820 - Childhood Cancer STAR Act (371; introduced)"
-house_four = "H.R.299 - Blue Water Navy Vietnam Veterans Act of 2018 (330; passed House)"
-house_five = "H.R.392 - Fairness for High-Skilled Immigrants Act of 2017 (329; introduced)"
-
-senate_one = "S.2823 - Music Modernization Act (80; introduced)"
-senate_two = "A resolution objecting to United Nations Security Council Resolution 2334 and to all efforts that undermine direct negotiations between Israel and the Palestinians for a secure and peaceful settlement. (78; introduced)"
-senate_three = "Fix NICS Act of 2017 (77; introduced)"
-senate_four = "S.1182 - National Flood Insurance Program Extension Act of 2018 (76; **passed**)"
-senate_five = "S.Res.512 - A resolution designating the week of May 13 through May 19, 2018, as \"National Police Week\" (76; agreed to)"
+# the leaderboards are ranked at build time by `python leaderboards.py build`; each Congress's
+# tables are formatted into markdown the first time it's picked and reused until its data is reloaded
+insights = {}
+
+def leg_label(row):
+    title = 'Senator' if row['type'] == 'sen' else 'Representative'
+    return f"{title} {row['name']} ({row['party'][:1]})"
+
+def district_label(row):
+    return '-' if row['type'] == 'sen' else f"{row['state']}-{row['district']}"
+
+def leg_rows(rows, with_district=False):
+    lines = []
+    for row in rows:
+        cells = [leg_label(row) if with_district else f"{leg_label(row)} - {row['state']}",
+                 row['overall_bills_sponsored'], round(row['overall_pass_rate'], 3)]
+        if with_district:
+            cells.insert(0, district_label(row))
+        lines.append(' | '.join(str(c) for c in cells))
+    return '\n'.join(lines)
+
+def bill_cell(bill):
+    status = '**enacted**' if bill['enacted'] else 'not enacted'
+    return f"{bill['bill']} - {bill['title']} ({bill['num_cosponsors']}; {status})".replace('|', '/')
+
+def get_insights(congress_num):
+    congress = get_congress(congress_num)
+    key = (congress_num, congress.version)
+    if key in insights:
+        return insights[key]
+    # both from the snapshot, not whatever is on disk now
+    boards = leaderboards.load(congress_num, congress.stamp_of(leaderboards.SOURCES)) or \
+        leaderboards.compute_from_tables(congress.bills_df, congress.legislators_df, congress.titles_df)
+
+    house, senate = boards['most_supported']['house'], boards['most_supported']['senate']
+    supported = ['House of Representatives | Senate', '--- | ---']
+    for i in range(max(len(house), len(senate))):
+        supported.append(' | '.join(bill_cell(b[i]) if i < len(b) else '' for b in (house, senate)))
+
+    none = boards['sponsored_none']
+    fewest = boards['fewest_sponsored']
+    fewest_md = f"**{none.get('rep', 0)} representative(s) and {none.get('sen', 0)} senator(s) sponsored none.**"
+    if fewest:
+        fewest_md += (f" **The following served at least a full term and sponsored "
+                      f"{fewest[0]['overall_bills_sponsored']} bill(s) each:**\n\n")
+        fewest_md += '\n\n'.join(f"{leg_label(r)} - {district_label(r) if r['type'] == 'rep' else r['state']}"
+                                 for r in fewest)
+
+    never = boards['never_passed']
+    delegation_header = 'District | Legislator | Number of Bills | Rate of Passage (%)\n--- | --- | --- | ---\n'
+    # only the current snapshot's tables are worth keeping
+    for old in [k for k in list(insights) if k[0] == congress_num]:
+        insights.pop(old, None)
+    insights[key] = {
+        'most_supported': '\n'.join(supported),
+        'most_sponsored': 'Legislator | Number of Bills | Rate of Passage (%)\n--- | --- | ---\n' +
+                          leg_rows(boards['most_sponsored']),
+        'fewest_sponsored': fewest_md,
+        'best_passage_rate': delegation_header + leg_rows(boards['best_passage_rate'], with_district=True),
+        'min_bills': boards['min_bills'],
+        'never_passed': f"**{never['count']} legislators who have sponsored at least 1 bill each "
+                        f"({never['share']:.1%} of them) have a passage rate of 0%.**",
+        'delegations': {state: delegation_header + leg_rows(rows, with_district=True)
+                        for state, rows in boards['delegations'].items()},
+    }
+    return insights[key]
 
 page_2_layout = html.Div([
     dcc.Markdown('#### Please enjoy looking through some of my findings! [Or return home.](/)'),
 
     dcc.Markdown(
-'''This page mainly contains basic information about a Congress's bills. Currently this page is not interactive and just displays some information I pulled out, but at the bottom I've gone into more detail about what I plan to do next with this section.'''
+'''This page mainly contains basic information about a Congress's bills. Pick a term of Congress and the tables below are pulled out of that term's data, and at the bottom I've gone into more detail about what I plan to do next with this section.'''
+    ),
+    dcc.Dropdown(
+        id='insights-congress-dropdown',
+        style={'height': '30px', 'width': '37%'},
+        options=[{'label': congress_label(i), 'value': i} for i in available_congress_nums],
+        value=LEGACY_CONGRESS,
+        clearable=False
     ),
     html.Br(),
 
     dcc.Markdown('###### Most Supported Bills'),
-    html.P("Here, 'support' is measured by number of cosponsors (the number in the parenthetical), displayed by the bill's official title. This was to get an idea for what kinds of legislation end up with broad, inherently-bipartisan support. The final status of the bill is also included in the parenthetical, and pulling out this data is when I started to realize that number of cosponsors might be nowhere near as strong a predictor for bill passage as I had initially thought. (Note: the Senate bills listed are excluding a number of unanimous or effectively-unanimous bills, mostly motions to recognize individuals who passed away. I excluded those from this table because that was not the kind of legislation I was interested in representing here.)"),
-
-    dcc.Markdown(
-f'''
-House of Representatives | Senate
---- | ---
-{house_one} | {senate_one}
-{house_two} | {senate_two}
-{house_three} | {senate_three}
-{house_four} | {senate_four}
-{house_five} | {senate_five}
-'''
-    ),
+    html.P(f"Here, 'support' is measured by number of cosponsors (the number in the parenthetical), displayed by the bill's official title. This was to get an idea for what kinds of legislation end up with broad, inherently-bipartisan support. Whether the bill was enacted is also included in the parenthetical, and pulling out this data is when I started to realize that number of cosponsors might be nowhere near as strong a predictor for bill passage as I had initially thought. (Note: bills with the support of {leaderboards.UNANIMOUS_SHARE:.0%} or more of their chamber are excluded, since those are mostly unanimous or effectively-unanimous motions to recognize individuals who passed away. That was not the kind of legislation I was interested in representing here.)"),
+    dcc.Markdown(id='insights-most-supported'),
     html.Br(),
 
     dcc.Markdown('###### Who sponsored the most bills?'),
     html.P("This section is present because I got interested in which individuals spent the most time introducing and sponsoring legislation. The rate of passage listed here is calculated based on the number of the individual's sponsored bills that actually ended up being passed."),
-    dcc.Markdown(
-'''
-Legislator | Number of Bills | Rate of Passage (%)
---- | ---
-Senator Orrin Hatch (R) - UT | 125 | 0.032
-Senator Charles Grassley (R) -  IA | 97 | 0.062
-Senator Marco Rubio (R) -  FL | 92 | 0.022
-Senator Amy Klobuchar (D) - MN | 92 | 0.033
-Senator Benjamin Cardin (D) - MD | 87 | 0.0
-'''
-    ),
+    dcc.Markdown(id='insights-most-sponsored'),
     html.Br(),
 
     dcc.Markdown('###### Who sponsored the fewest bills?'),
-    html.P("On the flipside, I was also curious to see who was spending their time elsewhere (for example, in one of the following lists, members of leadership from both parties are present)."),
-    dcc.Markdown(
-'''**10 representatives and 1 senator who weren\'t in office for the full term sponsored none. The following served full terms and sponsored one bill each that did not pass:**
-
-Representative Peter Visclosky (D) - IN-1
-
-Representative Emanuel Cleaver (D) - MO-5
-
-Representative Nancy Pelosi (D) - CA-12
-
-Representative Trey Gowdy (R) - SC-4
-
-Representative Paul Ryan (R) - SC-4
-
-Representative Jim Jordan (R) - OH-4
-'''
-    ),
+    html.P("On the flipside, I was also curious to see who was spending their time elsewhere (for example, members of leadership from both parties tend to show up here)."),
+    dcc.Markdown(id='insights-fewest-sponsored'),
     html.Br(),
 
     dcc.Markdown('###### Who has the best passage rate?'),
-    html.P("Then I got interested in seeing who has the 'best' or 'most successful' track record in terms of their bills getting passed. Three of these guys are from Texas! And they've all sponsored less than 15 bills each."),
-    dcc.Markdown(
-'''
-District | Legislator | Number of Bills | Rate of Passage (%)
---- | --- | ---
-TX-28 | Representative Henry Cuellar (D) | 9 | 0.333
-TX-8 | Representative Kevin Brady (R) | 14 | 0.286
-IL-12 | Representative Mike Bost (R) | 11 | 0.272
-CT-1 | Representative John Larson (D) | 8 | 0.25
-TX-13 | Representative Mac Thornberry (R) | 12 | 0.25
-'''
-    ),
+    html.P(id='insights-best-passage-note'),
+    dcc.Markdown(id='insights-best-passage-rate'),
     html.Br(),
 
     dcc.Markdown('###### Who has the worst passage rate?'),
     html.P("Again on the flipside, I was curious who either had bad luck or perhaps wasn't particularly effective at their job (if we oversimplified the entire legislative process all the way down to just who sponsored a bill)."),
-    dcc.Markdown('**326 legislators who have sponsored at least 1 bill each (58.8% of them) have a passage rate of 0%.**'),
+    dcc.Markdown(id='insights-never-passed'),
     html.Br(),
 
-    dcc.Markdown('###### What about Austin\'s representatives?'),
-    html.P("This is entirely just to humor myself and make it a little more personally relevant. Some of this is interesting stuff!"),
-    dcc.Markdown(
-'''
-District | Legislator | Number of Bills | Rate of Passage (%)
---- | --- | --- | ---
-TX-10 | Michael McCaul (R)  |33 | 0.091
-TX-17 | Bill Flores (R)  | 12 | 0.0
-TX-21 | Lamar Smith (R)  |13 | 0.077
-TX-25 | Roger Williams (R)  | 14 | 0.0
-TX-31 | John Carter (R)  | 8 | 0.125
-TX-35 | Lloyd Doggett (D)  | 18 | 0.0
-- | Senator John Cornyn (R) | 81 | 0.074
-- | Senator Ted Cruz (R) | 66 | 0.015
-'''
+    dcc.Markdown('###### What about your state\'s delegation?'),
+    html.P("This started out as just Austin's representatives, to humor myself and make it a little more personally relevant. Pick any state to see how its legislators did."),
+    dcc.Dropdown(
+        id='insights-state-dropdown',
+        style={'height': '30px', 'width': '20%'},
+        options=[{'label': i, 'value': i} for i in default_congress.store.states],
+        value='TX',
+        clearable=False
     ),
+    dcc.Markdown(id='insights-delegation'),
+    html.Br(),
+
+    dcc.Markdown('###### Search bill titles'),
+    html.P("Look up bills from the selected Congress by words in their official title. Results update as you type."),
+    dcc.Input(id='title-search-input', type='text', placeholder='e.g. flood insurance', style={'width': '37%'}),
+    html.Div([
+        dcc.Dropdown(
+            id='title-search-subject',
+            style={'width': '37%', 'display': 'inline-block'},
+            placeholder='Any subject',
+            options=[{'label': i, 'value': i} for i in default_congress.bill_subjects]
+        ),
+        dcc.Dropdown(
+            id='title-search-bill-type',
+            style={'width': '20%', 'display': 'inline-block'},
+            placeholder='Any bill type',
+            options=[{'label': v, 'value': k} for k, v in leaderboards.BILL_PREFIXES.items()]
+        ),
+    ]),
+    dcc.RadioItems(
+        id='title-search-enacted',
+        options=[{'label': 'All bills', 'value': 'all'}, {'label': 'Enacted', 'value': 'yes'},
+                 {'label': 'Not enacted', 'value': 'no'}],
+        value='all',
+        labelStyle={'display': 'inline-block', 'margin-right': '2%'}
+    ),
+    html.Div(id='title-search-results'),
     html.Br(),
 
     dcc.Markdown('###### Graphs of overall bill passage will be updated here soon.'),
@@ -289,11 +440,53 @@ I’m also interested in looking at levels of bipartisanship and how they may ha
 
 # PAGE THREE
 
-df = pd.read_csv('./assets/data/bills_and_support.csv').dropna()
-available_subjects = df['subjects_top_term'].unique()
-
-bill_text = pd.read_csv('./assets/data/bill_title_text_for_model.csv')
-title_text_knn = joblib.load('./assets/knn_text_model.joblib')
+available_subjects = default_congress.bill_subjects
+
+# trained by `python bill_model.py train` on the title, chamber, subject and cosponsors by party,
+# loaded the first time someone opens page 3
+bill_model = None
+# size and mtime of the model file it came from, so shared predictions from another model aren't reused
+bill_model_stamp = None
+
+def get_bill_model():
+    global bill_model, bill_model_stamp
+    if bill_model is None:
+        stat = os.stat('./assets/bill_model.npz')
+        bill_model_stamp = (stat.st_size, stat.st_mtime_ns)
+        bill_model = BillModel.load('./assets/bill_model.npz')
+    return bill_model
+
+# most page-3 submissions are repeats, so only the first one of each costs a model evaluation
+prediction_cache = TieredCache(LRUCache(maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))),
+                               shared_cache('predictions', 4, 1), dumps=lambda p: str(p).encode(), loads=int)
+
+def predict_bill(title, chamber, subject=None, democrats=0, republicans=0, independents=0):
+    # keyed on everything the model looks at: the title's tokens, the chamber, subject and cosponsor counts
+    model = get_bill_model()
+    key = (normalize_title(title or ''), chamber, subject, democrats or 0, republicans or 0, independents or 0)
+    return prediction_cache.get_or_compute((bill_model_stamp,) + key, lambda: model.predict(*key))
+
+def slider_settings(max_cosponsors, mark_step, width):
+    # what a cosponsor slider shows for one chamber; a party with no seats gets a single 0 mark
+    marks = {i: str(i) for i in range(1, max_cosponsors + 1, mark_step)} or {0: str(0)}
+    return {'max': max_cosponsors, 'marks': marks, 'style': {'width': width, 'display': 'inline-block'}}
+
+# slider -> chamber -> (most cosponsors from that party, mark spacing, slider width)
+COSPONSOR_SLIDERS = {
+    'num-democrats-cosponsoring': {'senate': (48, 2, '60%'), 'house': (200, 7, '85%')},
+    'num-republicans-cosponsoring': {'senate': (55, 2, '60%'), 'house': (250, 8, '92%')},
+    'num-independents-cosponsoring': {'senate': (2, 1, '60%'), 'house': (0, 1, '0%')},
+}
+# built once and sent with page 3, so switching chambers is handled in the browser (assets/clientside.js)
+cosponsor_slider_table = {
+    chamber: [slider_settings(*COSPONSOR_SLIDERS[slider][chamber]) for slider in COSPONSOR_SLIDERS]
+    for chamber in ('senate', 'house')}
+
+def cosponsor_slider(slider_id):
+    settings = slider_settings(*COSPONSOR_SLIDERS[slider_id]['senate'])
+    return html.Div(
+        dcc.Slider(id=slider_id, min=0, max=settings['max'], step=1, marks=settings['marks'], value=0),
+        style=settings['style'])
 
 page_3_layout = html.Div([
     dcc.Markdown('''#### Please make up a bill! [Or return home.](/)'''),
@@ -341,42 +534,18 @@ page_3_layout = html.Div([
 
     html.Br(),
     html.P('How many Democrats are cosponsoring your bill?'),
-    html.Div(
-        dcc.Slider(
-            id='num-democrats-cosponsoring',
-            min=0,
-            max=48,
-            step=1,
-            marks={i: str(i) for i in range(1, 49, 2)},
-            value=0),
-        style={'width': '60%','display': 'inline-block'}
-    ),
+    cosponsor_slider('num-democrats-cosponsoring'),
 
     html.Br(),
     html.Br(),
     html.P('How many Republicans are cosponsoring your bill?'),
-    html.Div(
-        dcc.Slider(
-            id='num-republicans-cosponsoring',
-            min=0,
-            max=55,
-            marks={i: str(i) for i in range(1, 56, 2)},
-            value=0),
-        style={'width': '60%','display': 'inline-block'}
-        ),
+    cosponsor_slider('num-republicans-cosponsoring'),
 
     html.Br(),
     html.Br(),
     html.P('How many Independents are cosponsoring your bill?'),
-    html.Div(
-        dcc.Slider(
-            id='num-independents-cosponsoring',
-            min=0,
-            max=2,
-            marks={i: str(i) for i in range(1, 3)},
-            value=0),
-        style={'width': '60%','display': 'inline-block'}
-        ),
+    cosponsor_slider('num-independents-cosponsoring'),
+    dcc.Store(id='cosponsor-slider-table', data=cosponsor_slider_table),
 
     html.Br(),
     html.Br(),
@@ -425,6 +594,152 @@ app.title=tabtitle
 
 app.config.suppress_callback_exceptions = True
 
+if os.environ.get('FIGURE_CACHE_WARM'):
+    threading.Thread(target=warm_figure_cache, args=(LEGACY_CONGRESS,), daemon=True).start()
+
+@server.route('/api/search')
+def search_api():
+    # typeahead endpoint: /api/search?q=flood+insur&congress=115&subject=Health&bill_type=hr&enacted=1
+    args = flask.request.args
+    congress_num = args.get('congress', LEGACY_CONGRESS, type=int)
+    if congress_num not in available_congress_nums:
+        flask.abort(404)
+    enacted = args.get('enacted')
+    hits = congress_data.get(congress_num).title_search.search(
+        args.get('q', ''), k=max(1, min(args.get('k', 10, type=int), 100)), subject=args.get('subject') or None,
+        bill_type=args.get('bill_type') or None, enacted=None if enacted in (None, '') else enacted == '1')
+    return flask.jsonify([{'bill_id': b, 'title': t, 'score': round(score, 3)} for b, t, score in hits])
+
+# batch scoring with the page 3 model: POST a JSON list, JSONL (one per line) or CSV of bills, each a title
+# string or {"bill_id", "title", "chamber", "subject", "democrats", "republicans", "independents"} with all but
+# the title optional (see batch_predict); predictions stream back as JSONL, or CSV with ?format=csv. With
+# PREDICT_WORKERS set, chunks are scored by a pool of that many processes, started on the first request and
+# shared by the rest. A JSON list is parsed whole, so it's capped at PREDICT_MAX_JSON_KB (413 past that);
+# send big batches as JSONL or CSV, which are read and scored a chunk at a time whatever their size.
+PREDICT_WORKERS = int(os.environ.get('PREDICT_WORKERS', 0))
+PREDICT_MAX_JSON_BYTES = int(os.environ.get('PREDICT_MAX_JSON_KB', 1024)) * 1024
+predict_pool = None
+predict_pool_lock = threading.Lock()
+
+def get_predict_pool():
+    global predict_pool
+    with predict_pool_lock:
+        if predict_pool is None:
+            predict_pool = batch_predict.init_pool(PREDICT_WORKERS, './assets/bill_model.npz')
+    return predict_pool
+
+@server.route('/api/predict', methods=['POST'])
+def predict_api():
+    request = flask.request
+    if request.mimetype == 'application/json':
+        if request.content_length is None:
+            return flask.jsonify({'error': 'a JSON body needs a Content-Length; stream big batches as JSONL or CSV'}), 411
+        if request.content_length > PREDICT_MAX_JSON_BYTES:
+            return flask.jsonify({'error': f'JSON bodies are limited to {PREDICT_MAX_JSON_BYTES // 1024} KB; '
+                                           'send larger batches as JSONL (application/x-ndjson) or CSV (text/csv)'}), 413
+        # the whole body is in hand, so a bad one is turned away before anything is streamed
+        rows = request.get_json(force=True)
+        if not isinstance(rows, list) or not all(batch_predict.is_record(row) for row in rows):
+            return flask.jsonify({'error': 'expected a JSON list of title strings or {"bill_id", "title", ...} '
+                                           'objects with chamber house or senate and whole-number cosponsor counts'}), 400
+        records = batch_predict.read_rows(rows)
+    else:
+        # malformed JSONL lines and CSV rows are skipped; their ids (line numbers) are missing from the output
+        body = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        records = batch_predict.read_records(body, 'csv' if request.mimetype == 'text/csv' else 'jsonl')
+    chunk_size = max(1, min(request.args.get('chunk_size', batch_predict.CHUNK_SIZE, type=int), 10000))
+    results = batch_predict.score_records(records, chunk_size, PREDICT_WORKERS, './assets/bill_model.npz',
+                                          pool=get_predict_pool() if PREDICT_WORKERS else None)
+
+    if request.args.get('format') == 'csv':
+        def lines():
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=batch_predict.OUTPUT_FIELDS, lineterminator='\n')
+            writer.writeheader()
+            for r in results:
+                writer.writerow(r)
+                if out.tell() > 65536:
+                    yield out.getvalue()
+                    out.seek(0)
+                    out.truncate()
+            yield out.getvalue()
+        return flask.Response(flask.stream_with_context(lines()), mimetype='text/csv')
+    return flask.Response(flask.stream_with_context(json.dumps(r) + '\n' for r in results),
+                          mimetype='application/x-ndjson')
+
+# filtered downloads, streamed a chunk at a time:
+# /export/bills?congress=115&chamber=house&subject=Health&enacted=1&format=csv
+# /export/legislators?congress=116&state=CA&party=Democrat&format=parquet
+# each one keeps a core busy while it runs, so past EXPORT_CONCURRENCY per worker they get a 429
+export_slots = export.ExportSlots(int(os.environ.get('EXPORT_CONCURRENCY', 1)))
+
+@server.route('/export/<dataset>')
+def export_data(dataset):
+    args = flask.request.args
+    congress_num = args.get('congress', LEGACY_CONGRESS, type=int)
+    fmt = args.get('format', 'csv')
+    if congress_num not in available_congress_nums:
+        flask.abort(404)
+    try:
+        filters = export.parse_filters(dataset, args)
+        chunks = export.stream(congress_data.get(congress_num), dataset, fmt, **filters)
+    except export.ExportError as e:
+        return flask.jsonify({'error': str(e)}), 400
+    headers = {'Content-Disposition': f'attachment; filename="{export.filename(congress_num, dataset, fmt, filters)}"'}
+    held = export_slots.hold(chunks)
+    if held is None:
+        return flask.jsonify({'error': 'too many exports running; try again shortly'}), 429, {'Retry-After': '5'}
+    try:
+        return flask.Response(held, mimetype=export.FORMATS[fmt], headers=headers)
+    except Exception:
+        # once the response exists, closing it gives the slot back; until then it's up to us
+        held.close()
+        raise
+
+# new data is picked up without a restart: every callback asks congress_data for its snapshot once and
+# uses only that, and a reload swaps a fully loaded snapshot in. Each gunicorn worker has its own cache,
+# so DATA_WATCH_SECONDS (polling the files) reaches all of them; /admin/reload only reaches the one it hits.
+if os.environ.get('DATA_WATCH_SECONDS'):
+    congress_data.watch(float(os.environ['DATA_WATCH_SECONDS']))
+
+@server.route('/admin/reload', methods=['POST'])
+def reload_data():
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token or flask.request.headers.get('X-Admin-Token') != token:
+        flask.abort(404)
+    congress_nums = flask.request.args.getlist('congress', type=int) or list(congress_data.stats()['loaded'])
+    versions = {}
+    for congress_num in congress_nums:
+        partition = congress_data.reload(congress_num)
+        versions[congress_num] = partition.version if partition is not None else None
+    return flask.jsonify({'pid': os.getpid(), 'versions': versions})
+
+# wall time, response size and calls per callback; with CALLBACK_PROFILE_MS set, stacks are
+# sampled while callbacks run and kept for any call slower than that
+callback_metrics = instrument(app, profile_ms=float(os.environ['CALLBACK_PROFILE_MS'])
+                              if os.environ.get('CALLBACK_PROFILE_MS') else None)
+
+@server.route('/metrics')
+def metrics():
+    # per worker, like /stats/caches; ?format=prometheus for a scraper
+    if flask.request.args.get('format') == 'prometheus':
+        return flask.Response(callback_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return flask.jsonify(callback_metrics.snapshot())
+
+@server.route('/metrics/slow')
+def slow_callbacks():
+    return flask.jsonify(list(callback_metrics.slow_profiles))
+
+@server.route('/stats/caches')
+def cache_stats():
+    # per worker; hit these a few times to sample every gunicorn worker
+    return flask.jsonify({
+        'pid': os.getpid(),
+        'figures': figure_cache.stats(),
+        'predictions': prediction_cache.stats(),
+        'congress_partitions': congress_data.stats(),
+    })
+
 ########### Set up the layout
 
 app.layout = html.Div([
@@ -444,6 +759,7 @@ def display_page(pathname):
     elif pathname == '/page-2':
         return page_2_layout
     elif pathname == '/page-3':
+        get_bill_model()
         return page_3_layout
     else:
         return index_layout
@@ -457,18 +773,12 @@ def display_page(pathname):
     Input('chamber-dropdown', 'value'),
     Input('state-dropdown', 'value')])
 def set_legislator_choices_options(congress_num, chamber, state):
-    # removing this for now because i'm just hardcoding the 115
-    # dff = df.loc[df['congress_num'] == congress_num]
-    dff = congress_reps_df
-    if chamber != 'Both':
-        if chamber == 'Senate':
-            dff = dff.loc[dff['type'] == 'sen']
-        else:
-            dff = dff.loc[dff['type'] == 'rep']
-    if state != 'All':
-        dff = dff.loc[dff['state'] == state]
+    leg_type = CHAMBER_TYPES.get(chamber)
+    if state == 'All':
+        state = None
 
-    return [{'label': i, 'value': dff.loc[dff['name'] == i]['bioguide_id'].values[0]} for i in dff['name'].unique()]
+    # every chamber/state combination is precomputed in the store
+    return get_congress(congress_num).store.options(leg_type, state)
 
 @app.callback(
     Output('legislator-output', 'children'),
@@ -489,20 +799,24 @@ def set_display_children(leg_id):
 @app.callback(
     Output('tab-1', 'children'),
     [Input('tabs-options', 'value'),
-     Input('legislator-dropdown', 'value')])
-def make_deep_dive_chart(tab, leg_id):
+     Input('legislator-dropdown', 'value'),
+     Input('congress-num-dropdown', 'value')])
+def make_deep_dive_chart(tab, leg_id, congress_num):
     if tab == 'tab-1-summary':
-        summary = get_summary(leg_id)
+        congress = get_congress(congress_num)
+        if leg_id not in congress.store:
+            return dcc.Markdown(f'**This legislator did not serve in the {congress_label(congress_num)} Congress.**')
+        summary = get_summary(congress, leg_id)
         output = f'##### {summary[0]}\n'
         output += f'> **{summary[1]}**\n\n'
         output += f'> **{summary[2]}**\n\n'
 
-        # cospons_summary = get_cosponsorship_summary(leg_id)
-        # output += f'> ** {cospons_summary[0]}**\n\n'
-        # for subj in cospons_summary[1:]:
-        #     output += f'> {subj}' +'\n\n'
+        cospons_summary = get_cosponsorship_summary(congress, leg_id)
+        output += f'> **{cospons_summary[0]}**\n\n'
+        for subj in cospons_summary[1:]:
+            output += f'> {subj}' +'\n\n'
 
-        dff = spons_by_subj_df.loc[spons_by_subj_df['bioguide_id'] == leg_id]
+        breakdown = congress.store.subject_breakdown(leg_id)
         return html.Div([
                 dcc.Markdown(output),
                 html.Br(),
@@ -510,7 +824,7 @@ def make_deep_dive_chart(tab, leg_id):
                 dcc.Dropdown(
                     id='legislator-subject-dropdown',
                     style={'height': '30px', 'width': '80%'},
-                    options=[{'label': i, 'value': i} for i in dff['subjects_top_term'].unique()] + [{'label': 'All', 'value': 'All'}],
+                    options=[{'label': i, 'value': i} for i in breakdown.subjects] + [{'label': 'All', 'value': 'All'}],
                     value='All'
                 ),
                 html.Br(),
@@ -520,37 +834,11 @@ def make_deep_dive_chart(tab, leg_id):
 @app.callback(
     Output('legislator-deep-dive', 'figure'),
     [Input('legislator-dropdown', 'value'),
-     Input('legislator-subject-dropdown', 'value')]
+     Input('legislator-subject-dropdown', 'value'),
+     Input('congress-num-dropdown', 'value')]
 )
-def render_graph(leg_id, subj):
-    dff = spons_by_subj_df.loc[spons_by_subj_df['bioguide_id'] == leg_id]
-    if dff['by_subj_bills_sponsored'].values[0] == 'not applicable':
-        return {'data': [], 'layout': go.Layout(title='No Sponsored Bills')}
-
-    if subj == 'All':
-        trace = go.Bar(x=dff['subjects_top_term'], y=dff['by_subj_bills_sponsored'],
-                        hovertext='Passage Rate: ' + dff['by_subj_pass_rate'], hoverinfo="text",
-                        # marker=dict(color=color.tolist())
-        )
-        layout = go.Layout(title='Bills Sponsored By Subject',
-                            colorway=["#EF963B", "#EF533B"],# hovermode="closest",
-                            xaxis={'title': "Subject", 'titlefont': {'color': 'black', 'size': 14},
-                                   'tickfont': {'size': 9, 'color': 'black'}},
-                            yaxis={'title': "Number of bills", 'titlefont': {'color': 'black', 'size': 14, },
-                                   'tickfont': {'color': 'black'}})
-    else:
-        dff = dff.loc[dff['subjects_top_term'] == subj]
-        trace = go.Bar(x=[subj], y=dff['by_subj_pass_rate'])
-        layout = go.Layout(title=f'Rate of Passage for Sponsored {subj} Bills',
-                            colorway=["#EF963B", "#EF533B"],# hovermode="closest",
-                            xaxis={'title': "Subject", 'titlefont': {'color': 'black', 'size': 14},
-                                   'tickfont': {'size': 12, 'color': 'black'}},
-                            yaxis={'title': "Rate of Passage", 'titlefont': {'color': 'black', 'size': 14, },
-                                   'tickfont': {'color': 'black'}})
-    return {
-        'data':[trace],
-        'layout':layout
-    }
+def render_graph(leg_id, subj, congress_num):
+    return get_deep_dive_figure(congress_num, leg_id, subj)
 
 @app.callback(
     Output('tab-2', 'children'),
@@ -577,48 +865,83 @@ def render_tab_one(tab):
 @app.callback(
     Output('legislators-knn-output', 'children'),
     [Input('legislator-dropdown', 'value'),
-     Input('legislators-knn-radio', 'value')])
-def set_display_neighbors(leg_id, knn_num):
-    # similar_legs = get_similar_legs(leg_id, knn_num)
-    # output = '###### Legislators with similar records:\n'
-    # for leg in similar_legs:
-    #     output += f'> ** {leg[0]}**' +'\n\n'
-    # return dcc.Markdown(output)
-    return dcc.Markdown("**Currently refactoring due to filesize limitations.**")
+     Input('legislators-knn-radio', 'value'),
+     Input('congress-num-dropdown', 'value')])
+def set_display_neighbors(leg_id, knn_num, congress_num):
+    congress = get_congress(congress_num)
+    if leg_id not in congress.store:
+        return dcc.Markdown(f'**This legislator did not serve in the {congress_label(congress_num)} Congress.**')
+    similar_legs = get_similar_legs(congress, leg_id, knn_num)
+    if not similar_legs:
+        return dcc.Markdown('**This legislator has no cosponsorship record to compare.**')
+    output = '###### Legislators with similar records:\n'
+    for leg in similar_legs:
+        output += f'> **{leg[0]}** (similarity {np.round(leg[1], 3)})' +'\n\n'
+    return dcc.Markdown(output)
+
+# page 2
+
+@app.callback(
+    [Output('insights-most-supported', 'children'),
+    Output('insights-most-sponsored', 'children'),
+    Output('insights-fewest-sponsored', 'children'),
+    Output('insights-best-passage-note', 'children'),
+    Output('insights-best-passage-rate', 'children'),
+    Output('insights-never-passed', 'children')],
+    [Input('insights-congress-dropdown', 'value')])
+def show_insights(congress_num):
+    tables = get_insights(congress_num)
+    note = (f"Then I got interested in seeing who has the 'best' or 'most successful' track record in terms of their "
+            f"bills getting passed, among legislators who sponsored at least {tables['min_bills']} bills.")
+    return (tables['most_supported'], tables['most_sponsored'], tables['fewest_sponsored'], note,
+            tables['best_passage_rate'], tables['never_passed'])
+
+@app.callback(
+    Output('insights-delegation', 'children'),
+    [Input('insights-congress-dropdown', 'value'),
+    Input('insights-state-dropdown', 'value')])
+def show_delegation(congress_num, state):
+    delegation = get_insights(congress_num)['delegations'].get(state)
+    if delegation is None:
+        return 'No legislators from this state in this Congress.'
+    return delegation_totals(congress_num, state) + '\n\n' + delegation
+
+def delegation_totals(congress_num, state):
+    # read off the partition's aggregation cube, so a state pick is a few array lookups, not a groupby
+    cube = get_congress(congress_num).cube
+    sponsored = cube.value('sponsored', state=state)
+    by_party = ', '.join(f'{party} {n}' for party, n in cube.breakdown('sponsored', 'party', state=state).items() if n)
+    enacted = f" ({by_party}), {cube.pass_rate(state=state):.1%} enacted," if sponsored else ''
+    # the all-subjects legislator count is the whole delegation, sponsors or not
+    return (f"**{cube.value('legislators', state=state)} legislator(s); together they sponsored {sponsored} "
+            f"bill(s){enacted} and made {cube.value('cosponsorships', state=state)} cosponsorship(s).**")
+
+ENACTED_FILTER = {'all': None, 'yes': True, 'no': False}
 
-# page 2 has no callbacks right now
+@app.callback(
+    Output('title-search-results', 'children'),
+    [Input('title-search-input', 'value'),
+    Input('insights-congress-dropdown', 'value'),
+    Input('title-search-subject', 'value'),
+    Input('title-search-bill-type', 'value'),
+    Input('title-search-enacted', 'value')])
+def search_titles(query, congress_num, subject, bill_type, enacted):
+    if not query:
+        return ''
+    hits = get_congress(congress_num).title_search.search(
+        query, k=10, subject=subject, bill_type=bill_type, enacted=ENACTED_FILTER.get(enacted))
+    if not hits:
+        return html.P('No matching bills.')
+    return html.Ul([html.Li(f"{bill_id}: {leaderboards.display_title(title)}") for bill_id, title, _ in hits])
 
 # page 3
 
-@app.callback([Output('num-republicans-cosponsoring', 'max'),
-             Output('num-republicans-cosponsoring', 'marks'),
-             Output('num-republicans-cosponsoring', 'style')],
-            [Input('chamber-radio', 'value')])
-def update_cosponsor_options(chamber):
-    if chamber == 'senate':
-        return 55, {i: str(i) for i in range(1, 56, 2)}, {'width': '60%','display': 'inline-block'}
-    else:
-        return 250, {i: str(i) for i in range(1, 251, 8)}, {'width': '92%','display': 'inline-block'}
-
-@app.callback([Output('num-democrats-cosponsoring', 'max'),
-             Output('num-democrats-cosponsoring', 'marks'),
-             Output('num-democrats-cosponsoring', 'style')],
-            [Input('chamber-radio', 'value')])
-def update_cosponsor_options(chamber):
-    if chamber == 'senate':
-        return 48, {i: str(i) for i in range(1, 49, 2)}, {'width': '60%','display': 'inline-block'}
-    else:
-        return 200, {i: str(i) for i in range(1, 201, 7)}, {'width': '85%','display': 'inline-block'}
-
-@app.callback([Output('num-independents-cosponsoring', 'max'),
-             Output('num-independents-cosponsoring', 'marks'),
-             Output('num-independents-cosponsoring', 'style')],
-            [Input('chamber-radio', 'value')])
-def update_cosponsor_options(chamber):
-    if chamber == 'senate':
-        return 2, {i: str(i) for i in range(1, 3)}, {'width': '60%','display': 'inline-block'}
-    else:
-        return 0, {0: str(0)}, {'width': '0%','display': 'inline-block'}
+# no round trip: the browser looks the chamber up in cosponsor-slider-table
+app.clientside_callback(
+    ClientsideFunction(namespace='cosponsors', function_name='sliders_for_chamber'),
+    [Output(slider, prop) for slider in COSPONSOR_SLIDERS for prop in ('max', 'marks', 'style')],
+    [Input('chamber-radio', 'value')],
+    [State('cosponsor-slider-table', 'data')])
 
 @app.callback(Output('output-container-button', 'children'),
     [Input('title-submit-button', 'n_clicks')])
@@ -629,13 +952,16 @@ def update_output(n_clicks):
         return 'Your bill has been submitted! Let\'s see if it passes!'
 
 @app.callback(Output('overall-output', 'children'),
-    [Input('submitted-bill-title', 'value'),
-     Input('title-submit-button', 'n_clicks'),
-     Input('num-democrats-cosponsoring', 'value'),
-     Input('num-republicans-cosponsoring', 'value')])
-def predict_and_tell(incoming_title, submitted_yet, dems, repubs):
+    [Input('title-submit-button', 'n_clicks')],
+    [State('submitted-bill-title', 'value'),
+     State('chamber-radio', 'value'),
+     State('submitted-bill-subject', 'value'),
+     State('num-democrats-cosponsoring', 'value'),
+     State('num-republicans-cosponsoring', 'value'),
+     State('num-independents-cosponsoring', 'value')])
+def predict_and_tell(submitted_yet, incoming_title, chamber, subject, dems, repubs, inds):
     if submitted_yet != None:
-        prediction = title_text_knn.predict(pd.Series([incoming_title]))
+        prediction = predict_bill(incoming_title, chamber, subject, dems, repubs, inds)
 
         if prediction == 1:
             pred = '**Congratulations, your bill passed!**'
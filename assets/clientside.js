@@ -0,0 +1,14 @@
+// client-side callbacks; Dash serves everything in assets/ with the page
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    cosponsors: {
+        // chamber-radio -> max, marks, style for each cosponsor slider, from the table app.py sends with page 3
+        sliders_for_chamber: function(chamber, table) {
+            var sliders = table[chamber] || table.senate;
+            var out = [];
+            for (var i = 0; i < sliders.length; i++) {
+                out.push(sliders[i].max, sliders[i].marks, sliders[i].style);
+            }
+            return out;
+        }
+    }
+});
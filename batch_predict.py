@@ -0,0 +1,232 @@
+"""Score many bills at once with the page 3 model.
+
+Each bill is a title plus, optionally, what page 3 asks for alongside it: the
+chamber ('house' or 'senate', or taken from a bill_type), the top subject, and
+how many Democrats, Republicans and Independents cosponsor it. A bare title
+string, or a missing field, contributes nothing for that feature, so a title
+alone scores on the title with the chamber, subject and cosponsor terms left out.
+
+Bills stream in from CSV or JSONL, are scored a chunk at a time (hashing and the
+sparse matrix-vector product for a whole chunk at once), and results stream back
+out in input order. With workers > 0 the chunks fan out to a process pool, each
+worker loading the model once; at most a few chunks per worker are in flight, so
+memory stays flat however long the input is.
+
+    python batch_predict.py bills.csv --out predictions.csv
+    python batch_predict.py week.jsonl --workers 4 > predictions.jsonl
+
+The same stream backs POST /api/predict in app.py.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bill_model import CHAMBERS, MODEL_PATH, BillModel, chamber_of
+
+CHUNK_SIZE = 1000
+# chunks queued per pool worker; enough to keep them busy without buffering the input
+IN_FLIGHT_PER_WORKER = 2
+TITLE_FIELDS = ('titles_text', 'title')
+ID_FIELDS = ('bill_id', 'id')
+SUBJECT_FIELDS = ('subject', 'subjects_top_term')
+COSPONSOR_FIELDS = ('democrats', 'republicans', 'independents')
+OUTPUT_FIELDS = ('id', 'probability', 'prediction')
+
+
+def _first(row, fields, default=None):
+    return next((row[f] for f in fields if row.get(f) not in (None, '')), default)
+
+
+def _count(value):
+    # a cosponsor count: blank is 0, and None means it isn't a whole number >= 0
+    if value in (None, ''):
+        return 0
+    try:
+        n = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(n) if 0 <= n < float('inf') and n % 1 == 0 else None
+
+
+def _bill(row):
+    """(title, chamber, subject, democrats, republicans, independents) for BillModel, or None if malformed."""
+    if isinstance(row, str):
+        return row, None, None, 0, 0, 0
+    if not isinstance(row, dict):
+        return None
+    title = _first(row, TITLE_FIELDS, '')
+    chamber = str(row.get('chamber') or '').lower() or None
+    if chamber is None and row.get('bill_type'):
+        chamber = chamber_of(row['bill_type'])
+    counts = [_count(row.get(f)) for f in COSPONSOR_FIELDS]
+    if chamber not in CHAMBERS + (None,) or None in counts:
+        return None
+    subject = _first(row, SUBJECT_FIELDS)
+    return (title if isinstance(title, str) else str(title), chamber,
+            None if subject is None else str(subject), *counts)
+
+
+def is_record(row):
+    # a bare title string or an object whose fields make sense; anything else in a JSON list or JSONL line is malformed
+    return _bill(row) is not None
+
+
+def read_rows(rows, skipped=None):
+    """(id, bill) pairs from CSV rows or parsed JSON values: title strings or objects; rows without an id are numbered.
+
+    Anything malformed is passed over, and its line number appended to `skipped` if given.
+    """
+    for line_num, row in enumerate(rows):
+        bill = _bill(row)
+        if bill is not None:
+            yield _first(row, ID_FIELDS, line_num) if isinstance(row, dict) else line_num, bill
+        elif skipped is not None:
+            skipped.append(line_num)
+
+
+def read_csv(f, skipped=None):
+    return read_rows(csv.DictReader(f), skipped)
+
+
+def _json_lines(f):
+    # None (which read_rows skips) for a line that isn't JSON, so one bad line doesn't end the stream
+    for line in f:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def read_jsonl(f, skipped=None):
+    return read_rows(_json_lines(f), skipped)
+
+
+def read_records(f, fmt, skipped=None):
+    """(id, bill) pairs from an open text file, streamed; fmt is 'csv' or 'jsonl'."""
+    return read_csv(f, skipped) if fmt == 'csv' else read_jsonl(f, skipped)
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def chunked(records, size=CHUNK_SIZE):
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# one per process: the pool initializer loads it in each worker, and the in-process path loads it lazily
+_model = None
+
+
+def _load_model(path=MODEL_PATH):
+    global _model
+    _model = BillModel.load(path)
+
+
+def _score(bills):
+    # one list per BillModel.predict_proba_many argument
+    probabilities = _model.predict_proba_many(*zip(*bills))
+    return probabilities.tolist(), (probabilities >= _model.threshold).tolist()
+
+
+def _results(chunk, scored):
+    probabilities, predictions = scored
+    for (record_id, _), p, pred in zip(chunk, probabilities, predictions):
+        yield {'id': record_id, 'probability': round(p, 6), 'prediction': int(pred)}
+
+
+def score_records(records, chunk_size=CHUNK_SIZE, workers=0, model_path=MODEL_PATH, pool=None):
+    """Yield {'id', 'probability', 'prediction'} for each (id, bill), in order.
+
+    workers=0 scores in this process. Otherwise chunks go to `pool` if given (started
+    with init_pool, with `workers` processes) or to a pool made here for the call.
+    """
+    chunks = chunked(records, max(chunk_size, 1))
+    if not workers and pool is None:
+        if _model is None:
+            _load_model(model_path)
+        for chunk in chunks:
+            yield from _results(chunk, _score([bill for _, bill in chunk]))
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = init_pool(workers, model_path)
+    max_pending = IN_FLIGHT_PER_WORKER * max(workers, 1)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_score, [bill for _, bill in chunk])))
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield from _results(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from _results(chunk, future.result())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if own_pool:
+            pool.shutdown()
+
+
+def init_pool(workers, model_path=MODEL_PATH):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_load_model, initargs=(model_path,))
+
+
+def write_jsonl(results, f):
+    for r in results:
+        f.write(json.dumps(r) + '\n')
+
+
+def write_csv(results, f):
+    writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(results)
+
+
+def counted(results, counter):
+    for r in results:
+        counter[0] += 1
+        yield r
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a file of bills with the page 3 model.')
+    parser.add_argument('input', help="CSV (a titles_text or title column, optionally chamber or bill_type, subject, "
+                                      "democrats, republicans, independents) or JSONL with the same fields; "
+                                      "'-' for stdin")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='input format; guessed from the extension')
+    parser.add_argument('--out', default='-', help='.csv or .jsonl; defaults to JSONL on stdout')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='0 scores in this process')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--model', default=MODEL_PATH)
+    args = parser.parse_args()
+
+    fmt = args.format or ('jsonl' if args.input == '-' else guess_format(args.input))
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    sink = sys.stdout if args.out == '-' else open(args.out, 'w', newline='', encoding='utf-8')
+    write = write_csv if args.out.lower().endswith('.csv') else write_jsonl
+
+    n, skipped = [0], []
+    start = time.perf_counter()
+    with source, sink:
+        records = read_records(source, fmt, skipped)
+        write(counted(score_records(records, args.chunk_size, args.workers, args.model), n), sink)
+    elapsed = time.perf_counter() - start
+    print(f'scored {n[0]} bills in {elapsed:.2f}s ({n[0] / elapsed:,.0f} bills/s, '
+          f'{args.workers} workers, chunks of {args.chunk_size})', file=sys.stderr)
+    if skipped:
+        print(f'skipped {len(skipped)} malformed line(s), starting at line {skipped[0] + 1}', file=sys.stderr)
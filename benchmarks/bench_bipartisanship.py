@@ -0,0 +1,63 @@
+"""Bipartisanship metrics for a whole Congress: a row loop over the frames vs BipartisanshipMetrics.
+
+Run from the repo root: python benchmarks/bench_bipartisanship.py
+"""
+import ast
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bipartisanship import BIPARTISAN_POLARITY, BipartisanshipMetrics  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'data')
+
+bills_df = pd.read_csv(os.path.join(DATA, 'bills_and_support.csv'))
+reps_df = pd.read_csv(os.path.join(DATA, 'all_congress_reps.csv'))
+
+
+def row_loop():
+    party = dict(zip(reps_df['bioguide_id'], reps_df['party']))
+    polarity = {}
+    alongside = defaultdict(Counter)
+    by_subject = defaultdict(list)
+    for bill_id, subject, cells in zip(bills_df['bill_id'], bills_df['subjects_top_term'], bills_df['cosponsors']):
+        ids = set(ast.literal_eval(cells))
+        counts = Counter(party.get(i, 'Unknown') for i in ids)
+        major = counts['Democrat'] + counts['Republican']
+        if major:
+            polarity[bill_id] = abs(counts['Democrat'] - counts['Republican']) / major
+            if isinstance(subject, str):
+                by_subject[subject].append(polarity[bill_id])
+        for i in ids:
+            alongside[i].update(counts)
+            alongside[i][party.get(i, 'Unknown')] -= 1
+    cross = {}
+    for i, counts in alongside.items():
+        others = sum(counts.values())
+        if others:
+            cross[i] = (others - counts[party.get(i, 'Unknown')]) / others
+    subjects = {s: (np.mean(p), np.mean(np.array(p) <= BIPARTISAN_POLARITY)) for s, p in by_subject.items()}
+    return polarity, cross, subjects
+
+
+def vectorized():
+    return BipartisanshipMetrics.from_frames(bills_df, reps_df)
+
+
+if __name__ == '__main__':
+    for name, fn in (('row loop', row_loop), ('vectorized', vectorized)):
+        start = time.perf_counter()
+        result = fn()
+        print(f'{name:>10}: {time.perf_counter() - start:.3f}s for {len(bills_df)} bills')
+
+    polarity, cross, subjects = row_loop()
+    metrics = result
+    assert all(np.isclose(metrics.bill(b)['polarity'], p) for b, p in polarity.items())
+    assert all(np.isclose(metrics.legislator(i)['cross_party_rate'], r) for i, r in cross.items())
+    assert all(np.isclose(metrics.subject(s)['polarity'], p) for s, (p, _) in subjects.items())
+    print('results match;', metrics.summary())
@@ -0,0 +1,129 @@
+"""Page 3 chamber switch: the three server callbacks it used to fire vs the client-side one.
+
+Before, each click on chamber-radio sent three POSTs to /_dash-update-component,
+one per cosponsor slider. Those callbacks are reproduced here on a bare Dash app
+and timed through the Flask test client, which leaves out the network, so real
+round trips only add to that side. After, the app registers no server callback on
+chamber-radio. The browser runs assets/clientside.js, timed here under node if it
+is installed, and its output is checked against the old callbacks'.
+
+Run from the repo root: python benchmarks/bench_chamber_sliders.py
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import numpy as np
+from dash.dependencies import Input, Output
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_test import callback_request  # noqa: E402
+
+ROUNDS = 500
+CHAMBERS = ('senate', 'house')
+
+
+def old_callbacks_app():
+    # the callbacks as they were, one per slider
+    old = dash.Dash(__name__)
+    old.layout = html.Div([dcc.RadioItems(id='chamber-radio')] + [
+        dcc.Slider(id=i) for i in ('num-democrats-cosponsoring', 'num-republicans-cosponsoring',
+                                   'num-independents-cosponsoring')])
+
+    def outputs(slider):
+        return [Output(slider, 'max'), Output(slider, 'marks'), Output(slider, 'style')]
+
+    @old.callback(outputs('num-democrats-cosponsoring'), [Input('chamber-radio', 'value')])
+    def democrats(chamber):
+        if chamber == 'senate':
+            return 48, {i: str(i) for i in range(1, 49, 2)}, {'width': '60%', 'display': 'inline-block'}
+        return 200, {i: str(i) for i in range(1, 201, 7)}, {'width': '85%', 'display': 'inline-block'}
+
+    @old.callback(outputs('num-republicans-cosponsoring'), [Input('chamber-radio', 'value')])
+    def republicans(chamber):
+        if chamber == 'senate':
+            return 55, {i: str(i) for i in range(1, 56, 2)}, {'width': '60%', 'display': 'inline-block'}
+        return 250, {i: str(i) for i in range(1, 251, 8)}, {'width': '92%', 'display': 'inline-block'}
+
+    @old.callback(outputs('num-independents-cosponsoring'), [Input('chamber-radio', 'value')])
+    def independents(chamber):
+        if chamber == 'senate':
+            return 2, {i: str(i) for i in range(1, 3)}, {'width': '60%', 'display': 'inline-block'}
+        return 0, {0: str(0)}, {'width': '0%', 'display': 'inline-block'}
+
+    return old
+
+
+def time_server_callbacks(old):
+    client = old.server.test_client()
+    outputs = list(old.callback_map)
+    per_click, payload, results = [], 0, {}
+    for n in range(ROUNDS):
+        chamber = CHAMBERS[n % 2]
+        start = time.perf_counter()
+        for output in outputs:
+            response = client.post('/_dash-update-component', json=callback_request(old, output, [chamber]))
+            payload += len(response.data)
+            results.setdefault(chamber, []).append(response.get_json()['response'])
+        per_click.append(time.perf_counter() - start)
+    return len(outputs), np.array(per_click) * 1e3, payload / ROUNDS, results
+
+
+def time_clientside(table):
+    node = shutil.which('node') or shutil.which('nodejs')
+    if node is None:
+        return None, None
+    script = f'''
+        var window = {{}};
+        {open(os.path.join(ROOT, 'assets', 'clientside.js')).read()}
+        var f = window.dash_clientside.cosponsors.sliders_for_chamber, table = {json.dumps(table)};
+        var out = {{}}, chambers = {json.dumps(CHAMBERS)};
+        chambers.forEach(function(c) {{ out[c] = f(c, table); }});
+        var start = process.hrtime.bigint();
+        for (var n = 0; n < {ROUNDS * 100}; n++) {{ f(chambers[n % 2], table); }}
+        out.us = Number(process.hrtime.bigint() - start) / 1e3 / {ROUNDS * 100};
+        console.log(JSON.stringify(out));
+    '''
+    out = json.loads(subprocess.check_output([node, '-e', script]).decode())
+    return out.pop('us'), out
+
+
+def main():
+    import app
+
+    # client-side callbacks have no python function behind them
+    server_inputs = [k for k, v in app.app.callback_map.items() if 'callback' in v and
+                     any(i['id'] == 'chamber-radio' for i in v.get('inputs', []))]
+    requests, per_click_ms, payload, old_results = time_server_callbacks(old_callbacks_app())
+    js_us, js_results = time_clientside(app.cosponsor_slider_table)
+
+    print(f"{'':<24}{'requests/click':>16}{'p50 ms':>10}{'p99 ms':>10}{'bytes/click':>13}")
+    print(f"{'before (3 callbacks)':<24}{requests:>16}{np.percentile(per_click_ms, 50):>10.2f}"
+          f"{np.percentile(per_click_ms, 99):>10.2f}{payload:>13.0f}")
+    if js_us is None:
+        print(f"{'after (client side)':<24}{len(server_inputs):>16}{'n/a':>10}{'n/a':>10}{0:>13}"
+              '   (node not found, JS not timed)')
+        return
+    print(f"{'after (client side)':<24}{len(server_inputs):>16}{js_us / 1e3:>10.4f}{'':>10}{0:>13}")
+
+    for chamber in CHAMBERS:
+        # the same max/marks/style as the old callbacks, in slider order
+        old = {}
+        for response in old_results[chamber][:3]:
+            for slider, props in response.items():
+                old[slider] = [props['max'], props['marks'], props['style']]
+        expected = [v for slider in app.COSPONSOR_SLIDERS for v in old[slider]]
+        assert json.loads(json.dumps(js_results[chamber])) == json.loads(json.dumps(expected)), chamber
+    print('\nclient-side output matches the old callbacks for both chambers')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Rollup queries: the aggregation cube vs the pandas groupby each one would otherwise be.
+
+The groupbys run over the same facts the cube is built from: one row per
+legislator and subject they sponsored on, one per cosponsorship, and the
+legislators table. Every rollup level (each subset of party, chamber, state and
+subject) is checked cell for cell against its groupby first. Then random queries
+at random levels are timed both ways, as single cells ("Texas House Democrats")
+and as breakdowns along one dimension ("Texas, by party").
+
+Run from the repo root: python benchmarks/bench_cube.py [--queries 2000]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from congress_data import CongressPartition  # noqa: E402
+from cube import DIMENSIONS, MEASURES, AggregationCube  # noqa: E402
+from schema import NOT_APPLICABLE  # noqa: E402
+
+CONGRESS = 115
+
+
+def fact_frames(partition):
+    legislators = partition.legislators_df.rename(columns={'type': 'chamber'})
+    legislators = pd.DataFrame({col: legislators[col].astype(object) for col in ('party', 'chamber', 'state')})
+    legislators['legislator'] = np.arange(len(legislators))
+
+    stats = partition.subject_stats_df
+    stats = stats[stats['bills_sponsored'] != NOT_APPLICABLE]
+    sponsored = legislators.iloc[stats['legislator'].values].reset_index(drop=True)
+    sponsored['subject'] = stats['subject'].astype(object).values
+    sponsored['sponsored'] = stats['bills_sponsored'].values.astype(np.int64)
+    sponsored['enacted'] = np.round(stats['bills_sponsored'].values * stats['pass_rate'].fillna(0).values)
+
+    pairs = partition.cosponsors.csr.tocoo()
+    known = pairs.col < len(legislators)
+    cosponsored = legislators.iloc[pairs.col[known]].reset_index(drop=True)
+    codes = partition.bill_subject_codes[pairs.row[known]]
+    cosponsored['subject'] = np.where(codes >= 0, np.asarray(partition.bill_subjects, dtype=object)[codes], None)
+    cosponsored['cosponsorships'] = 1
+    return legislators, sponsored, cosponsored
+
+
+def groupby(facts, measure, by):
+    """The pandas answer for one rollup level, as a Series over the `by` dimensions."""
+    legislators, sponsored, cosponsored = facts
+    if measure == 'legislators':
+        if 'subject' in by:
+            return sponsored.groupby(list(by))['legislator'].nunique()
+        return legislators.groupby(list(by))['legislator'].size() if by else pd.Series([len(legislators)])
+    frame = cosponsored if measure == 'cosponsorships' else sponsored
+    return frame.groupby(list(by))[measure].sum() if by else pd.Series([frame[measure].sum()])
+
+
+def check(cube, facts):
+    cells = 0
+    for n in range(len(DIMENSIONS) + 1):
+        for by in itertools.combinations(DIMENSIONS, n):
+            for measure in MEASURES:
+                expected = groupby(facts, measure, by)
+                if not by:
+                    assert cube.value(measure) == int(expected.iloc[0]), (measure, by)
+                    cells += 1
+                    continue
+                got = cube.frame(measure, by)
+                expected = expected.reindex(got.index, fill_value=0)
+                assert (got.values == expected.values.astype(np.int64)).all(), (measure, by)
+                cells += len(got)
+    return cells
+
+
+def random_queries(cube, n, seed=0):
+    rng = np.random.RandomState(seed)
+    queries = []
+    for _ in range(n):
+        coords = {}
+        for dim in DIMENSIONS:
+            # each dimension is fixed half the time, otherwise totalled over
+            if rng.rand() < 0.5:
+                labels = cube.labels[dim]
+                coords[dim] = labels[rng.randint(len(labels))]
+        by = [dim for dim in DIMENSIONS if dim not in coords]
+        queries.append((MEASURES[rng.randint(1, len(MEASURES))], coords, by[rng.randint(len(by))] if by else None))
+    return queries
+
+
+def pandas_cell(facts, measure, coords):
+    series = groupby(facts, measure, tuple(coords))
+    if not coords:
+        return int(series.iloc[0])
+    key = tuple(coords.values())
+    return int(series.get(key if len(key) > 1 else key[0], 0))
+
+
+def pandas_breakdown(facts, measure, coords, by):
+    series = groupby(facts, measure, tuple(coords) + (by,))
+    if coords:
+        key, levels = tuple(coords.values()), list(coords)
+        try:
+            series = series.xs(key, level=levels) if len(key) > 1 else series.xs(key[0], level=levels[0])
+        except KeyError:
+            return {}
+    return {label: int(v) for label, v in series.items()}
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    out = [fn(*q) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e6, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cube lookups vs pandas groupbys.')
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    partition = CongressPartition(CONGRESS)
+    start = time.perf_counter()
+    cube = AggregationCube.from_partition(partition)
+    build_ms = (time.perf_counter() - start) * 1e3
+    facts = fact_frames(partition)
+    print(f'cube: shape {cube.shape} x {len(MEASURES)} measures, {cube.nbytes / 2 ** 10:.0f} KB, '
+          f'built in {build_ms:.0f} ms')
+    print(f'every rollup level matches its groupby ({check(cube, facts)} cells)\n')
+
+    queries = random_queries(cube, args.queries)
+    cells = [(measure, coords) for measure, coords, _ in queries]
+    breakdowns = [(measure, coords, by) for measure, coords, by in queries if by is not None]
+
+    cube_cell_us, cube_cells = timed(lambda m, c: cube.value(m, **c), cells)
+    pandas_cell_us, pandas_cells = timed(lambda m, c: pandas_cell(facts, m, c), cells)
+    assert cube_cells == pandas_cells
+    cube_slice_us, cube_slices = timed(lambda m, c, by: cube.breakdown(m, by, **c), breakdowns)
+    pandas_slice_us, pandas_slices = timed(lambda m, c, by: pandas_breakdown(facts, m, c, by), breakdowns)
+    for got, expected in zip(cube_slices, pandas_slices):
+        # the groupby leaves out empty groups, which the cube has as zeros
+        assert {k: v for k, v in got.items() if v} == {k: v for k, v in expected.items() if v}
+
+    print(f"{'query':<12}{'n':>7}{'groupby us':>13}{'cube us':>10}{'speedup':>10}")
+    for label, n, slow, fast in (('cell', len(cells), pandas_cell_us, cube_cell_us),
+                                 ('breakdown', len(breakdowns), pandas_slice_us, cube_slice_us)):
+        print(f'{label:<12}{n:>7}{slow:>13.1f}{fast:>10.2f}{slow / fast:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Worker startup: parse the CSVs vs load the memory-mapped pack.
+
+Every run starts --workers fresh interpreters side by side, the way gunicorn
+forks its workers, and each one loads all the tables and keeps them. Besides the
+load time, each worker's memory is read from /proc/<pid>/smaps_rollup before and
+after loading:
+
+- RSS: resident pages, counting shared ones in full in every worker
+- PSS: resident pages with each shared page split between the processes mapping it
+- USS: pages only this worker has, i.e. what it costs on top of the others
+
+If the tables' pages were shared between workers, PSS and USS would come out
+well under RSS. Builds the pack first if it's missing.
+
+Run from the repo root: python benchmarks/bench_data_pack.py [--runs 3] [--workers 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import data_pack  # noqa: E402
+
+TABLES = ['all_congress_reps', 'overall_sponsorship_aggs', 'sponsorship_by_subj_agg',
+          'bills_and_passage_subject_and_type', 'bills_and_support', 'bill_title_text_for_model']
+
+CHILD = '''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+import data_pack
+
+print('ready', flush=True)
+sys.stdin.readline()
+start = time.perf_counter()
+if {mode!r} == 'csv':
+    tables = [pd.read_csv(os.path.join(data_pack.DATA_DIR, name + '.csv')) for name in {tables!r}]
+else:
+    tables = [data_pack.load_packed_table(name) for name in {tables!r}]
+print(json.dumps({{'seconds': time.perf_counter() - start}}), flush=True)
+# hold on to the tables until the parent has looked
+sys.stdin.readline()
+'''
+
+
+def memory_kb(pid):
+    out = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                out[key] = int(value.split()[0])
+    return {'rss': out['Rss'], 'pss': out['Pss'], 'uss': out['Private_Clean'] + out['Private_Dirty']}
+
+
+def run(mode, workers):
+    code = CHILD.format(root=ROOT, tables=TABLES, mode=mode)
+    procs = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              universal_newlines=True) for _ in range(workers)]
+    try:
+        for p in procs:
+            p.stdout.readline()
+        before = [memory_kb(p.pid) for p in procs]
+        for p in procs:
+            p.stdin.write('load\n')
+            p.stdin.flush()
+        seconds = [json.loads(p.stdout.readline())['seconds'] for p in procs]
+        after = [memory_kb(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.communicate('done\n')
+    # per worker, averaged over the workers
+    delta = {k: sum(a[k] - b[k] for a, b in zip(after, before)) / workers for k in ('rss', 'pss', 'uss')}
+    return dict(delta, seconds=sum(seconds) / workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    if data_pack._read_manifest(data_pack.PACK_DIR) is None:
+        data_pack.build()
+
+    print(f'{args.workers} workers; memory is the increase per worker from loading the tables')
+    print(f"{'path':<6}{'load (ms)':>12}{'RSS (KB)':>11}{'PSS (KB)':>11}{'USS (KB)':>11}")
+    for mode in ('csv', 'pack'):
+        results = [run(mode, args.workers) for _ in range(args.runs)]
+        best = min(results, key=lambda r: r['seconds'])
+        print(f"{mode:<6}{best['seconds'] * 1e3:>12.1f}{best['rss']:>11.0f}{best['pss']:>11.0f}{best['uss']:>11.0f}")
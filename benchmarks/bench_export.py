@@ -0,0 +1,137 @@
+"""Streaming exports: peak memory by table size, and what concurrent exports do to callbacks.
+
+1. Memory: the bills table is repeated 1x, 4x and 16x. Each size is exported
+   twice, once streamed (chunks consumed as they come, as the response does) and
+   once materialized (the whole result built and then formatted). tracemalloc
+   reports the peak for each.
+2. Concurrency: one thread replays page 1 callbacks through the Flask test client
+   and records their latency, while --exports threads keep downloading the full
+   bills CSV from /export/bills, under each --limits cap on concurrent exports.
+
+Run from the repo root: python benchmarks/bench_export.py [--seconds 10]
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import export  # noqa: E402
+from load_test import CONGRESS, callback_request  # noqa: E402
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def memory_rows(partition, fmt):
+    rows = []
+    for copies in (1, 4, 16):
+        bills = pd.concat([partition.bills_df] * copies, ignore_index=True)
+        bigger = SimpleNamespace(bills_df=bills, title_search=partition.title_search)
+
+        def streamed():
+            for _ in export.stream(bigger, 'bills', fmt):
+                pass
+
+        def materialized():
+            whole = pd.concat(export.bill_chunks(bigger, np.arange(len(bills)), chunk_rows=len(bills)))
+            if fmt == 'csv':
+                whole.to_csv(io.StringIO(), index=False)
+            else:
+                whole.to_parquet(io.BytesIO(), index=False)
+
+        rows.append((len(bills), peak_mb(streamed), peak_mb(materialized)))
+    return rows
+
+
+def interactive_latency(app, seconds, n_exports):
+    store = app.congress_data.get(CONGRESS).store
+    leg_ids = [leg_id for leg_id, _ in store.legislators()]
+    stop = threading.Event()
+    exported, rejected = [], []
+
+    def exporter():
+        client = app.server.test_client()
+        while not stop.is_set():
+            # closing the response is what gives the export slot back, as the WSGI server does
+            with client.get(f'/export/bills?congress={CONGRESS}') as response:
+                status, size = response.status_code, len(response.data)
+            if status == 429:
+                rejected.append(1)
+                # a well-behaved client, though sooner than the Retry-After it was given
+                stop.wait(0.5)
+            else:
+                exported.append(size)
+
+    threads = [threading.Thread(target=exporter) for _ in range(n_exports)]
+    for t in threads:
+        t.start()
+    client = app.server.test_client()
+    latencies = []
+    start = time.perf_counter()
+    n = 0
+    while time.perf_counter() - start < seconds:
+        leg_id = leg_ids[n % len(leg_ids)]
+        for output, values in (('legislator-dropdown.options', [CONGRESS, 'Senate', 'All']),
+                               ('tab-1.children', ['tab-1-summary', leg_id, CONGRESS]),
+                               ('legislators-knn-output.children', [leg_id, 10, CONGRESS])):
+            t0 = time.perf_counter()
+            client.post('/_dash-update-component', json=callback_request(app.app, output, values))
+            latencies.append(time.perf_counter() - t0)
+        n += 1
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in threads:
+        t.join()
+    ms = np.array(latencies) * 1e3
+    return (np.percentile(ms, 50), np.percentile(ms, 99), len(ms) / elapsed, sum(exported) / elapsed / 2 ** 20,
+            len(exported), len(rejected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming export memory and concurrency.')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--exports', type=int, nargs='+', default=[0, 1, 2, 4], help='concurrent exporting clients')
+    parser.add_argument('--limits', type=int, nargs='+', default=[4, 1], help='EXPORT_CONCURRENCY values to try')
+    args = parser.parse_args()
+
+    import app
+    partition = app.congress_data.get(CONGRESS)
+    formats = ['csv']
+    try:
+        import pyarrow  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+
+    print(f"{'format':<9}{'rows':>9}{'streamed peak MB':>18}{'materialized peak MB':>22}")
+    for fmt in formats:
+        for n_rows, streamed, materialized in memory_rows(partition, fmt):
+            print(f'{fmt:<9}{n_rows:>9}{streamed:>18.1f}{materialized:>22.1f}')
+
+    for limit in args.limits:
+        app.export_slots = export.ExportSlots(limit)
+        print(f"\nEXPORT_CONCURRENCY={limit}")
+        print(f"{'exporters':>10}{'callback p50 ms':>17}{'p99 ms':>9}{'callbacks/s':>13}{'export MB/s':>13}"
+              f"{'exports':>9}{'429s':>7}")
+        for n_exports in args.exports:
+            p50, p99, rate, mb_s, done, rejected = interactive_latency(app, args.seconds, n_exports)
+            print(f'{n_exports:>10}{p50:>17.2f}{p99:>9.2f}{rate:>13.0f}{mb_s:>13.1f}{done:>9}{rejected:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Ingest throughput on a synthetic bill-status corpus.
+
+Generates --bills fake BILLSTATUS XML files (real legislators, subjects and
+titles from the 115th, plus a realistic amount of actions/committees filler
+the parser has to skip), zips them like the GPO bulk download, and times a full
+ingest over the zip at a few worker counts. Then regenerates the zip with 1% of
+the bills changed and times the incremental run.
+
+The first corpus also has one extra bill, sponsored by someone on no other bill,
+which the second one drops. The incremental run's tables are checked against a
+--full run over the second corpus, so that legislator has to be gone from both.
+
+Run from the repo root: python benchmarks/bench_ingest.py [--bills 5000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data_pack import read_table  # noqa: E402
+from ingest import ingest  # noqa: E402
+
+BILL_TYPES = ['hr', 'hr', 'hr', 's', 's', 'hres', 'sres', 'hjres', 'sjres', 'hconres', 'sconres']
+LONE_SPONSOR = {'bioguide_id': 'X000001', 'name': 'Pat Example', 'party': 'Democrat', 'state': 'DC',
+                'type': 'rep', 'district': '0'}
+
+
+def person_xml(rep, withdrawn=False):
+    party = rep['party'][0]
+    if rep['type'] == 'sen':
+        full_name = f"Sen. {rep['name']} [{party}-{rep['state']}]"
+        district = ''
+    else:
+        full_name = f"Rep. {rep['name']} [{party}-{rep['state']}-{rep['district']}]"
+        district = rep['district']
+    first, _, last = rep['name'].partition(' ')
+    return (f"<item><bioguideId>{rep['bioguide_id']}</bioguideId><fullName>{escape(full_name)}</fullName>"
+            f"<firstName>{escape(first)}</firstName><lastName>{escape(last)}</lastName>"
+            f"<party>{party}</party><state>{rep['state']}</state><district>{district}</district>"
+            f"<sponsorshipWithdrawnDate>{'2018-01-01' if withdrawn else ''}</sponsorshipWithdrawnDate></item>")
+
+
+def bill_xml(rng, number, reps, subjects, titles):
+    bill_type = rng.choice(BILL_TYPES)
+    sponsor = rng.choice(reps)
+    cosponsors = rng.sample(reps, min(len(reps), int(rng.expovariate(1 / 8))))
+    actions = ''.join(
+        f'<item><actionDate>2017-0{1 + i % 9}-1{i % 9}</actionDate><text>Referred to the Committee on '
+        f'{escape(rng.choice(subjects))}.</text><type>IntroReferral</type><sourceSystem><code>9</code>'
+        f'<name>Library of Congress</name></sourceSystem></item>' for i in range(rng.randint(3, 40)))
+    laws = '<laws><item><type>Public Law</type><number>115-1</number></item></laws>' if rng.random() < 0.03 else ''
+    return (f'<?xml version="1.0" encoding="utf-8"?><billStatus><bill>'
+            f'<billNumber>{number}</billNumber><billType>{bill_type.upper()}</billType><congress>115</congress>'
+            f'<title>{escape(rng.choice(titles)[:80])}</title>'
+            f'<actions>{actions}</actions>'
+            f'<sponsors>{person_xml(sponsor)}</sponsors>'
+            f'<cosponsors>{"".join(person_xml(c, rng.random() < 0.02) for c in cosponsors)}</cosponsors>'
+            f'<policyArea><name>{escape(rng.choice(subjects))}</name></policyArea>'
+            f'<titles><item><titleType>Official Title as Introduced</titleType>'
+            f'<title>{escape(rng.choice(titles))}</title></item></titles>'
+            f'{laws}</bill></billStatus>')
+
+
+def make_corpus(path, n_bills, seed=115, changed=(), lone_sponsor=False):
+    rng = random.Random(seed)
+    other = random.Random(seed + 1)
+    reps = read_table('all_congress_reps').astype(str).to_dict('records')
+    bills = read_table('bills_and_support')
+    subjects = sorted(bills['subjects_top_term'].dropna().unique())
+    titles = list(read_table('bill_title_text_for_model')['titles_text'])
+    size = 0
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for number in range(1, n_bills + 1):
+            xml = bill_xml(rng, number, reps, subjects, titles)
+            if number in changed:
+                xml = bill_xml(other, number, reps, subjects, titles)
+            size += len(xml)
+            zf.writestr(f'BILLSTATUS-115-{number}.xml', xml)
+        if lone_sponsor:
+            xml = bill_xml(random.Random(seed), n_bills + 1, [LONE_SPONSOR], subjects, titles)
+            size += len(xml)
+            zf.writestr(f'BILLSTATUS-115-{n_bills + 1}.xml', xml)
+    return size
+
+
+def same_tables(dir_a, dir_b):
+    """Names of the CSVs whose rows differ; bills can come out in a different order, which doesn't count."""
+    differ = []
+    for name in sorted(n for n in os.listdir(dir_a) if n.endswith('.csv')):
+        with open(os.path.join(dir_a, name)) as a, open(os.path.join(dir_b, name)) as b:
+            if sorted(a) != sorted(b):
+                differ.append(name)
+    return differ
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bills', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'BILLSTATUS-115.zip')
+        size = make_corpus(corpus, args.bills, lone_sponsor=True)
+        print(f'{args.bills} synthetic bills, {size / 2 ** 20:.1f} MB of XML\n')
+        print(f"{'workers':>8}{'seconds':>10}{'bills/s':>10}")
+        cores = multiprocessing.cpu_count()
+        out_dir = os.path.join(tmp, 'out')
+        for workers in sorted({1, 2, cores}):
+            start = time.perf_counter()
+            stats = ingest([corpus], out_dir, congress_num=115, workers=workers, full=True)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8}{elapsed:>10.2f}{stats['parsed'] / elapsed:>10.0f}")
+
+        changed = set(random.Random(0).sample(range(1, args.bills + 1), max(1, args.bills // 100)))
+        make_corpus(corpus, args.bills, changed=changed)
+        start = time.perf_counter()
+        stats = ingest([corpus], out_dir, congress_num=115, workers=cores)
+        elapsed = time.perf_counter() - start
+        print(f"\nincremental: {stats['parsed']} changed bills re-applied, {stats['removed']} removed, "
+              f"{stats['unchanged']} untouched, {elapsed:.2f}s including rewriting the tables")
+
+        full_dir = os.path.join(tmp, 'full')
+        ingest([corpus], full_dir, congress_num=115, workers=cores, full=True)
+        differ = same_tables(out_dir, full_dir)
+        assert not differ, f'incremental and --full tables differ: {differ}'
+        print('incremental tables match a --full rebuild')
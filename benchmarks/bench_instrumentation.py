@@ -0,0 +1,40 @@
+"""What the callback instrumentation costs per request, and how close its percentiles are.
+
+Run from the repo root: python benchmarks/bench_instrumentation.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import CallbackMetrics, Histogram  # noqa: E402
+
+N = 200000
+
+
+def per_call_us(fn):
+    return min(timeit.repeat(fn, number=N, repeat=3)) / N * 1e6
+
+
+if __name__ == '__main__':
+    hist = Histogram()
+    print(f'Histogram.record: {per_call_us(lambda: hist.record(random.randrange(1, 10 ** 6))):.2f} us')
+
+    metrics = CallbackMetrics()
+
+    def request():
+        metrics.start('legislator-deep-dive.figure')
+        metrics.finish(1647)
+    print(f'start + finish per callback: {per_call_us(request):.2f} us')
+
+    hist = Histogram()
+    values = [int(random.lognormvariate(8, 1.5)) for _ in range(N)]
+    for v in values:
+        hist.record(v)
+    values.sort()
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(q * len(values)) - 1]
+        print(f'p{q * 100:g}: histogram {hist.percentile(q)} us, exact {exact} us '
+              f'({abs(hist.percentile(q) - exact) / exact:.2%} off)')
+    print(f'{len(hist.counts)} buckets for values up to {hist.max} us')
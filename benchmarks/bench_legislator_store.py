@@ -0,0 +1,94 @@
+"""Per-callback data access: boolean masks over the frames vs LegislatorStore.
+
+Run from the repo root: python benchmarks/bench_legislator_store.py
+"""
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schema  # noqa: E402
+from legislator_store import LegislatorStore  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'data')
+
+congress_reps_df = pd.read_csv(os.path.join(DATA, 'all_congress_reps.csv'))
+overall_sponsorship_df = pd.read_csv(os.path.join(DATA, 'overall_sponsorship_aggs.csv'))
+spons_by_subj_df = pd.read_csv(os.path.join(DATA, 'sponsorship_by_subj_agg.csv'))
+legislators = schema.legislators_table(congress_reps_df, overall_sponsorship_df)
+subject_stats = schema.subject_stats_table(spons_by_subj_df, legislators)
+store = LegislatorStore(legislators, subject_stats)
+
+leg_ids = list(overall_sponsorship_df['bioguide_id'])
+leg_subjects = [(i, store.subject_breakdown(i).subjects[-1]) for i in leg_ids if store.subject_breakdown(i).subjects]
+
+
+# what the callbacks did before the store
+def summary_mask():
+    for leg_id in leg_ids:
+        overall_sponsorship_df.loc[overall_sponsorship_df['bioguide_id'] == leg_id].values[0]
+
+
+def subjects_mask():
+    for leg_id in leg_ids:
+        dff = spons_by_subj_df.loc[spons_by_subj_df['bioguide_id'] == leg_id]
+        dff['subjects_top_term'].unique()
+
+
+def graph_mask():
+    for leg_id, subj in leg_subjects:
+        dff = spons_by_subj_df.loc[spons_by_subj_df['bioguide_id'] == leg_id]
+        dff.loc[dff['subjects_top_term'] == subj]['by_subj_pass_rate']
+
+
+def options_mask():
+    for state in store.states:
+        dff = congress_reps_df.loc[congress_reps_df['type'] == 'rep']
+        dff = dff.loc[dff['state'] == state]
+        [{'label': i, 'value': dff.loc[dff['name'] == i]['bioguide_id'].values[0]} for i in dff['name'].unique()]
+
+
+def summary_store():
+    for leg_id in leg_ids:
+        store.summary(leg_id)
+
+
+def subjects_store():
+    for leg_id in leg_ids:
+        store.subject_breakdown(leg_id).subjects
+
+
+def graph_store():
+    for leg_id, subj in leg_subjects:
+        breakdown = store.subject_breakdown(leg_id)
+        breakdown.pass_rate[breakdown.positions[subj]]
+
+
+def options_store():
+    for state in store.states:
+        store.options('rep', state)
+
+
+CASES = [
+    ('get_summary', summary_mask, summary_store, len(leg_ids)),
+    ('make_deep_dive_chart', subjects_mask, subjects_store, len(leg_ids)),
+    ('render_graph', graph_mask, graph_store, len(leg_subjects)),
+    ('set_legislator_choices_options', options_mask, options_store, len(store.states)),
+]
+
+
+def per_call_us(fn, calls, repeat=5):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) / calls * 1e6
+
+
+if __name__ == '__main__':
+    build = min(timeit.repeat(lambda: LegislatorStore(legislators, subject_stats),
+                              number=1, repeat=3))
+    print(f'store build: {build * 1e3:.1f} ms for {len(store)} legislators\n')
+    print(f"{'callback':<32}{'mask (us)':>12}{'store (us)':>12}{'speedup':>10}")
+    for name, mask_fn, store_fn, calls in CASES:
+        before = per_call_us(mask_fn, calls)
+        after = per_call_us(store_fn, calls)
+        print(f'{name:<32}{before:>12.1f}{after:>12.2f}{before / after:>9.0f}x')
@@ -0,0 +1,119 @@
+"""Memory held per Congress: the frames as read from the CSVs vs schema's compact tables.
+
+Each layout is loaded in a fresh subprocess, which reports how much its resident
+set grew once loading is done and freed memory is trimmed, along with pandas' deep
+memory_usage of what it keeps. Every gunicorn worker holds its own copy, so the
+difference is paid once per worker per Congress.
+
+The numbers depend on the pandas version, and the raw frames on whether they came
+from the data pack (whose text columns share one string object per distinct
+value) or the CSVs, so both are printed first.
+
+Run from the repo root: python benchmarks/bench_memory.py [--congress 115]
+"""
+import argparse
+import ctypes
+import gc
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TABLES = ('all_congress_reps', 'overall_sponsorship_aggs', 'sponsorship_by_subj_agg', 'bills_and_support')
+
+
+def rss_bytes():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def release():
+    # hand freed heap back to the OS, so RSS counts what is kept rather than the peak while loading
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def load(layout, data_dir, head=None):
+    from data_pack import read_table
+    import schema
+
+    pack_dir = os.path.join(data_dir, 'pack')
+    reps, overall, by_subj, bills = (read_table(name, data_dir, pack_dir) for name in TABLES)
+    if head:
+        reps, overall, by_subj, bills = (df.head(head) for df in (reps, overall, by_subj, bills))
+    if layout == 'raw':
+        return reps, overall, by_subj, bills
+    legislators = schema.legislators_table(reps, overall)
+    return legislators, schema.subject_stats_table(by_subj, legislators), schema.bills_table(bills)
+
+
+def source(data_dir):
+    import data_pack
+
+    manifest = data_pack._read_manifest(os.path.join(data_dir, 'pack'))
+    fresh = manifest is not None and all(
+        name in manifest['tables'] and
+        manifest['tables'][name]['source'] == data_pack._source_stamp(os.path.join(data_dir, name + '.csv'))
+        for name in TABLES)
+    return 'the pack' if fresh else 'the CSVs'
+
+
+def measure(layout, congress_num):
+    sys.path.insert(0, ROOT)
+    import schema
+    from congress_data import partition_dir
+
+    data_dir = partition_dir(congress_num)
+    # a small load first, so lazily imported pandas internals aren't counted against either layout
+    load(layout, data_dir, head=50)
+    release()
+    before = rss_bytes()
+    kept = load(layout, data_dir)
+    release()
+    return {'layout': layout, 'rss_bytes': rss_bytes() - before, 'frame_bytes': schema.nbytes(*kept),
+            'rows': sum(len(df) for df in kept), 'columns': sum(len(df.columns) for df in kept)}
+
+
+def run(layout, congress_num):
+    out = subprocess.check_output([sys.executable, __file__, '--child', layout, '--congress', str(congress_num)],
+                                  cwd=ROOT)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-Congress memory of the raw vs compact frames.')
+    parser.add_argument('--congress', type=int, default=115)
+    parser.add_argument('--child', choices=['raw', 'compact'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.congress)))
+        return
+
+    sys.path.insert(0, ROOT)
+    import numpy as np
+    import pandas as pd
+    from congress_data import partition_dir
+
+    print(f'pandas {pd.__version__}, numpy {np.__version__}; tables read from '
+          f'{source(partition_dir(args.congress))}\n')
+    results = [run(layout, args.congress) for layout in ('raw', 'compact')]
+    print(f"{'layout':<10}{'columns':>9}{'rows':>9}{'frames (MB)':>14}{'RSS delta (MB)':>17}")
+    for r in results:
+        print(f"{r['layout']:<10}{r['columns']:>9}{r['rows']:>9}{r['frame_bytes'] / 2 ** 20:>14.2f}"
+              f"{r['rss_bytes'] / 2 ** 20:>17.2f}")
+    raw, compact = results
+    print(f"\nframes {compact['frame_bytes'] / raw['frame_bytes']:.1%} of raw, "
+          f"RSS delta {compact['rss_bytes'] / max(raw['rss_bytes'], 1):.1%} of raw")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Figure renders across several worker processes, with and without the shared cache tier.
+
+Each of --workers processes imports app, as a gunicorn worker would, and asks for
+every legislator's "All" chart. Without SHARED_CACHE_DIR, every worker renders
+every chart. With it, a chart one worker rendered is read from the shared tier by
+the rest. The script prints renders per tier and how long each worker took, and
+times get/put on each tier on its own.
+
+Run from the repo root: python benchmarks/bench_shared_cache.py [--workers 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CONGRESS = 115
+
+
+def worker(shared_dir, order_seed, results):
+    if shared_dir:
+        os.environ['SHARED_CACHE_DIR'] = shared_dir
+    else:
+        os.environ.pop('SHARED_CACHE_DIR', None)
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import numpy as np
+    import app
+
+    leg_ids = [leg_id for leg_id, _ in app.congress_data.get(CONGRESS).store.legislators()]
+    # workers see requests in different orders, as they would behind a load balancer
+    np.random.RandomState(order_seed).shuffle(leg_ids)
+    start = time.perf_counter()
+    for leg_id in leg_ids:
+        app.render_graph(leg_id, 'All', CONGRESS)
+    elapsed = time.perf_counter() - start
+    stats = app.figure_cache.stats()
+    results.put({'seconds': elapsed, 'requests': len(leg_ids), 'local': stats['local'], 'shared': stats.get('shared')})
+
+
+def run(n_workers, shared_dir):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(shared_dir, seed, results)) for seed in range(n_workers)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+
+def tier_latency(shared_dir):
+    sys.path.insert(0, ROOT)
+    from caching import LRUCache, SharedCache
+
+    value = json.dumps({'data': [{'x': list(range(200)), 'y': list(range(200))}]}).encode()
+    keys = [(CONGRESS, 'stamp', f'L{i:06d}', 'All') for i in range(2000)]
+    rows = []
+    for name, cache in (('local', LRUCache(maxsize=4096)), ('shared', SharedCache(os.path.join(shared_dir, 'latency')))):
+        start = time.perf_counter()
+        for k in keys:
+            cache.put(k, value)
+        put_us = (time.perf_counter() - start) / len(keys) * 1e6
+        start = time.perf_counter()
+        for k in keys:
+            cache.get(k)
+        rows.append((name, put_us, (time.perf_counter() - start) / len(keys) * 1e6))
+    return len(value), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Figure renders per worker with and without the shared tier.')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as shared_dir:
+        print(f"{'':<16}{'renders':>9}{'requests':>10}{'local hits':>12}{'shared hits':>13}{'slowest worker s':>18}")
+        for label, directory in (('local only', None), ('local + shared', shared_dir)):
+            out = run(args.workers, directory)
+            renders = sum((r['shared'] or r['local'])['misses'] for r in out)
+            shared_hits = sum(r['shared']['hits'] for r in out) if directory else 0
+            print(f"{label:<16}{renders:>9}{sum(r['requests'] for r in out):>10}"
+                  f"{sum(r['local']['hits'] for r in out):>12}{shared_hits:>13}"
+                  f"{max(r['seconds'] for r in out):>18.2f}")
+
+        size, rows = tier_latency(shared_dir)
+        print(f'\nper call, {size} byte values:')
+        for name, put_us, get_us in rows:
+            print(f'  {name:<8} put {put_us:6.2f} us   get {get_us:6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Similar-legislator index: recall against exact cosine, size and query latency.
+
+Exact neighbours come from cosine similarity over the full legislator x bill
+cosponsorship rows; the index answers from its truncated-SVD embeddings. The default index is 256 dims.
+
+Run from the repo root: python benchmarks/bench_similarity.py
+"""
+import io
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cosponsors import CosponsorMatrix  # noqa: E402
+from data_pack import read_table  # noqa: E402
+from similarity import SimilarityIndex, legislator_vectors  # noqa: E402
+
+KS = (5, 10, 15)
+
+
+def exact_neighbours(vectors, k):
+    sims = (vectors @ vectors.T).toarray()
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1, kind='mergesort')[:, :k]
+
+
+def serialized_kb(index):
+    buf = io.BytesIO()
+    np.savez_compressed(buf, legislator_ids=index.legislator_ids.astype(str),
+                        embeddings=index.embeddings.astype(np.float16))
+    return len(buf.getvalue()) / 1024
+
+
+if __name__ == '__main__':
+    reps = read_table('all_congress_reps')
+    matrix = CosponsorMatrix.from_frame(read_table('bills_and_support'), legislator_ids=reps['bioguide_id'])
+    ids, vectors = legislator_vectors(matrix, reps['bioguide_id'])
+    # legislators without any cosponsorships have no meaningful neighbours
+    active = np.flatnonzero(vectors.getnnz(axis=1))
+    exact = exact_neighbours(vectors, max(KS))
+
+    def exact_query():
+        for row in active:
+            scores = (vectors @ vectors[row].T).toarray().ravel()
+            np.argpartition(-scores, 15)[:15]
+
+    exact_us = min(timeit.repeat(exact_query, number=1, repeat=3)) / len(active) * 1e6
+    print(f'{len(active)} legislators with cosponsorships, {vectors.shape[1]} bills')
+    print(f'exact sparse cosine query: {exact_us:.1f} us\n')
+
+    print(f"{'dims':>6}{'size (KB)':>11}{'query (us)':>12}" + ''.join(f'{f"recall@{k}":>11}' for k in KS))
+    for n_components in (32, 64, 128, 256):
+        index = SimilarityIndex.build(matrix, reps['bioguide_id'], n_components=n_components)
+        recalls = []
+        for k in KS:
+            hits = 0
+            for row in active:
+                found = {index.legislator_index[i] for i, _ in index.query(ids[row], k)}
+                hits += len(found.intersection(exact[row, :k]))
+            recalls.append(hits / (k * len(active)))
+        query_us = min(timeit.repeat(lambda: [index.query(ids[row], 15) for row in active],
+                                     number=1, repeat=5)) / len(active) * 1e6
+        print(f'{n_components:>6}{serialized_kb(index):>11.0f}{query_us:>12.1f}'
+              + ''.join(f'{r:>11.3f}' for r in recalls))
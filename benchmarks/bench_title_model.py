@@ -0,0 +1,70 @@
+"""Title model vs the old KNN text model: size, latency and accuracy.
+
+The KNN model file isn't in the repo, so it's rebuilt here the usual way
+(TfidfVectorizer + KNeighborsClassifier). Both are fit on the same stratified
+75/25 split of bill_title_text_for_model.csv and scored on the held-out part.
+
+Run from the repo root: python benchmarks/bench_title_model.py [--neighbors 5]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data_pack import read_table  # noqa: E402
+from title_model import TitleModel  # noqa: E402
+
+
+def report(name, size_kb, fit_s, single_us, batch_us, y_true, y_pred):
+    print(f'{name:<8}{size_kb:>10.0f}{fit_s:>9.2f}{single_us:>13.1f}{batch_us:>12.1f}'
+          f'{accuracy_score(y_true, y_pred):>8.3f}{balanced_accuracy_score(y_true, y_pred):>10.3f}'
+          f'{f1_score(y_true, y_pred):>8.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--neighbors', type=int, default=5)
+    args = parser.parse_args()
+
+    bill_text = read_table('bill_title_text_for_model')
+    X_train, X_test, y_train, y_test = train_test_split(
+        bill_text['titles_text'], bill_text['enacted_as'], test_size=0.25,
+        stratify=bill_text['enacted_as'], random_state=115)
+    sample = list(X_test[:200])
+
+    print(f'{len(X_train)} train / {len(X_test)} test titles, {y_test.mean():.1%} passed\n')
+    print(f"{'model':<8}{'size (KB)':>10}{'fit (s)':>9}{'single (us)':>13}{'batch (us)':>12}"
+          f"{'acc':>8}{'bal acc':>10}{'F1':>8}")
+
+    start = time.time()
+    knn = make_pipeline(TfidfVectorizer(), KNeighborsClassifier(n_neighbors=args.neighbors))
+    knn.fit(X_train, y_train)
+    fit_s = time.time() - start
+    buf = io.BytesIO()
+    joblib.dump(knn, buf)
+    single = min(timeit.repeat(lambda: [knn.predict(pd.Series([t])) for t in sample[:50]], number=1, repeat=3)) / 50
+    batch = min(timeit.repeat(lambda: knn.predict(X_test), number=1, repeat=3)) / len(X_test)
+    report('knn', len(buf.getvalue()) / 1024, fit_s, single * 1e6, batch * 1e6, y_test, knn.predict(X_test))
+
+    start = time.time()
+    model = TitleModel.train(X_train, y_train)
+    fit_s = time.time() - start
+    buf = io.BytesIO()
+    model.save(buf)
+    single = min(timeit.repeat(lambda: [model.predict(t) for t in sample], number=1, repeat=5)) / len(sample)
+    batch = min(timeit.repeat(lambda: model.predict_many(X_test), number=1, repeat=3)) / len(X_test)
+    report('linear', len(buf.getvalue()) / 1024, fit_s, single * 1e6, batch * 1e6, y_test,
+           model.predict_many(X_test))
+    assert np.array_equal([model.predict(t) for t in sample], model.predict_many(sample))
@@ -0,0 +1,55 @@
+"""Title search: index build time, size and typeahead latency, at one Congress and ~8 Congresses of titles.
+
+Run from the repo root: python benchmarks/bench_title_search.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from title_search import TitleSearchIndex  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'data')
+
+titles_df = pd.read_csv(os.path.join(DATA, 'bill_title_text_for_model.csv'))
+bills_df = pd.read_csv(os.path.join(DATA, 'bills_and_passage_subject_and_type.csv'))
+
+# what someone typing a few searches sends, one keystroke at a time
+SEARCHES = ['veterans health care', 'national police week', 'tax credit', 'opioid', 'social security act',
+            'commemorative coin', 'flood insurance', 'border security', 'a']
+QUERIES = [s[:i] for s in SEARCHES for i in range(1, len(s) + 1)]
+
+
+def tiled(times):
+    # stand-in for several Congresses: the same titles under distinct bill ids
+    frames = [(titles_df.assign(bill_id=titles_df['bill_id'] + f'-{i}'),
+               bills_df.assign(bill_id=bills_df['bill_id'] + f'-{i}')) for i in range(times)]
+    return pd.concat([f[0] for f in frames]), pd.concat([f[1] for f in frames])
+
+
+def run(titles, bills):
+    start = time.perf_counter()
+    index = TitleSearchIndex.from_frames(titles, bills)
+    build = time.perf_counter() - start
+
+    latencies = []
+    for query in QUERIES:
+        for filters in ({}, {'subject': 'Health'}, {'bill_type': 'hr', 'enacted': True}):
+            start = time.perf_counter()
+            index.search(query, k=10, **filters)
+            latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1e3
+    print(f'{len(index):>7} titles: build {build:.2f}s, {index.nbytes / 2 ** 20:.1f} MB, '
+          f'{len(index.vocabulary)} terms; query p50 {np.percentile(latencies, 50):.2f} ms, '
+          f'p99 {np.percentile(latencies, 99):.2f} ms, max {latencies.max():.2f} ms')
+    return index
+
+
+if __name__ == '__main__':
+    index = run(titles_df, bills_df)
+    for bill_id, title, score in index.search('flood insur', k=3):
+        print(f'    {score:5.2f} {bill_id} {title[:80]}')
+    run(*tiled(8))
@@ -0,0 +1,219 @@
+"""In-process load test: drives app.server through /_dash-update-component like a browser would.
+
+Each simulated visitor runs one of two sessions, built up front from a seeded RNG
+so every run replays the same requests:
+
+- page 1: open the page, pick a chamber and state, pick a legislator (which fires the
+  summary tab, deep-dive chart and neighbour list), switch to the similar-legislators
+  tab and back, then change the chart's subject a few times
+- page 3: open the page and submit a bill (title, chamber, subject and cosponsors,
+  drawn from a small pool, so repeats happen as they do in real traffic)
+
+Sessions are spread over --concurrency threads, each with its own Flask test client.
+Per-callback throughput and p50/p99 latency are printed and written as JSON, and
+--compare prints the change against an earlier results file. No network is needed.
+
+Run from the repo root:
+    python benchmarks/load_test.py --sessions 200 --concurrency 4 --label baseline
+    python benchmarks/load_test.py --sessions 200 --concurrency 4 --compare benchmarks/results/<file>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+UPDATE_URL = '/_dash-update-component'
+CONGRESS = 115
+PAGE_3_SHARE = 0.25
+TITLE_POOL = 200
+
+
+def load_app():
+    sys.path.insert(0, ROOT)
+    import app
+    return app
+
+
+def callback_request(dash_app, output, values, state=()):
+    """A /_dash-update-component body for the callback writing `output`, with input and state values in order."""
+    spec = dash_app.callback_map[output]
+    inputs = [dict(i, value=v) for i, v in zip(spec['inputs'], values)]
+    states = [dict(s, value=v) for s, v in zip(spec.get('state', []), state)]
+    if output.startswith('..'):
+        outputs = [dict(zip(('id', 'property'), o.split('.'))) for o in output.strip('.').split('...')]
+    else:
+        outputs = dict(zip(('id', 'property'), output.split('.')))
+    return {'output': output, 'outputs': outputs, 'inputs': inputs, 'state': states,
+            'changedPropIds': [f"{inputs[0]['id']}.{inputs[0]['property']}"] if inputs else []}
+
+
+def page_1_session(rng, store):
+    chamber = rng.choice(['Senate', 'House of Representatives', 'Both'])
+    state = rng.choice(list(store.states) + ['All'])
+    leg_type = {'Senate': 'sen', 'House of Representatives': 'rep'}.get(chamber)
+    legislators = store.legislators(leg_type, None if state == 'All' else state) or store.legislators()
+    leg_id = legislators[rng.randint(len(legislators))][0]
+    knn = int(rng.choice([5, 10, 15]))
+    subjects = list(store.subject_breakdown(leg_id).subjects) if leg_id in store else []
+
+    steps = [
+        ('page-content.children', ['/page-1']),
+        ('legislator-dropdown.options', [CONGRESS, 'Both', 'All']),
+        ('legislator-dropdown.options', [CONGRESS, chamber, 'All']),
+        ('legislator-dropdown.options', [CONGRESS, chamber, state]),
+        # picking a legislator
+        ('legislator-output.children', [leg_id]),
+        ('tab-1.children', ['tab-1-summary', leg_id, CONGRESS]),
+        ('legislator-deep-dive.figure', [leg_id, 'All', CONGRESS]),
+        # over to similar legislators and back
+        ('tab-2.children', ['tab-2-similar-legs']),
+        ('tab-1.children', ['tab-2-similar-legs', leg_id, CONGRESS]),
+        ('legislators-knn-output.children', [leg_id, knn, CONGRESS]),
+        ('tab-1.children', ['tab-1-summary', leg_id, CONGRESS]),
+        ('legislator-deep-dive.figure', [leg_id, 'All', CONGRESS]),
+    ]
+    if subjects:
+        for subj in rng.choice(subjects, size=min(3, len(subjects)), replace=False):
+            steps.append(('legislator-deep-dive.figure', [leg_id, subj, CONGRESS]))
+    return [(output, values, ()) for output, values in steps]
+
+
+def page_3_session(rng, submissions):
+    # picking a chamber only updates the sliders, which happens in the browser
+    submission = submissions[rng.randint(len(submissions))]
+    return [
+        ('page-content.children', ['/page-3'], ()),
+        ('output-container-button.children', [1], ()),
+        ('overall-output.children', [1], submission),
+    ]
+
+
+def make_submission(rng, title, subjects):
+    # (title, chamber, subject, democrats, republicans, independents), in predict_and_tell's State order
+    return (title, rng.choice(['house', 'senate']), rng.choice(subjects), int(rng.randint(0, 40)),
+            int(rng.randint(0, 40)), int(rng.randint(0, 2)))
+
+
+def build_sessions(app, n, seed):
+    rng = np.random.RandomState(seed)
+    store = app.default_congress.store
+    subjects = list(app.available_subjects)
+    pool = [make_submission(rng, title, subjects)
+            for title in rng.choice(app.default_congress.title_search.titles, size=TITLE_POOL, replace=False)]
+    return [page_3_session(rng, pool) if rng.rand() < PAGE_3_SHARE else page_1_session(rng, store)
+            for _ in range(n)]
+
+
+def run_sessions(app, sessions, concurrency):
+    names = {k: v['callback'].__name__ for k, v in app.app.callback_map.items() if 'callback' in v}
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def worker(mine):
+        client = app.server.test_client()
+        local, local_errors = defaultdict(list), defaultdict(int)
+        for session in mine:
+            for output, values, state in session:
+                body = callback_request(app.app, output, values, state)
+                start = time.perf_counter()
+                response = client.post(UPDATE_URL, json=body)
+                local[names[output]].append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    local_errors[names[output]] += 1
+        with lock:
+            for k, v in local.items():
+                latencies[k].extend(v)
+            for k, v in local_errors.items():
+                errors[k] += v
+
+    threads = [threading.Thread(target=worker, args=(sessions[i::concurrency],)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies, errors
+
+
+def summarize(elapsed, latencies, errors):
+    def stats(values, n_errors):
+        ms = np.array(values) * 1e3
+        return {'requests': len(ms), 'errors': n_errors, 'throughput_rps': len(ms) / elapsed,
+                'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+                'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+    everything = [v for values in latencies.values() for v in values]
+    return {'elapsed_s': elapsed, 'total': stats(everything, sum(errors.values())),
+            'callbacks': {name: stats(values, errors.get(name, 0)) for name, values in sorted(latencies.items())}}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(result, baseline=None):
+    print(f"{'callback':<32}{'requests':>9}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          + ('   p50 / p99 vs baseline' if baseline else ''))
+    rows = list(result['callbacks'].items()) + [('TOTAL', result['total'])]
+    for name, s in rows:
+        line = (f"{name:<32}{s['requests']:>9}{s['errors']:>5}{s['throughput_rps']:>9.1f}"
+                f"{s['p50_ms']:>9.2f}{s['p99_ms']:>9.2f}")
+        old = (baseline['callbacks'].get(name) if name != 'TOTAL' else baseline['total']) if baseline else None
+        if old:
+            line += f"   {s['p50_ms'] / old['p50_ms'] - 1:+7.1%} / {s['p99_ms'] / old['p99_ms'] - 1:+7.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process load test of the Dash callbacks.')
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=20, help='sessions run first and not counted')
+    parser.add_argument('--seed', type=int, default=115)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--out', default=None, help=f'results file; defaults to a new file in {RESULTS_DIR}')
+    parser.add_argument('--compare', default=None, help='an earlier results file to diff against')
+    args = parser.parse_args()
+
+    app = load_app()
+    sessions = build_sessions(app, args.warmup + args.sessions, args.seed)
+    if args.warmup:
+        run_sessions(app, sessions[:args.warmup], args.concurrency)
+    elapsed, latencies, errors = run_sessions(app, sessions[args.warmup:], args.concurrency)
+
+    result = summarize(elapsed, latencies, errors)
+    result['meta'] = {'label': args.label, 'commit': git_commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      'sessions': args.sessions, 'warmup': args.warmup, 'concurrency': args.concurrency,
+                      'seed': args.seed, 'python': platform.python_version(), 'machine': platform.machine(),
+                      'cpus': os.cpu_count()}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(result, baseline)
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.label}.json")
+    with open(out, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'\nwrote {out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Hot reload under load: reader threads hammer a partition while its files are rewritten and reloaded.
+
+Two variants of the 115th's tables alternate on disk. In variant B every legislator's
+sponsored count is offset by OFFSET, in both overall_sponsorship_aggs and
+sponsorship_by_subj_agg, so a reader that saw parts of both snapshots would find the
+two tables disagreeing. Each reader takes one snapshot per "request", as the app's
+callbacks do, and checks that they agree.
+
+Run from the repo root: python benchmarks/stress_reload.py [--seconds 20] [--readers 8]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from congress_data import CongressPartition, PartitionCache  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'data')
+CONGRESS = 115
+OFFSET = 100000
+
+
+def write_variant(data_dir, overall, by_subj, offset):
+    # the same one-file-at-a-time os.replace that ingest.write_tables does
+    overall = overall.assign(overall_bills_sponsored=overall['overall_bills_sponsored'] + offset)
+    by_subj = by_subj.copy()
+    counts = pd.to_numeric(by_subj['by_subj_bills_sponsored'], errors='coerce')
+    by_subj.loc[counts.notna(), 'by_subj_bills_sponsored'] = (counts[counts.notna()] + offset).astype(str)
+    for name, frame in (('overall_sponsorship_aggs', overall), ('sponsorship_by_subj_agg', by_subj)):
+        tmp = os.path.join(data_dir, f'.{name}.tmp')
+        frame.to_csv(tmp, index=False)
+        os.replace(tmp, os.path.join(data_dir, name + '.csv'))
+
+
+def check(partition, leg_ids):
+    """One simulated request: returns the variant seen, or raises if the snapshot is torn."""
+    offsets = set()
+    for leg_id in leg_ids:
+        summary = partition.store.summary(leg_id)
+        sponsored = summary[partition.store.summary_columns.index('overall_bills_sponsored')]
+        breakdown = partition.store.subject_breakdown(leg_id)
+        if breakdown.sponsored:
+            offsets.add(breakdown.sponsored[0] >= OFFSET)
+        offsets.add(sponsored >= OFFSET)
+    if len(offsets) > 1:
+        raise AssertionError(f'torn read in snapshot v{partition.version}')
+    return offsets.pop()
+
+
+def main(seconds, readers):
+    overall = pd.read_csv(os.path.join(DATA, 'overall_sponsorship_aggs.csv'), dtype=str)
+    overall['overall_bills_sponsored'] = overall['overall_bills_sponsored'].astype(int)
+    by_subj = pd.read_csv(os.path.join(DATA, 'sponsorship_by_subj_agg.csv'), dtype=str)
+    leg_ids = list(overall['bioguide_id'])
+
+    data_dir = tempfile.mkdtemp(prefix='stress-reload-')
+    try:
+        for name in os.listdir(DATA):
+            if name.endswith('.csv'):
+                shutil.copy(os.path.join(DATA, name), data_dir)
+        cache = PartitionCache(loader=lambda n: CongressPartition(n, data_dir), data_dir=data_dir)
+        cache.get(CONGRESS)
+
+        stop = threading.Event()
+        errors = []
+        requests = [0] * readers
+        latencies = [[] for _ in range(readers)]
+        versions_seen = set()
+
+        def reader(i):
+            rng = np.random.RandomState(i)
+            while not stop.is_set():
+                start = time.perf_counter()
+                partition = cache.get(CONGRESS)
+                try:
+                    check(partition, [leg_ids[j] for j in rng.randint(len(leg_ids), size=20)])
+                except AssertionError as e:
+                    errors.append(str(e))
+                latencies[i].append(time.perf_counter() - start)
+                versions_seen.add(partition.version)
+                requests[i] += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+
+        reloads = skipped = 0
+        deadline = time.time() + seconds
+        offset = 0
+        while time.time() < deadline:
+            offset = OFFSET - offset
+            write_variant(data_dir, overall, by_subj, offset)
+            # what /admin/reload does; None means the files moved under the load and it'll be retried
+            if cache.reload(CONGRESS) is None:
+                skipped += 1
+            else:
+                reloads += 1
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    lat = np.concatenate([np.array(l) for l in latencies]) * 1e3
+    print(f'{sum(requests)} requests from {readers} readers over {seconds}s, {reloads} reloads '
+          f'({skipped} skipped mid-write), {len(versions_seen)} snapshot versions seen')
+    print(f'request latency p50 {np.percentile(lat, 50):.2f} ms, p99 {np.percentile(lat, 99):.2f} ms, '
+          f'max {lat.max():.2f} ms')
+    print(f'{len(errors)} torn reads' + (f': {errors[:3]}' if errors else ''))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+    sys.exit(main(args.seconds, args.readers))
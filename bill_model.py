@@ -0,0 +1,267 @@
+"""Pass prediction from everything page 3 asks for: title, chamber, subject and cosponsors by party.
+
+One logistic regression over a sparse matrix whose columns are
+
+- the title's hashed unigrams and bigrams as TF-IDF (the same features as title_model)
+- the chamber, one-hot
+- the bill's top subject, one-hot
+- log(1 + cosponsors) from each party, and whether both major parties cosponsor
+
+Cosponsors by party come from the cosponsor lists in bills_and_support and the
+party column of all_congress_reps. The bill files don't say who sponsored a bill,
+so the sponsor's party isn't a feature.
+
+`python bill_model.py train` builds the feature matrix (cached on disk under
+assets/features/, keyed on the source files, so a rerun only retrains), picks C and
+class weighting by stratified cross-validation spread over every core, refits on
+everything and writes assets/bill_model.npz. Like title_model, the export is a
+handful of arrays and scoring a bill is a hash per token and a few dot products.
+"""
+import argparse
+import hashlib
+import math
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+from title_model import N_FEATURES, _tfidf, hash_title, hash_titles
+
+MODEL_VERSION = 1
+FEATURES_VERSION = 1
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+MODEL_PATH = os.path.join(ASSETS_DIR, 'bill_model.npz')
+FEATURE_CACHE_DIR = os.path.join(ASSETS_DIR, 'features')
+SOURCES = ('bills_and_support', 'bills_and_passage_subject_and_type', 'bill_title_text_for_model', 'all_congress_reps')
+CHAMBERS = ('house', 'senate')
+PARTIES = ('Democrat', 'Republican', 'Independent')
+NUMERIC_FEATURES = ('log_democrats', 'log_republicans', 'log_independents', 'bipartisan')
+PARAM_GRID = {'C': [0.1, 0.3, 1.0, 3.0, 10.0], 'class_weight': ['balanced', None]}
+
+
+def chamber_of(bill_type):
+    return 'senate' if str(bill_type).startswith('s') else 'house'
+
+
+def numeric_features(democrats, republicans, independents):
+    democrats, republicans, independents = (np.asarray(a, dtype=np.float64)
+                                            for a in (democrats, republicans, independents))
+    return np.column_stack([np.log1p(democrats), np.log1p(republicans), np.log1p(independents),
+                            (democrats > 0) & (republicans > 0)]).astype(np.float32)
+
+
+def feature_matrix(counts, idf, chamber_codes, subject_codes, n_subjects, numeric):
+    """[title TF-IDF | chamber | subject | numeric], one row per bill; subject code -1 is none."""
+    n = counts.shape[0]
+    rows = np.arange(n)
+    chamber = sparse.csr_matrix((np.ones(n, dtype=np.float32), (rows, chamber_codes)), shape=(n, len(CHAMBERS)))
+    known = subject_codes >= 0
+    subject = sparse.csr_matrix((np.ones(known.sum(), dtype=np.float32), (rows[known], subject_codes[known])),
+                                shape=(n, n_subjects))
+    return sparse.hstack([_tfidf(counts, idf), chamber, subject, sparse.csr_matrix(numeric)], format='csr')
+
+
+def training_frame(data_dir):
+    """One row per bill: bill_id, title, chamber, subject, cosponsors from each party, enacted."""
+    import pandas as pd
+
+    from cosponsors import CosponsorMatrix
+    from data_pack import read_table
+
+    pack_dir = os.path.join(data_dir, 'pack')
+    support = read_table('bills_and_support', data_dir, pack_dir)
+    bills = read_table('bills_and_passage_subject_and_type', data_dir, pack_dir)[['bill_id', 'bill_type',
+                                                                                  'subjects_top_term', 'enacted_as']]
+    titles = read_table('bill_title_text_for_model', data_dir, pack_dir)[['bill_id', 'titles_text']]
+    reps = read_table('all_congress_reps', data_dir, pack_dir)
+
+    cosponsors = CosponsorMatrix.from_frame(support, legislator_ids=reps['bioguide_id'])
+    parties = pd.Series(reps['party'].values, index=reps['bioguide_id']).reindex(cosponsors.legislator_ids)
+    by_party = cosponsors.csr @ np.column_stack([(parties == p).values for p in PARTIES]).astype(np.int32)
+    counts = pd.DataFrame(np.asarray(by_party), columns=['democrats', 'republicans', 'independents'])
+    counts['bill_id'] = cosponsors.bill_ids
+
+    frame = bills.merge(titles, on='bill_id', how='left').merge(counts, on='bill_id', how='left')
+    frame['titles_text'] = frame['titles_text'].fillna('')
+    for col in ('democrats', 'republicans', 'independents'):
+        frame[col] = frame[col].fillna(0).astype(np.int32)
+    frame['chamber'] = frame['bill_type'].map(chamber_of)
+    return frame
+
+
+def source_key(data_dir, n_features):
+    stats = [os.stat(os.path.join(data_dir, name + '.csv')) for name in SOURCES]
+    stamp = repr((FEATURES_VERSION, n_features, [(s.st_size, s.st_mtime_ns) for s in stats]))
+    return hashlib.blake2b(stamp.encode(), digest_size=8).hexdigest()
+
+
+def build_features(data_dir, n_features=N_FEATURES, cache_dir=FEATURE_CACHE_DIR):
+    """(X, y, idf, subjects), read from the cache when the source files haven't changed."""
+    path = os.path.join(cache_dir, f'features_{source_key(data_dir, n_features)}.npz')
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as f:
+            X = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            return X, f['y'], f['idf'], list(f['subjects']), True
+
+    import pandas as pd
+
+    frame = training_frame(data_dir)
+    counts = hash_titles(frame['titles_text'], n_features)
+    doc_freq = np.bincount(counts.indices, minlength=n_features)
+    idf = (np.log((1 + counts.shape[0]) / (1 + doc_freq)) + 1).astype(np.float32)
+    subject_codes, subjects = pd.factorize(frame['subjects_top_term'], sort=True)
+    chamber_codes = frame['chamber'].map({c: i for i, c in enumerate(CHAMBERS)}).values
+    X = feature_matrix(counts, idf, chamber_codes, subject_codes, len(subjects),
+                       numeric_features(frame['democrats'], frame['republicans'], frame['independents']))
+    y = frame['enacted_as'].values.astype(np.int8)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, data=X.data, indices=X.indices, indptr=X.indptr, shape=np.array(X.shape), y=y, idf=idf,
+             subjects=np.array(list(subjects), dtype=str))
+    os.replace(tmp, path)
+    return X, y, idf, list(subjects), False
+
+
+class BillModel(object):
+
+    def __init__(self, idf, title_coef, chamber_coef, subjects, subject_coef, numeric_coef, intercept,
+                 threshold=0.5):
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.title_coef = np.asarray(title_coef, dtype=np.float32)
+        self.chamber_coef = dict(zip(CHAMBERS, np.asarray(chamber_coef, dtype=np.float64).tolist()))
+        self.subject_coef = dict(zip(subjects, np.asarray(subject_coef, dtype=np.float64).tolist()))
+        self.numeric_coef = np.asarray(numeric_coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.threshold = threshold
+        self.n_features = len(self.idf)
+
+    @classmethod
+    def from_coef(cls, coef, intercept, idf, subjects, threshold=0.5):
+        # split a coefficient vector laid out like feature_matrix's columns
+        n, s = len(idf), len(subjects)
+        return cls(idf, coef[:n], coef[n:n + len(CHAMBERS)], subjects, coef[n + len(CHAMBERS):n + len(CHAMBERS) + s],
+                   coef[n + len(CHAMBERS) + s:], intercept, threshold)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path, allow_pickle=False) as f:
+            if int(f['version']) != MODEL_VERSION:
+                raise ValueError(f'{path} is bill model version {int(f["version"])}, expected {MODEL_VERSION}')
+            n_features = int(f['n_features'])
+            # as in title_model, only buckets seen in training are stored
+            idf = np.full(n_features, float(f['default_idf']), dtype=np.float32)
+            title_coef = np.zeros(n_features, dtype=np.float32)
+            idf[f['buckets']] = f['idf']
+            title_coef[f['buckets']] = f['title_coef']
+            return cls(idf, title_coef, f['chamber_coef'], list(f['subjects']), f['subject_coef'],
+                       f['numeric_coef'], f['intercept'], float(f['threshold']))
+
+    def save(self, path=MODEL_PATH):
+        default_idf = self.idf.max()
+        buckets = np.flatnonzero((self.title_coef != 0) | (self.idf != default_idf)).astype(np.uint32)
+        np.savez_compressed(path, version=MODEL_VERSION, n_features=self.n_features, default_idf=default_idf,
+                            buckets=buckets, idf=self.idf[buckets], title_coef=self.title_coef[buckets],
+                            chamber_coef=np.array([self.chamber_coef[c] for c in CHAMBERS], dtype=np.float32),
+                            subjects=np.array(list(self.subject_coef), dtype=str),
+                            subject_coef=np.array(list(self.subject_coef.values()), dtype=np.float32),
+                            numeric_coef=self.numeric_coef.astype(np.float32), intercept=self.intercept,
+                            threshold=self.threshold)
+
+    def decision_function(self, title, chamber, subject=None, democrats=0, republicans=0, independents=0):
+        buckets = hash_title(title, self.n_features)
+        weights = self.idf[buckets]
+        norm = np.sqrt(np.dot(weights, weights))
+        score = float(np.dot(weights, self.title_coef[buckets]) / norm) if norm else 0.0
+        numeric = numeric_features([democrats or 0], [republicans or 0], [independents or 0])[0]
+        return (score + self.chamber_coef.get(chamber, 0.0) + self.subject_coef.get(subject, 0.0) +
+                float(np.dot(numeric, self.numeric_coef)) + self.intercept)
+
+    def predict_proba(self, title, chamber, subject=None, democrats=0, republicans=0, independents=0):
+        return 1 / (1 + math.exp(-self.decision_function(title, chamber, subject, democrats, republicans,
+                                                         independents)))
+
+    def predict(self, title, chamber, subject=None, democrats=0, republicans=0, independents=0):
+        return int(self.predict_proba(title, chamber, subject, democrats, republicans, independents) >=
+                   self.threshold)
+
+    def predict_proba_many(self, titles, chambers, subjects, democrats, republicans, independents):
+        title_scores = _tfidf(hash_titles(titles, self.n_features), self.idf) @ self.title_coef
+        scores = (title_scores + np.array([self.chamber_coef.get(c, 0.0) for c in chambers]) +
+                  np.array([self.subject_coef.get(s, 0.0) for s in subjects]) +
+                  numeric_features(democrats, republicans, independents) @ self.numeric_coef + self.intercept)
+        return 1 / (1 + np.exp(-scores))
+
+
+def search(X, y, folds=5, jobs=-1, seed=115):
+    """Grid search over PARAM_GRID with stratified CV, folds and candidates spread over `jobs` processes."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    grid = GridSearchCV(LogisticRegression(solver='liblinear'), PARAM_GRID, cv=cv, n_jobs=jobs,
+                        scoring={'average_precision': 'average_precision', 'roc_auc': 'roc_auc'},
+                        refit='average_precision')
+    grid.fit(X, y)
+    return grid
+
+
+def title_only_score(X, y, n_features, params, folds=5, jobs=-1, seed=115):
+    # the same folds and settings on just the title columns, to see what the rest adds
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    return cross_val_score(LogisticRegression(solver='liblinear', **params), X[:, :n_features], y, cv=cv,
+                           n_jobs=jobs, scoring='average_precision').mean()
+
+
+def prediction_latency(model, frame, n=2000):
+    rows = frame.head(n)
+    args = list(zip(rows['titles_text'], rows['chamber'], rows['subjects_top_term'], rows['democrats'],
+                    rows['republicans'], rows['independents']))
+    start = time.perf_counter()
+    for a in args:
+        model.predict_proba(*a)
+    single_us = (time.perf_counter() - start) / len(args) * 1e6
+    start = time.perf_counter()
+    model.predict_proba_many(*zip(*args))
+    batch_us = (time.perf_counter() - start) / len(args) * 1e6
+    return single_us, batch_us
+
+
+if __name__ == '__main__':
+    from data_pack import DATA_DIR
+
+    parser = argparse.ArgumentParser(description='Train the page 3 pass-prediction model.')
+    parser.add_argument('command', choices=['train'])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--out', default=MODEL_PATH)
+    parser.add_argument('--features', type=int, default=N_FEATURES, help='number of title hash buckets, a power of 2')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1, help='processes for the search; -1 is every core')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    X, y, idf, subjects, cached = build_features(args.data_dir, args.features)
+    features_s = time.perf_counter() - start
+    print(f"features: {X.shape[0]} bills x {X.shape[1]} columns, {X.nnz} non-zeros, "
+          f"{'read from cache' if cached else 'built and cached'} in {features_s:.2f}s")
+
+    start = time.perf_counter()
+    grid = search(X, y, args.folds, args.jobs)
+    search_s = time.perf_counter() - start
+    best = grid.best_index_
+    print(f"search: {len(grid.cv_results_['params'])} settings x {args.folds} folds in {search_s:.2f}s; "
+          f"best {grid.best_params_}: average precision {grid.cv_results_['mean_test_average_precision'][best]:.3f}, "
+          f"ROC AUC {grid.cv_results_['mean_test_roc_auc'][best]:.3f}")
+    print(f'title only, same settings: average precision '
+          f'{title_only_score(X, y, args.features, grid.best_params_, args.folds, args.jobs):.3f}')
+
+    clf = grid.best_estimator_
+    model = BillModel.from_coef(clf.coef_.ravel(), clf.intercept_[0], idf, subjects)
+    model.save(args.out)
+    single_us, batch_us = prediction_latency(model, training_frame(args.data_dir))
+    print(f'wrote {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB); training took '
+          f'{features_s + search_s:.2f}s; prediction {single_us:.0f} us one at a time, {batch_us:.1f} us batched')
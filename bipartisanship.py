@@ -0,0 +1,126 @@
+"""Bipartisanship metrics over the cosponsor matrix.
+
+Every cosponsor is mapped to an integer party code once, so the three metric
+families are a couple of sparse products and bincounts over a whole Congress:
+
+- per bill: cosponsors from each party, and polarity, |D - R| / (D + R) over the
+  two major parties (0 is an even split, 1 is one party only)
+- per legislator: the share of the people they cosponsored alongside who were
+  from another party
+- per subject: mean polarity and the share of bills that were bipartisan
+
+bills_and_support only lists cosponsors, so the sponsor's own party isn't counted.
+"""
+import numpy as np
+import pandas as pd
+
+from cosponsors import CosponsorMatrix
+
+MAJOR_PARTIES = ('Democrat', 'Republican')
+# a bill is bipartisan when the smaller side brings at least 20% of its major-party cosponsors
+BIPARTISAN_POLARITY = 0.6
+
+
+class BipartisanshipMetrics(object):
+
+    def __init__(self, cosponsors, legislator_parties, bill_subjects=None):
+        """cosponsors is a CosponsorMatrix, legislator_parties maps bioguide_id -> party
+        and bill_subjects, if given, is aligned with cosponsors.bill_ids."""
+        self.cosponsors = cosponsors
+        party_names = pd.Series(cosponsors.legislator_ids).map(legislator_parties).fillna('Unknown')
+        self.party_codes, parties = pd.factorize(party_names, sort=True)
+        self.parties = tuple(parties)
+        n_parties = len(self.parties)
+
+        # legislator x party one-hot, so X @ onehot counts each party's cosponsors per bill
+        onehot = np.zeros((len(self.party_codes), n_parties), dtype=np.int32)
+        onehot[np.arange(len(self.party_codes)), self.party_codes] = 1
+        self.bill_party_counts = np.asarray(cosponsors.csr.astype(np.int32) @ onehot)
+
+        dem, rep = (self._party_column(self.bill_party_counts, p) for p in MAJOR_PARTIES)
+        major = dem + rep
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.bill_polarity = np.where(major > 0, np.abs(dem - rep) / major, np.nan).astype(np.float32)
+
+        # for each legislator, the party makeup of everyone on the bills they cosponsored (themselves included)
+        alongside = np.asarray(cosponsors.csc.T.astype(np.int32) @ self.bill_party_counts)
+        n_bills = cosponsors.cosponsorship_counts()
+        same = alongside[np.arange(len(self.party_codes)), self.party_codes] - n_bills
+        others = alongside.sum(axis=1) - n_bills
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.cross_party_rate = np.where(others > 0, (others - same) / others, np.nan).astype(np.float32)
+
+        self.subjects = ()
+        if bill_subjects is not None:
+            codes, subjects = pd.factorize(pd.Series(bill_subjects), sort=True)
+            self.subjects = tuple(subjects)
+            self.subject_index = {s: i for i, s in enumerate(self.subjects)}
+            rated = (codes >= 0) & ~np.isnan(self.bill_polarity)
+            n = len(self.subjects)
+            self.subject_bill_counts = np.bincount(codes[rated], minlength=n)
+            polarity_sum = np.bincount(codes[rated], weights=self.bill_polarity[rated], minlength=n)
+            bipartisan = np.bincount(codes[rated], weights=self.bill_polarity[rated] <= BIPARTISAN_POLARITY,
+                                     minlength=n)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.subject_polarity = polarity_sum / self.subject_bill_counts
+                self.subject_bipartisan_share = bipartisan / self.subject_bill_counts
+
+    @classmethod
+    def from_frames(cls, bills_df, reps_df, cosponsors=None):
+        if cosponsors is None:
+            cosponsors = CosponsorMatrix.from_frame(bills_df, legislator_ids=reps_df['bioguide_id'])
+        parties = dict(zip(reps_df['bioguide_id'], reps_df['party']))
+        return cls(cosponsors, parties, bills_df['subjects_top_term'].values)
+
+    def _party_column(self, counts, party):
+        if party not in self.parties:
+            return np.zeros(len(counts), dtype=counts.dtype)
+        return counts[:, self.parties.index(party)]
+
+    def bill(self, bill_id):
+        row = self.cosponsors.bill_index[bill_id]
+        counts = dict(zip(self.parties, self.bill_party_counts[row].tolist()))
+        return {'bill_id': bill_id, 'party_counts': counts, 'polarity': float(self.bill_polarity[row])}
+
+    def legislator(self, leg_id):
+        col = self.cosponsors.legislator_index[leg_id]
+        return {'bioguide_id': leg_id, 'party': self.parties[self.party_codes[col]],
+                'bills_cosponsored': int(self.cosponsors.cosponsorship_counts()[col]),
+                'cross_party_rate': float(self.cross_party_rate[col])}
+
+    def subject(self, subject):
+        i = self.subject_index[subject]
+        return {'subject': subject, 'bills': int(self.subject_bill_counts[i]),
+                'polarity': float(self.subject_polarity[i]),
+                'bipartisan_share': float(self.subject_bipartisan_share[i])}
+
+    def bills_frame(self):
+        frame = pd.DataFrame(self.bill_party_counts, columns=list(self.parties))
+        frame.insert(0, 'bill_id', self.cosponsors.bill_ids)
+        frame['polarity'] = self.bill_polarity
+        return frame
+
+    def legislators_frame(self):
+        return pd.DataFrame({
+            'bioguide_id': self.cosponsors.legislator_ids,
+            'party': np.asarray(self.parties, dtype=object)[self.party_codes],
+            'bills_cosponsored': self.cosponsors.cosponsorship_counts(),
+            'cross_party_rate': self.cross_party_rate,
+        })
+
+    def subjects_frame(self):
+        return pd.DataFrame({
+            'subject': list(self.subjects),
+            'bills': self.subject_bill_counts,
+            'polarity': self.subject_polarity,
+            'bipartisan_share': self.subject_bipartisan_share,
+        }).sort_values('polarity').reset_index(drop=True)
+
+    def summary(self):
+        # headline numbers for one Congress, for charting over time
+        rated = ~np.isnan(self.bill_polarity)
+        return {'bills_rated': int(rated.sum()),
+                'mean_polarity': float(self.bill_polarity[rated].mean()) if rated.any() else float('nan'),
+                'bipartisan_share': float((self.bill_polarity[rated] <= BIPARTISAN_POLARITY).mean())
+                if rated.any() else float('nan'),
+                'median_cross_party_rate': float(np.nanmedian(self.cross_party_rate))}
@@ -0,0 +1,288 @@
+"""Caches for rendered callback results.
+
+LRUCache is the in-process tier, one per gunicorn worker. SharedCache is a
+fixed-size hash table in an mmap'd file (under /dev/shm it never touches disk)
+that every worker on the box opens, so a result computed by one worker is a hit
+for the rest. TieredCache puts the two together: local first, then shared, then
+compute and fill both.
+
+Both tiers have get/put/clear/stats, so either can stand in for the other.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """Bounded, thread-safe LRU mapping with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # computed outside the lock; two threads missing at once just both compute
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+# file header: magic, layout version, sets, ways, slot bytes, then deployment-wide counters
+_HEADER = struct.Struct('<4sIIII4xQQQQQ')
+_HEADER_SIZE = 64
+_MAGIC = b'CBSC'
+_LAYOUT_VERSION = 1
+# slot header: key digest, last use (from the clock counter), value length (0 = empty)
+_SLOT = struct.Struct('<16sQI4x')
+_COUNTERS = ('clock', 'hits', 'misses', 'evictions', 'puts')
+
+
+def key_digest(key):
+    # keys are tuples of str/int, whose repr is stable across processes (unlike hash())
+    return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).digest()
+
+
+def code_version(paths, extra=()):
+    """A short digest of the files' contents (and any extra strings, like library versions)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    for s in extra:
+        digest.update(s.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SharedCache(object):
+    """Bytes values in a set-associative table in a shared mmap, LRU within each set.
+
+    Every process opening the same path sees the same entries. A value longer than
+    a slot isn't stored. An flock guards each lookup; they are a few memcpys, so
+    workers rarely wait on each other.
+
+    The file outlives the processes, so keys are stored under `namespace`: give it
+    something that changes with the code computing the values (see code_version),
+    and a deploy won't be handed what the old code put there.
+    """
+
+    def __init__(self, path, size_mb=64, slot_kb=16, ways=8, namespace=''):
+        self.path = path
+        self.namespace = namespace
+        self.slot_bytes = slot_kb * 1024
+        self.ways = ways
+        self.n_sets = max(1, (size_mb * 2 ** 20 - _HEADER_SIZE) // (self.slot_bytes * ways))
+        size = _HEADER_SIZE + self.n_sets * ways * self.slot_bytes
+        # per-process counters; the ones in the header cover every process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.too_large = 0
+        self._lock = threading.Lock()
+
+        self._fd = self._open(size)
+        self._mm = mmap.mmap(self._fd, size)
+
+    def _open(self, size):
+        expected = (_MAGIC, _LAYOUT_VERSION, self.n_sets, self.ways, self.slot_bytes)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                    # someone replaced the file while we waited for the lock; open theirs
+                    continue
+                header = os.pread(fd, _HEADER.size, 0)
+                if len(header) == _HEADER.size and _HEADER.unpack(header)[:5] == expected:
+                    return os.dup(fd)
+                if len(header) == 0:
+                    # just created by us, and nobody can have mapped it yet
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, _HEADER.pack(*expected, 0, 0, 0, 0, 0), 0)
+                    return os.dup(fd)
+                # laid out differently, by a process that may still be running with it mapped: shrinking it
+                # under them would SIGBUS them, so a new empty file takes over the path and they keep the old one
+                return self._replace(size, expected)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _replace(self, size, expected):
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, _HEADER.pack(*expected, 0, 0, 0, 0, 0), 0)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    @contextmanager
+    def _locked(self):
+        # threads share the fd, and flock doesn't tell them apart, so they queue on a lock first
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _counters(self):
+        return dict(zip(_COUNTERS, _HEADER.unpack_from(self._mm, 0)[5:]))
+
+    def _bump(self, counters, **changes):
+        for k, v in changes.items():
+            counters[k] += v
+        _HEADER.pack_into(self._mm, 0, _MAGIC, _LAYOUT_VERSION, self.n_sets, self.ways, self.slot_bytes,
+                          *(counters[k] for k in _COUNTERS))
+
+    def _slots(self, digest):
+        first = _HEADER_SIZE + (int.from_bytes(digest[:8], 'little') % self.n_sets) * self.ways * self.slot_bytes
+        return range(first, first + self.ways * self.slot_bytes, self.slot_bytes)
+
+    def __len__(self):
+        with self._locked():
+            return sum(1 for offset in range(_HEADER_SIZE, len(self._mm), self.slot_bytes)
+                       if _SLOT.unpack_from(self._mm, offset)[2])
+
+    def get(self, key, default=None):
+        digest = key_digest((self.namespace, key))
+        with self._locked():
+            counters = self._counters()
+            for offset in self._slots(digest):
+                slot_digest, _, length = _SLOT.unpack_from(self._mm, offset)
+                if length and slot_digest == digest:
+                    value = self._mm[offset + _SLOT.size:offset + _SLOT.size + length]
+                    _SLOT.pack_into(self._mm, offset, digest, counters['clock'], length)
+                    self._bump(counters, clock=1, hits=1)
+                    self.hits += 1
+                    return value
+            self._bump(counters, misses=1)
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if len(value) > self.slot_bytes - _SLOT.size:
+            # rare, and cheaper to recompute than to chain slots
+            self.too_large += 1
+            return
+        digest = key_digest((self.namespace, key))
+        with self._locked():
+            counters = self._counters()
+            victim, victim_used, evicting = None, None, False
+            for offset in self._slots(digest):
+                slot_digest, last_used, length = _SLOT.unpack_from(self._mm, offset)
+                if not length or slot_digest == digest:
+                    victim, evicting = offset, False
+                    break
+                if victim is None or last_used < victim_used:
+                    victim, victim_used, evicting = offset, last_used, True
+            self._mm[victim + _SLOT.size:victim + _SLOT.size + len(value)] = value
+            _SLOT.pack_into(self._mm, victim, digest, counters['clock'], len(value))
+            self._bump(counters, clock=1, puts=1, evictions=int(evicting))
+            self.evictions += evicting
+
+    def clear(self):
+        with self._locked():
+            self._mm[_HEADER_SIZE:] = bytes(len(self._mm) - _HEADER_SIZE)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._locked():
+            counters = self._counters()
+        shared_lookups = counters['hits'] + counters['misses']
+        return {'path': self.path, 'slots': self.n_sets * self.ways, 'slot_bytes': self.slot_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'too_large': self.too_large,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                # every process using the file, since it was created
+                'all_workers': {'hits': counters['hits'], 'misses': counters['misses'],
+                                'evictions': counters['evictions'], 'puts': counters['puts'],
+                                'hit_rate': counters['hits'] / shared_lookups if shared_lookups else 0.0}}
+
+
+class TieredCache(object):
+    """An in-process LRU in front of an optional SharedCache.
+
+    The shared tier holds bytes, so values go through dumps/loads on the way in
+    and out; the local tier keeps them loaded.
+    """
+
+    def __init__(self, local, shared=None, dumps=None, loads=None):
+        self.local = local
+        self.shared = shared
+        self.dumps = dumps
+        self.loads = loads
+
+    def get_or_compute(self, key, compute):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                value = self.loads(data)
+            else:
+                # two workers missing at once both compute, like the local tier
+                value = compute()
+                self.shared.put(key, self.dumps(value))
+        else:
+            value = compute()
+        self.local.put(key, value)
+        return value
+
+    def clear(self):
+        # only this worker's tier; the shared one is cleared explicitly
+        self.local.clear()
+
+    def stats(self):
+        stats = {'local': self.local.stats()}
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
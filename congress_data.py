@@ -0,0 +1,314 @@
+"""Per-Congress data partitions, loaded on first use and kept in a size-bounded LRU.
+
+Each Congress lives in its own directory, assets/data/<congress_num>/, holding
+the same CSVs (and optional pack) the app has always read. The 115th predates
+the split and still sits directly in assets/data/.
+
+A partition is an immutable snapshot of its Congress's files. Reloading builds a
+new one off to the side and swaps it in with a single dict assignment, so a
+request holds either the old snapshot or the new one for as long as it runs.
+The old one is freed when the last request holding it returns.
+
+`python congress_data.py build` builds the pack, similarity index, neighbour
+table and page 2 leaderboards for every Congress on disk.
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import schema
+from bipartisanship import BipartisanshipMetrics
+from cosponsors import CosponsorMatrix
+from cube import AggregationCube
+from data_pack import DATA_DIR, read_table
+from legislator_store import LegislatorStore
+from similarity import SOURCES as SIMILARITY_SOURCES
+from similarity import NeighbourTable, SimilarityIndex, built_from, index_path, neighbours_path
+from title_search import TitleSearchIndex
+
+CONGRESS_LABELS = {
+    113: '113th (Jan 2013 - Jan 2015)',
+    114: '114th (Jan 2015 - Jan 2017)',
+    115: '115th (Jan 2017 - Jan 2019)',
+    116: '116th (Jan 2019 - Jan 2021)',
+    117: '117th (Jan 2021 - Jan 2023)',
+    118: '118th (Jan 2023 - Jan 2025)',
+}
+LEGACY_CONGRESS = 115
+DEFAULT_BUDGET_MB = 256
+
+
+def partition_dir(congress_num, data_dir=DATA_DIR):
+    path = os.path.join(data_dir, str(congress_num))
+    if congress_num == LEGACY_CONGRESS and not os.path.isdir(path):
+        return data_dir
+    return path
+
+
+def available_congresses(data_dir=DATA_DIR):
+    found = [n for n in CONGRESS_LABELS
+             if os.path.exists(os.path.join(partition_dir(n, data_dir), 'all_congress_reps.csv'))]
+    for name in os.listdir(data_dir):
+        if name.isdigit() and int(name) not in found and \
+                os.path.exists(os.path.join(data_dir, name, 'all_congress_reps.csv')):
+            found.append(int(name))
+    return sorted(found)
+
+
+def data_stamp(data_dir):
+    """Size and mtime of every file a partition reads; changes whenever any of them is replaced."""
+    paths = [os.path.join(data_dir, name) for name in sorted(os.listdir(data_dir)) if name.endswith('.csv')]
+    return tuple((path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths)
+
+
+def congress_label(congress_num):
+    return CONGRESS_LABELS.get(congress_num, f'{congress_num}th')
+
+
+class CongressPartition(object):
+    """Everything page 1 needs for one Congress."""
+
+    def __init__(self, congress_num, data_dir=DATA_DIR):
+        self.congress_num = congress_num
+        self.data_dir = partition_dir(congress_num, data_dir)
+        # taken before reading, so a file replaced mid-load shows up as stale on the next check
+        self.source_stamp = data_stamp(self.data_dir)
+        # set by PartitionCache; anything cached per snapshot should key on it
+        self.version = 0
+        pack_dir = os.path.join(self.data_dir, 'pack')
+
+        # the raw frames only live through __init__; what's kept is in schema's compact form
+        reps = read_table('all_congress_reps', self.data_dir, pack_dir)
+        self.legislators_df = schema.legislators_table(
+            reps, read_table('overall_sponsorship_aggs', self.data_dir, pack_dir))
+        self.subject_stats_df = schema.subject_stats_table(
+            read_table('sponsorship_by_subj_agg', self.data_dir, pack_dir), self.legislators_df)
+        bills = read_table('bills_and_support', self.data_dir, pack_dir)
+        self.cosponsors = CosponsorMatrix.from_frame(bills, legislator_ids=reps['bioguide_id'])
+        self.bills_df = schema.bills_table(bills)
+        del reps, bills
+        # read now, not on the first search, so titles come from the same files as everything else
+        self.titles_df = read_table('bill_title_text_for_model', self.data_dir, pack_dir)[
+            ['bill_id', 'titles_text', 'enacted_as']]
+
+        self.store = LegislatorStore(self.legislators_df, self.subject_stats_df)
+        # the categorical already has sorted codes, with -1 for no subject
+        subjects = self.bills_df['subjects_top_term'].cat
+        self.bill_subject_codes, self.bill_subjects = subjects.codes.values, subjects.categories
+        self.bill_enacted = self.bills_df['enacted_as'].values
+
+        # only if it was built from the files this snapshot read
+        path = neighbours_path(congress_num, self.data_dir)
+        self.neighbour_table = NeighbourTable.load(path) \
+            if built_from(path) == self.stamp_of(SIMILARITY_SOURCES) else None
+        self._similarity_index = None
+        self._bipartisanship = None
+        self._title_search = None
+        self._cube = None
+
+    @property
+    def similarity_index(self):
+        # only needed when the neighbour table hasn't been built
+        if self._similarity_index is None:
+            path = index_path(self.congress_num, self.data_dir)
+            if built_from(path) == self.stamp_of(SIMILARITY_SOURCES):
+                self._similarity_index = SimilarityIndex.load(path)
+            else:
+                self._similarity_index = SimilarityIndex.build(self.cosponsors, self.legislators_df['bioguide_id'])
+        return self._similarity_index
+
+    @property
+    def bipartisanship(self):
+        if self._bipartisanship is None:
+            self._bipartisanship = BipartisanshipMetrics(
+                self.cosponsors, dict(zip(self.legislators_df['bioguide_id'], self.legislators_df['party'])),
+                self.bills_df['subjects_top_term'].values)
+        return self._bipartisanship
+
+    @property
+    def title_search(self):
+        if self._title_search is None:
+            self._title_search = TitleSearchIndex.from_frames(self.titles_df, self.bills_df)
+        return self._title_search
+
+    def stamp_of(self, names):
+        """[size, mtime_ns] of each named CSV as this snapshot found it, the form built files record their sources in."""
+        files = {os.path.basename(path): [size, mtime_ns] for path, size, mtime_ns in self.source_stamp}
+        return [files.get(name + '.csv') for name in names]
+
+    @property
+    def cube(self):
+        # party x chamber x state x subject rollups, for page 2's delegation totals
+        if self._cube is None:
+            self._cube = AggregationCube.from_partition(self)
+        return self._cube
+
+    @property
+    def nbytes(self):
+        # close enough for budgeting: the frames plus both copies of the sparse matrix
+        total = schema.nbytes(self.legislators_df, self.subject_stats_df, self.bills_df, self.titles_df)
+        for m in (self.cosponsors.csr, self.cosponsors.csc):
+            total += m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+        if self._similarity_index is not None:
+            total += self._similarity_index.embeddings.nbytes
+        if self._title_search is not None:
+            total += self._title_search.nbytes
+        if self._cube is not None:
+            total += self._cube.nbytes
+        return total
+
+
+class PartitionCache(object):
+    """Loads partitions on first access and evicts the least recently used past a memory budget.
+
+    The partition just requested is never evicted, even if it alone is over budget.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * 2 ** 20, loader=CongressPartition, data_dir=DATA_DIR):
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        # where the loader finds its Congresses, to turn away numbers that have no data
+        self.data_dir = data_dir
+        self._partitions = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._versions = itertools.count(1)
+        self.loads = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    def __contains__(self, congress_num):
+        return congress_num in self._partitions
+
+    @property
+    def nbytes(self):
+        return sum(self._sizes.values())
+
+    def get(self, congress_num):
+        # every request comes through here, so hits don't queue on the lock: a dict read is atomic,
+        # and the recency bump is skipped when someone else holds the lock (LRU order is only a hint)
+        partition = self._partitions.get(congress_num)
+        if partition is not None:
+            if self._lock.acquire(blocking=False):
+                try:
+                    if congress_num in self._partitions:
+                        self._partitions.move_to_end(congress_num)
+                finally:
+                    self._lock.release()
+            return partition
+
+        # only on a miss, so a Congress added to the data dir is picked up without a restart
+        if congress_num not in available_congresses(self.data_dir):
+            raise KeyError(f'no data for Congress {congress_num!r}')
+        with self._lock:
+            partition = self._partitions.get(congress_num)
+            if partition is not None:
+                return partition
+            # one loader per Congress; everyone else asking for it waits on the same lock
+            load_lock = self._loading.setdefault(congress_num, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                partition = self._partitions.get(congress_num)
+            if partition is None:
+                partition = self._install(congress_num, self.loader(congress_num))
+                with self._lock:
+                    self.loads += 1
+                    self._loading.pop(congress_num, None)
+        return partition
+
+    def _install(self, congress_num, partition):
+        with self._lock:
+            partition.version = next(self._versions)
+            self._partitions[congress_num] = partition
+            self._partitions.move_to_end(congress_num)
+            self._sizes[congress_num] = partition.nbytes
+            self._evict()
+        return partition
+
+    def _evict(self):
+        while len(self._partitions) > 1 and self.nbytes > self.budget_bytes:
+            congress_num, _ = self._partitions.popitem(last=False)
+            del self._sizes[congress_num]
+            self.evictions += 1
+
+    def reload(self, congress_num):
+        """Load a fresh snapshot of a Congress and swap it in; requests already running keep the old one.
+
+        Returns the new snapshot, or None if the files changed again while it was loading
+        (a write in progress), in which case the current snapshot stays.
+        """
+        partition = self.loader(congress_num)
+        if getattr(partition, 'source_stamp', None) is not None and \
+                partition.source_stamp != data_stamp(partition.data_dir):
+            return None
+        with self._lock:
+            self.reloads += 1
+        return self._install(congress_num, partition)
+
+    def stale(self):
+        # loaded snapshots whose files have changed since they were taken, with the files' current stamp
+        with self._lock:
+            loaded = list(self._partitions.values())
+        stamps = [(p.congress_num, data_stamp(p.data_dir), p.source_stamp) for p in loaded]
+        return {congress_num: stamp for congress_num, stamp, taken in stamps if stamp != taken}
+
+    def watch(self, interval=30):
+        """Reload stale Congresses from a daemon thread, once their files have stopped changing for an interval."""
+        def poll():
+            pending = {}
+            while True:
+                time.sleep(interval)
+                stale = self.stale()
+                for congress_num, stamp in stale.items():
+                    # still being written if it's moved since the last poll
+                    if pending.get(congress_num) == stamp:
+                        try:
+                            self.reload(congress_num)
+                        except Exception as e:
+                            # keep serving the old snapshot; it's still stale, so the next poll retries
+                            print(f'reloading {congress_label(congress_num)} failed: {e!r}')
+                    else:
+                        pending[congress_num] = stamp
+                pending = {n: stamp for n, stamp in pending.items() if n in stale}
+
+        thread = threading.Thread(target=poll, name='partition-watch', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        return {'loaded': {n: p.version for n, p in self._partitions.items()}, 'nbytes': self.nbytes,
+                'budget_bytes': self.budget_bytes, 'loads': self.loads, 'reloads': self.reloads,
+                'evictions': self.evictions}
+
+
+def build(congress_nums=None, data_dir=DATA_DIR, workers=None):
+    import data_pack
+    import leaderboards
+    import similarity
+
+    for congress_num in congress_nums or available_congresses(data_dir):
+        part_dir = partition_dir(congress_num, data_dir)
+        data_pack.build(part_dir, os.path.join(part_dir, 'pack'))
+        similarity.build_index(congress_num, data_dir=part_dir)
+        similarity.build_neighbour_table(congress_num, data_dir=part_dir, workers=workers)
+        leaderboards.build(congress_num, part_dir)
+        print(f'{congress_label(congress_num)}: built from {part_dir}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build per-Congress artifacts.')
+    parser.add_argument('command', choices=['build', 'list'])
+    parser.add_argument('--congress', type=int, action='append', help='repeatable; defaults to every Congress on disk')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for congress_num in available_congresses():
+            print(f'{congress_num}\t{congress_label(congress_num)}\t{partition_dir(congress_num)}')
+    else:
+        build(args.congress, workers=args.workers)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# strips the list punctuation so the ids are just whitespace separated
+_LIST_PUNCTUATION = str.maketrans('', '', "[]',")
+
+
+def parse_cosponsor_lists(cells):
+    """Parse a column of stringified lists like "['B001300', 'J000298']" in one pass.
+
+    Returns (flat array of bioguide ids, number of ids per cell).
+    """
+    cells = pd.Series(cells).fillna('[]').astype(str)
+    # every id is wrapped in a pair of quotes
+    counts = (cells.str.count("'").values // 2).astype(np.int64)
+    ids = np.array(' '.join(cells.values).translate(_LIST_PUNCTUATION).split(), dtype=object)
+    return ids, counts
+
+
+class CosponsorMatrix(object):
+    """Sparse bill x legislator matrix of cosponsorships.
+
+    Rows follow the order of the bills frame it was built from; columns follow
+    `legislator_ids`, with any cosponsor missing from that list appended.
+    """
+
+    def __init__(self, bill_ids, legislator_ids, csr):
+        self.bill_ids = np.asarray(bill_ids, dtype=object)
+        self.legislator_ids = np.asarray(legislator_ids, dtype=object)
+        self.bill_index = {b: i for i, b in enumerate(self.bill_ids)}
+        self.legislator_index = {l: i for i, l in enumerate(self.legislator_ids)}
+        self.csr = csr
+        self.csc = csr.tocsc()
+
+    @classmethod
+    def from_frame(cls, bills_df, legislator_ids=None):
+        ids, counts = parse_cosponsor_lists(bills_df['cosponsors'])
+        known = pd.Index(pd.unique(np.asarray(legislator_ids, dtype=object)) if legislator_ids is not None else [])
+        extra = pd.Index(pd.unique(ids)).difference(known)
+        columns = known.append(extra)
+
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        indices = columns.get_indexer(ids)
+        csr = sparse.csr_matrix((np.ones(len(ids), dtype=np.int8), indices, indptr),
+                                shape=(len(counts), len(columns)))
+        # someone listed twice on a bill still only cosponsored it once
+        csr.sum_duplicates()
+        csr.data[:] = 1
+        return cls(bills_df['bill_id'].values, columns.values, csr)
+
+    @property
+    def shape(self):
+        return self.csr.shape
+
+    def bills_cosponsored_by(self, leg_id):
+        # row positions of every bill leg_id cosponsored
+        col = self.legislator_index.get(leg_id)
+        if col is None:
+            return np.empty(0, dtype=np.int64)
+        return self.csc.indices[self.csc.indptr[col]:self.csc.indptr[col + 1]]
+
+    def cosponsors_of(self, bill_id):
+        row = self.bill_index[bill_id]
+        return self.legislator_ids[self.csr.indices[self.csr.indptr[row]:self.csr.indptr[row + 1]]]
+
+    def support_counts(self):
+        # cosponsors per bill, aligned with bill_ids
+        return np.diff(self.csr.indptr)
+
+    def cosponsorship_counts(self):
+        # bills cosponsored per legislator, aligned with legislator_ids
+        return np.diff(self.csc.indptr)
@@ -0,0 +1,139 @@
+"""Sponsorship counts over party x chamber x state x subject, with every rollup precomputed.
+
+Each measure is one dense array with an extra slot at the end of every dimension
+holding the total over that dimension, so "Texas Democrats in the House, any
+subject" or "all Senate Republicans on Health" is a single index, not a groupby.
+Labels map to positions through one dict per dimension.
+
+Measures, summed over the legislators in a cell:
+
+- legislators: how many there are; per subject, how many sponsored a bill on it
+- sponsored: bills sponsored (sponsorship_by_subj_agg)
+- enacted: how many of those were enacted
+- cosponsorships: bills cosponsored (the cosponsor matrix)
+
+A legislator with no party or state on record, and a cosponsored bill with no
+subject, only count toward the totals over that dimension.
+"""
+import numpy as np
+import pandas as pd
+
+from schema import NOT_APPLICABLE
+
+DIMENSIONS = ('party', 'chamber', 'state', 'subject')
+MEASURES = ('legislators', 'sponsored', 'enacted', 'cosponsorships')
+# the total over a dimension, as a query value
+ALL = None
+
+
+class AggregationCube(object):
+
+    def __init__(self, labels, values):
+        """labels is dimension -> tuple of labels; values is measure -> array with one extra slot per dimension."""
+        self.labels = {dim: tuple(labels[dim]) for dim in DIMENSIONS}
+        # the total is the last slot, which -1 also reaches
+        self.index = {}
+        for dim in DIMENSIONS:
+            self.index[dim] = {label: i for i, label in enumerate(self.labels[dim])}
+            self.index[dim][ALL] = -1
+        self.values = values
+        self.shape = tuple(len(self.labels[dim]) + 1 for dim in DIMENSIONS)
+
+    @classmethod
+    def from_tables(cls, legislators, subject_stats, cosponsors=None, bill_subject_codes=None, bill_subjects=()):
+        """Built from schema.legislators_table / subject_stats_table frames and, for cosponsorships, a
+        CosponsorMatrix whose columns start with the legislators in the same order, plus its bills'
+        subject codes into bill_subjects (-1 for none)."""
+        party, chamber, state = (legislators[col].cat for col in ('party', 'type', 'state'))
+        subjects = pd.Index(bill_subjects).union(subject_stats['subject'].cat.categories)
+        labels = {'party': party.categories, 'chamber': chamber.categories, 'state': state.categories,
+                  'subject': subjects}
+        shape = tuple(len(labels[dim]) + 1 for dim in DIMENSIONS)
+        # per legislator position, with unknowns (-1) sent to the total slot
+        leg_codes = [np.where(c.codes >= 0, c.codes, n - 1) for c, n in zip((party, chamber, state), shape)]
+
+        def cells(positions, subject_codes):
+            codes = [c[positions] for c in leg_codes] + [np.where(subject_codes >= 0, subject_codes, shape[3] - 1)]
+            return np.ravel_multi_index(codes, shape)
+
+        def count(flat, weights=None):
+            return np.bincount(flat, weights, minlength=int(np.prod(shape)))
+
+        n_legs = len(legislators)
+        sponsored_rows = subject_stats[subject_stats['bills_sponsored'] != NOT_APPLICABLE]
+        positions = sponsored_rows['legislator'].values.astype(np.int64)
+        bills = sponsored_rows['bills_sponsored'].values.astype(np.int64)
+        flat = cells(positions, subjects.get_indexer(sponsored_rows['subject'].astype(object)))
+        # every legislator counts once in the all-subjects slot, sponsor of something or not
+        everyone = cells(np.arange(n_legs), np.full(n_legs, -1))
+        counts = {
+            'legislators': count(np.concatenate([flat, everyone])),
+            'sponsored': count(flat, bills),
+            'enacted': count(flat, np.round(bills * sponsored_rows['pass_rate'].fillna(0).values)),
+            'cosponsorships': count(np.empty(0, dtype=np.int64)),
+        }
+        if cosponsors is not None:
+            pairs = cosponsors.csr.tocoo()
+            # cosponsors who aren't in all_congress_reps have no party, chamber or state to count under
+            known = pairs.col < n_legs
+            codes = np.asarray(bill_subject_codes)
+            bill_codes = np.where(codes >= 0, subjects.get_indexer(pd.Index(bill_subjects))[codes], -1)
+            counts['cosponsorships'] = count(cells(pairs.col[known], bill_codes[pairs.row[known]]))
+
+        values = {}
+        for measure in MEASURES:
+            cube = counts[measure].astype(np.int32).reshape(shape)
+            # one legislator sponsors on many subjects, so their all-subjects count is set above, not summed
+            axes = range(3) if measure == 'legislators' else range(cube.ndim)
+            for axis in axes:
+                # a view with this dimension last, so the total slot fills in place
+                along = np.moveaxis(cube, axis, -1)
+                along[..., -1] += along[..., :-1].sum(axis=-1)
+            values[measure] = cube
+        return cls(labels, values)
+
+    @classmethod
+    def from_partition(cls, partition):
+        return cls.from_tables(partition.legislators_df, partition.subject_stats_df, partition.cosponsors,
+                               partition.bill_subject_codes, partition.bill_subjects)
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in self.values.values())
+
+    def _position(self, dim, label):
+        # None for a label this Congress doesn't have
+        return self.index[dim].get(label)
+
+    def value(self, measure, party=ALL, chamber=ALL, state=ALL, subject=ALL):
+        """One cell; ALL for a dimension totals over it. Unknown labels count as 0."""
+        cell = tuple(self._position(dim, label) for dim, label in zip(DIMENSIONS, (party, chamber, state, subject)))
+        if None in cell:
+            return 0
+        return int(self.values[measure][cell])
+
+    def breakdown(self, measure, by, party=ALL, chamber=ALL, state=ALL, subject=ALL):
+        """{label: value} along one dimension, with the others fixed (or totalled), in label order."""
+        fixed = dict(zip(DIMENSIONS, (party, chamber, state, subject)))
+        cell = []
+        for dim in DIMENSIONS:
+            if dim == by:
+                cell.append(slice(0, -1))
+                continue
+            position = self._position(dim, fixed[dim])
+            if position is None:
+                return {label: 0 for label in self.labels[by]}
+            cell.append(position)
+        return dict(zip(self.labels[by], self.values[measure][tuple(cell)].tolist()))
+
+    def pass_rate(self, **coords):
+        sponsored = self.value('sponsored', **coords)
+        return self.value('enacted', **coords) / sponsored if sponsored else float('nan')
+
+    def frame(self, measure, by):
+        """A long frame of every cell over the `by` dimensions, totalled over the rest, like a groupby's result."""
+        by = [dim for dim in DIMENSIONS if dim in by]
+        cell = tuple(slice(0, -1) if dim in by else -1 for dim in DIMENSIONS)
+        sub = self.values[measure][cell]
+        index = pd.MultiIndex.from_product([self.labels[dim] for dim in by], names=by)
+        return pd.Series(sub.ravel(), index=index, name=measure)
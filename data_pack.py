@@ -0,0 +1,131 @@
+"""Columnar binary pack for the CSVs in assets/data.
+
+`python data_pack.py build` compiles every assets/data/*.csv into
+assets/data/pack/: one .npy per numeric column, and for text columns an .npy of
+integer codes plus a NUL-separated utf-8 dictionary. Workers then memory-map the
+arrays instead of parsing ~6.5 MB of CSV each, which loads them about twice as fast.
+
+The frames built from the pack are still each worker's own memory: pandas copies
+the numeric columns into its blocks and the text columns decode into object
+arrays, and the partitions only keep schema's converted tables anyway.
+benchmarks/bench_data_pack.py measures shared vs private memory across workers.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+PACK_VERSION = 1
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'data')
+PACK_DIR = os.path.join(DATA_DIR, 'pack')
+MANIFEST = 'manifest.json'
+
+
+def _code_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def pack_table(df, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        base = os.path.join(out_dir, f'{i:02d}')
+        if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+            np.save(base + '.npy', np.ascontiguousarray(col.values))
+            columns.append({'name': name, 'kind': 'array'})
+        else:
+            # missing values get code -1, same as pd.factorize
+            codes, uniques = pd.factorize(col)
+            np.save(base + '.npy', codes.astype(_code_dtype(len(uniques))))
+            with open(base + '.dict', 'wb') as f:
+                f.write('\x00'.join(str(u) for u in uniques).encode('utf-8'))
+            columns.append({'name': name, 'kind': 'dict', 'size': len(uniques)})
+    return {'rows': len(df), 'columns': columns}
+
+
+def build(data_dir=DATA_DIR, pack_dir=PACK_DIR):
+    tables = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        meta = pack_table(pd.read_csv(path), os.path.join(pack_dir, name))
+        meta['source'] = _source_stamp(path)
+        tables[name] = meta
+    manifest = {'version': PACK_VERSION, 'built': time.time(), 'tables': tables}
+    tmp = os.path.join(pack_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(pack_dir, MANIFEST))
+    return manifest
+
+
+def _read_manifest(pack_dir):
+    try:
+        with open(os.path.join(pack_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return None
+    if manifest.get('version') != PACK_VERSION:
+        return None
+    return manifest
+
+
+def _load_dictionary(path, size):
+    with open(path, 'rb') as f:
+        blob = f.read().decode('utf-8')
+    values = np.empty(size + 1, dtype=object)
+    values[:size] = blob.split('\x00') if size else []
+    # trailing slot so code -1 decodes to NaN
+    values[size] = np.nan
+    return values
+
+
+def load_packed_table(name, pack_dir=PACK_DIR, manifest=None):
+    manifest = manifest or _read_manifest(pack_dir)
+    meta = manifest['tables'][name]
+    table_dir = os.path.join(pack_dir, name)
+    data = {}
+    for i, col in enumerate(meta['columns']):
+        base = os.path.join(table_dir, f'{i:02d}')
+        arr = np.load(base + '.npy', mmap_mode='r')
+        if col['kind'] == 'dict':
+            # repeated strings all point at one object per dictionary entry
+            arr = _load_dictionary(base + '.dict', col['size'])[arr]
+        data[col['name']] = arr
+    return pd.DataFrame(data, columns=[c['name'] for c in meta['columns']])
+
+
+def read_table(name, data_dir=DATA_DIR, pack_dir=PACK_DIR):
+    """Load assets/data/<name>.csv, from the pack when it's built and up to date."""
+    csv_path = os.path.join(data_dir, name + '.csv')
+    manifest = _read_manifest(pack_dir)
+    if manifest is not None and name in manifest['tables'] and os.path.exists(csv_path):
+        if manifest['tables'][name]['source'] == _source_stamp(csv_path):
+            return load_packed_table(name, pack_dir, manifest)
+    return pd.read_csv(csv_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile assets/data/*.csv into a memory-mappable pack.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--out', default=None, help='defaults to <data-dir>/pack')
+    args = parser.parse_args()
+
+    start = time.time()
+    manifest = build(args.data_dir, args.out or os.path.join(args.data_dir, 'pack'))
+    for name, meta in manifest['tables'].items():
+        print(f"{name}: {meta['rows']} rows, {len(meta['columns'])} columns")
+    print(f'built in {time.time() - start:.2f}s')
@@ -0,0 +1,222 @@
+"""Filtered CSV/Parquet exports of a Congress's bills and legislators, streamed.
+
+A filter is a boolean mask over one of the partition's compact tables, so nothing
+is copied up front. Rows are then formatted a chunk at a time and handed to the
+response as they are ready, which keeps memory flat whether an export is ten rows
+or the whole table. A filter that matches nothing still gets the CSV header, or
+a Parquet file with the schema and no rows. Parquet writes one row group per
+chunk and needs pyarrow, which is imported only when a Parquet export is asked for.
+"""
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 2000
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+# dataset -> the filters it takes
+FILTERS = {
+    'bills': ('chamber', 'subject', 'enacted'),
+    'legislators': ('chamber', 'state', 'party', 'subject'),
+}
+# chamber filter value -> all_congress_reps `type`, and the first letter of a bill_type
+CHAMBERS = {'house': ('rep', 'h'), 'senate': ('sen', 's')}
+
+
+class ExportError(ValueError):
+    """A bad dataset, filter or format; the message is safe to show the caller."""
+
+
+def _matches(column, value):
+    # categorical columns compare against their categories, so a value that isn't one matches nothing
+    return np.asarray(column == value)
+
+
+def bills_mask(partition, chamber=None, subject=None, enacted=None):
+    bills = partition.bills_df
+    mask = np.ones(len(bills), dtype=bool)
+    if chamber is not None:
+        mask &= bills['bill_type'].astype(str).str.startswith(CHAMBERS[chamber][1]).values
+    if subject is not None:
+        mask &= _matches(bills['subjects_top_term'], subject)
+    if enacted is not None:
+        mask &= bills['enacted_as'].values == enacted
+    return mask
+
+
+def legislators_mask(partition, chamber=None, state=None, party=None, subject=None):
+    legislators = partition.legislators_df
+    mask = np.ones(len(legislators), dtype=bool)
+    if chamber is not None:
+        mask &= _matches(legislators['type'], CHAMBERS[chamber][0])
+    if state is not None:
+        mask &= _matches(legislators['state'], state)
+    if party is not None:
+        mask &= _matches(legislators['party'], party)
+    if subject is not None:
+        # anyone who sponsored at least one bill on it
+        mask &= legislators['bioguide_id'].isin(partition.store.sponsors_of(subject)).values
+    return mask
+
+
+def _starts(rows, chunk_rows):
+    # no rows is still one (empty) chunk, so the columns make it into the file
+    return range(0, max(len(rows), 1), chunk_rows)
+
+
+def bill_chunks(partition, rows, chunk_rows=CHUNK_ROWS):
+    bills = partition.bills_df
+    titles = partition.title_search
+    title_positions = pd.Index(titles.bill_ids)
+    for start in _starts(rows, chunk_rows):
+        chunk = bills.iloc[rows[start:start + chunk_rows]]
+        found = title_positions.get_indexer(chunk['bill_id'])
+        yield pd.DataFrame({
+            'bill_id': chunk['bill_id'].values,
+            'bill_type': chunk['bill_type'].astype(str).values,
+            'subject': chunk['subjects_top_term'].astype(object).values,
+            'title': np.where(found >= 0, titles.titles[found], None),
+            'num_cosponsors': chunk['num_cosponsors'].values,
+            'num_support': chunk['num_support'].values,
+            'enacted': chunk['enacted_as'].values,
+        })
+
+
+def legislator_chunks(partition, rows, chunk_rows=CHUNK_ROWS):
+    legislators = partition.legislators_df
+    for start in _starts(rows, chunk_rows):
+        yield legislators.iloc[rows[start:start + chunk_rows]]
+
+
+DATASETS = {'bills': (bills_mask, bill_chunks), 'legislators': (legislators_mask, legislator_chunks)}
+
+
+def parse_filters(dataset, args):
+    """The dataset's filters from a mapping of query args; raises ExportError on anything unknown."""
+    if dataset not in DATASETS:
+        raise ExportError(f'unknown dataset {dataset!r}; try one of {sorted(DATASETS)}')
+    filters = {}
+    for name, value in args.items():
+        if name in ('congress', 'format') or value in (None, ''):
+            continue
+        if name not in FILTERS[dataset]:
+            raise ExportError(f'{dataset} can be filtered by {", ".join(FILTERS[dataset])}, not {name!r}')
+        if name == 'chamber' and value not in CHAMBERS:
+            raise ExportError(f"chamber is 'house' or 'senate', not {value!r}")
+        if name == 'enacted':
+            if value not in ('0', '1'):
+                raise ExportError(f"enacted is 0 or 1, not {value!r}")
+            value = int(value)
+        filters[name] = value
+    return filters
+
+
+def _csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        out = io.StringIO()
+        chunk.to_csv(out, index=False, header=header)
+        header = False
+        yield out.getvalue().encode('utf-8')
+
+
+class _Sink(io.RawIOBase):
+    # a write-only file that hands its bytes over when drained, for pyarrow's ParquetWriter
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._written
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _parquet_stream(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _Sink(), None
+    for chunk in chunks:
+        if writer is None:
+            # a text column that's empty or all missing in the first chunk would otherwise be typed null
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            schema = pa.schema([pa.field(f.name, pa.string()) if f.type == pa.null() else f for f in schema],
+                               metadata=schema.metadata)
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream(partition, dataset, fmt='csv', chunk_rows=CHUNK_ROWS, **filters):
+    """Bytes of a filtered export, chunk by chunk. The partition is held for the whole stream."""
+    if fmt not in FORMATS:
+        raise ExportError(f"format is one of {', '.join(FORMATS)}, not {fmt!r}")
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportError('parquet exports need pyarrow installed on the server; use format=csv')
+    make_mask, make_chunks = DATASETS[dataset]
+    rows = np.flatnonzero(make_mask(partition, **filters))
+    chunks = make_chunks(partition, rows, chunk_rows)
+    return _csv_stream(chunks) if fmt == 'csv' else _parquet_stream(chunks)
+
+
+class ExportSlots(object):
+    """Caps how many exports a worker streams at once, so they can't starve the callbacks of CPU."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self.rejected = 0
+
+    def hold(self, chunks):
+        """chunks wrapped to give the slot back when the response is closed, or None if all are taken."""
+        if not self._semaphore.acquire(blocking=False):
+            self.rejected += 1
+            return None
+        return _Held(chunks, self._semaphore.release)
+
+
+class _Held(object):
+    # werkzeug calls close() on a response's iterable once it's sent or the client goes away,
+    # even if it was never iterated, which a generator's finally wouldn't catch
+
+    def __init__(self, chunks, release):
+        self._chunks = chunks
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def close(self):
+        release, self._release = self._release, None
+        try:
+            getattr(self._chunks, 'close', lambda: None)()
+        finally:
+            if release is not None:
+                release()
+
+
+def filename(congress_num, dataset, fmt, filters):
+    parts = [dataset, str(congress_num)] + [f'{k}-{v}' for k, v in sorted(filters.items())]
+    safe = '_'.join(parts).replace(' ', '-').replace('/', '-').replace('\\', '-')
+    # it goes in a header: no quotes or control characters, and only latin-1, which is all Werkzeug 0.15 will encode
+    return ''.join(c for c in safe if c.isprintable() and c != '"' and ord(c) < 256) + f'.{fmt}'
+
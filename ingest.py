@@ -0,0 +1,264 @@
+"""Build a Congress's data tables from GPO bill-status bulk XML.
+
+    python ingest.py BILLSTATUS-115-hr.zip BILLSTATUS-115-s.zip ... --congress 115
+    python ingest.py path/to/unzipped/xml/ --congress 116 --legislators reps.csv
+
+Sources can be directories (searched recursively for *.xml) or zip files, as
+downloaded from https://www.govinfo.gov/bulkdata/BILLSTATUS. Each file is parsed
+incrementally with iterparse and cleared as it goes, files are spread over a
+process pool, and only a compact row per bill is kept. Writes the same CSVs the
+app reads into assets/data/<congress>/ (see congress_data.partition_dir).
+
+Runs are incremental: a manifest of every source file's size/CRC is kept with
+the aggregate state in the output directory, and the next run only parses files that
+are new or changed and subtracts bills whose files went away. Pass --full to
+start over.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+
+import data_pack
+from aggregates import SponsorshipAggregates
+
+OFFICIAL_TITLE = 'Official Title as Introduced'
+PERSON_FIELDS = {'bioguideId': 'bioguide_id', 'firstName': 'first_name', 'lastName': 'last_name',
+                 'fullName': 'full_name', 'party': 'party', 'state': 'state', 'district': 'district',
+                 'sponsorshipWithdrawnDate': 'withdrawn'}
+# children of <bill> read as plain text
+BILL_FIELDS = ('billType', 'type', 'billNumber', 'number', 'congress', 'title', 'updateDate')
+MANIFEST_FILE = '.ingest_manifest.pkl'
+AGGREGATES_FILE = '.ingest_aggregates.pkl'
+
+
+def find_sources(paths):
+    """Every bill-status file under paths, as (path, zip member or None)."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend((p, None) for p in sorted(glob.glob(os.path.join(path, '**', '*.xml'), recursive=True)))
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                sources.extend((path, name) for name in zf.namelist() if name.endswith('.xml'))
+        else:
+            sources.append((path, None))
+    return sources
+
+
+def _person(fields):
+    person = {PERSON_FIELDS[k]: v for k, v in fields.items() if k in PERSON_FIELDS}
+    first, last = person.get('first_name', ''), person.get('last_name', '')
+    person['name'] = f'{first} {last}'.strip() or person.get('full_name', '')
+    # fullName looks like "Sen. Brown, Sherrod [D-OH]" or "Rep. Welch, Peter [D-VT-At Large]"
+    full_name = person.get('full_name', '')
+    person['type'] = 'sen' if full_name.startswith('Sen.') else 'rep'
+    if person['type'] == 'rep':
+        district = person.get('district', '')
+        person['district'] = district if district.isdigit() else '0'
+    else:
+        person['district'] = '-'
+    return person
+
+
+def parse_bill_status(fileobj):
+    """One bill-status XML document -> bill record dict, or None if it isn't a bill."""
+    path = []
+    fields = {}
+    person = {}
+    sponsors, cosponsors, titles, laws = [], [], [], []
+    title_item = {}
+
+    for event, elem in ET.iterparse(fileobj, events=('start', 'end')):
+        if event == 'start':
+            path.append(elem.tag)
+            continue
+        where = tuple(path[2:])  # relative to billStatus/bill
+        text = (elem.text or '').strip()
+        if len(where) == 1 and where[0] in BILL_FIELDS:
+            fields[where[0]] = text
+        elif where[:1] in (('sponsors',), ('cosponsors',)) and len(where) == 3 and where[1] == 'item':
+            person[where[2]] = text
+        elif where in (('sponsors', 'item'), ('cosponsors', 'item')):
+            (sponsors if where[0] == 'sponsors' else cosponsors).append(_person(person))
+            person = {}
+        elif where == ('policyArea', 'name'):
+            fields['policy_area'] = text
+        elif where[:2] == ('titles', 'item') and len(where) == 3:
+            title_item[where[2]] = text
+        elif where == ('titles', 'item'):
+            titles.append(title_item)
+            title_item = {}
+        elif where == ('laws', 'item'):
+            laws.append(True)
+        path.pop()
+        # nothing below the bill element is needed once its end tag has been handled
+        if len(path) > 1:
+            elem.clear()
+
+    bill_type = (fields.get('billType') or fields.get('type') or '').lower()
+    number = fields.get('billNumber') or fields.get('number')
+    if not bill_type or not number:
+        return None
+    official = [t.get('title', '') for t in titles if t.get('titleType') == OFFICIAL_TITLE]
+    cosponsors = [c for c in cosponsors if not c.get('withdrawn')]
+    return {
+        'bill_id': f"{bill_type}{number}-{fields.get('congress', '')}",
+        'bill_type': bill_type,
+        'congress': int(fields['congress']) if fields.get('congress', '').isdigit() else None,
+        'subjects_top_term': fields.get('policy_area', ''),
+        'title': official[0] if official else fields.get('title', ''),
+        'sponsors': sponsors,
+        'cosponsors': cosponsors,
+        'enacted_as': int(bool(laws)),
+        # ISO 8601, so it compares as a string
+        'updated': fields.get('updateDate', ''),
+    }
+
+
+# zip files opened by this worker process; reading a bulk zip's directory once per member is quadratic
+_open_zips = {}
+
+
+def parse_source(source):
+    path, member = source
+    if member is None:
+        with open(path, 'rb') as f:
+            return parse_bill_status(f)
+    zf = _open_zips.get(path)
+    if zf is None:
+        zf = _open_zips[path] = zipfile.ZipFile(path)
+    with zf.open(member) as f:
+        return parse_bill_status(f)
+
+
+def source_key(source):
+    path, member = source
+    return os.path.abspath(path) + ('' if member is None else '::' + member)
+
+
+def fingerprints(sources):
+    """source key -> something that changes whenever the file's content does."""
+    out = {}
+    zips = {}
+    for source in sources:
+        path, member = source
+        if member is None:
+            stat = os.stat(path)
+            out[source_key(source)] = (stat.st_size, stat.st_mtime_ns)
+        else:
+            # zip members carry their own CRC, so a re-downloaded bulk zip only shows the bills that changed
+            if path not in zips:
+                with zipfile.ZipFile(path) as zf:
+                    zips[path] = {i.filename: (i.file_size, i.CRC) for i in zf.infolist()}
+            out[source_key(source)] = zips[path][member]
+    return out
+
+
+def write_tables(aggregates, out_dir, known_reps=None):
+    """Write every table from the aggregate state, swapping each finished file into place."""
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.ingest-', dir=out_dir)
+    try:
+        bills = aggregates.bills_frame()
+        bills.to_csv(os.path.join(tmp_dir, 'bills_and_support.csv'), index=False)
+        bills[['bill_id', 'bill_type', 'subjects_top_term', 'enacted_as']].to_csv(
+            os.path.join(tmp_dir, 'bills_and_passage_subject_and_type.csv'), index=False)
+        aggregates.titles_frame().to_csv(os.path.join(tmp_dir, 'bill_title_text_for_model.csv'), index=False)
+
+        reps = aggregates.reps_frame(known_reps)
+        reps.to_csv(os.path.join(tmp_dir, 'all_congress_reps.csv'), index=False)
+        aggregates.overall_frame(reps).to_csv(os.path.join(tmp_dir, 'overall_sponsorship_aggs.csv'), index=False)
+        aggregates.by_subject_frame(reps).to_csv(os.path.join(tmp_dir, 'sponsorship_by_subj_agg.csv'), index=False)
+        aggregates.cosponsorship_frame().to_csv(os.path.join(tmp_dir, 'cosponsorship_summary_info.csv'), index=False)
+
+        # the app never sees a half-written CSV
+        for name in os.listdir(tmp_dir):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(out_dir, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def ingest(paths, out_dir, congress_num=None, legislators=None, workers=None, full=False, chunksize=32):
+    """Bring out_dir up to date with the bill-status files under paths.
+
+    Unless full is set, the change manifest and aggregate state from the last run
+    are loaded from out_dir and only new, changed or deleted files are applied.
+    Returns counts of what was done.
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    aggregates_path = os.path.join(out_dir, AGGREGATES_FILE)
+    if not full and os.path.exists(manifest_path) and os.path.exists(aggregates_path):
+        with open(manifest_path, 'rb') as f:
+            manifest = pickle.load(f)
+        aggregates = SponsorshipAggregates.load(aggregates_path)
+    else:
+        manifest, aggregates = {}, SponsorshipAggregates()
+
+    sources = find_sources(paths)
+    current = fingerprints(sources)
+    changed = [s for s in sources if manifest.get(source_key(s), (None, None))[0] != current[source_key(s)]]
+    gone = [key for key in manifest if key not in current]
+
+    removed = 0
+    for key in gone:
+        removed += aggregates.remove_bill(manifest.pop(key)[1]) is not None
+
+    parsed = 0
+    if changed:
+        with multiprocessing.Pool(workers) as pool:
+            for source, record in zip(changed, pool.imap(parse_source, changed, chunksize=chunksize)):
+                # whatever this file used to hold goes, in case the new version is a different bill
+                previous = manifest.get(source_key(source), (None, None))[1]
+                if previous is not None:
+                    aggregates.remove_bill(previous)
+                bill_id = None
+                if record is not None and (congress_num is None or record['congress'] in (None, congress_num)):
+                    aggregates.add_bill(record)
+                    bill_id = record['bill_id']
+                    parsed += 1
+                manifest[source_key(source)] = (current[source_key(source)], bill_id)
+
+    if parsed or removed or not os.path.exists(os.path.join(out_dir, 'all_congress_reps.csv')):
+        known = pd.read_csv(legislators, dtype={'district': str}) if legislators else None
+        write_tables(aggregates, out_dir, known)
+        # a stale pack is ignored by read_table anyway, but rebuilding keeps the fast path
+        if os.path.isdir(os.path.join(out_dir, 'pack')):
+            data_pack.build(out_dir, os.path.join(out_dir, 'pack'))
+    # state before manifest: if we die in between, the next run just re-applies the same bills
+    aggregates.save(aggregates_path)
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, manifest_path)
+    return {'parsed': parsed, 'removed': removed, 'unchanged': len(sources) - len(changed),
+            'bills': len(aggregates.bills)}
+
+
+if __name__ == '__main__':
+    from congress_data import partition_dir
+
+    parser = argparse.ArgumentParser(description='Build data tables from bill-status bulk XML.')
+    parser.add_argument('sources', nargs='+', help='directories of XML files and/or bulk zip files')
+    parser.add_argument('--congress', type=int, required=True)
+    parser.add_argument('--out', default=None, help='defaults to assets/data/<congress>/')
+    parser.add_argument('--legislators', default=None,
+                        help='all_congress_reps-style CSV supplying gender and term dates, which bill status lacks')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per CPU core')
+    parser.add_argument('--full', action='store_true', help='ignore the previous run and rebuild from scratch')
+    args = parser.parse_args()
+
+    out_dir = args.out or partition_dir(args.congress)
+    start = time.time()
+    stats = ingest(args.sources, out_dir, args.congress, args.legislators, args.workers, args.full)
+    elapsed = time.time() - start
+    print(f"{stats['parsed']} bills parsed, {stats['removed']} removed, {stats['unchanged']} files unchanged; "
+          f"{stats['bills']} bills -> {out_dir} in {elapsed:.1f}s ({stats['parsed'] / elapsed:.0f} bills/s)")
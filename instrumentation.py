@@ -0,0 +1,213 @@
+"""Per-callback latency, payload size and call counts, cheap enough to leave on.
+
+`instrument(app)` hooks the Flask request cycle around Dash's
+/_dash-update-component route, which every callback goes through, so callbacks
+need no changes. Each callback (keyed by its output id) gets an HDR-style
+histogram: log-linear buckets with 1/64 relative precision from 1us up to hours, so
+recording is a bit_length and a list increment and percentiles stay accurate
+without keeping samples.
+
+With CALLBACK_PROFILE_MS set, a sampling thread also walks the stacks of in-flight
+callbacks every few milliseconds and keeps the collapsed stacks of any call that
+ends up slower than the threshold.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import flask
+
+# 2 ** SUB_BITS linear sub-buckets per power of two
+SUB_BITS = 7
+SUB_BUCKETS = 2 ** SUB_BITS
+HALF = SUB_BUCKETS // 2
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+UPDATE_PATH = '/_dash-update-component'
+
+
+def _bucket(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return shift * HALF + (value >> shift)
+
+
+def _bucket_bounds(index):
+    # [low, high) of the values that land in a bucket
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // HALF - 1
+    low = (index - shift * HALF) << shift
+    return low, low + (1 << shift)
+
+
+class Histogram(object):
+    """Counts of non-negative integers (microseconds, bytes) in log-linear buckets."""
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        index = _bucket(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                # the bucket's midpoint, within 1/128 of the true value
+                low, high = _bucket_bounds(index)
+                return min(self.max, (low + high - 1) // 2)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'min': self.min or 0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+            'percentiles': {str(q): self.percentile(q) for q in QUANTILES},
+            # [upper bound, count] for every non-empty bucket
+            'buckets': [[_bucket_bounds(i)[1], n] for i, n in enumerate(self.counts) if n],
+        }
+
+
+class CallbackStats(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.latency_us = Histogram()
+        self.payload_bytes = Histogram()
+        self.errors = 0
+
+    def snapshot(self):
+        return {'function': self.name, 'calls': self.latency_us.count, 'errors': self.errors,
+                'latency_us': self.latency_us.snapshot(), 'payload_bytes': self.payload_bytes.snapshot()}
+
+
+class CallbackMetrics(object):
+
+    def __init__(self, callback_map=None, profile_ms=None, profile_interval=0.005, keep_profiles=20):
+        self.callback_map = callback_map if callback_map is not None else {}
+        self.started = time.time()
+        self._stats = {}
+        self._lock = threading.Lock()
+        # thread id -> (callback id, start, sample Counter) for callbacks running right now
+        self._in_flight = {}
+        self.profile_ms = profile_ms
+        self.profile_interval = profile_interval
+        self.slow_profiles = deque(maxlen=keep_profiles)
+        if profile_ms is not None:
+            threading.Thread(target=self._sample, name='callback-profiler', daemon=True).start()
+
+    def _name(self, callback_id):
+        entry = self.callback_map.get(callback_id) or {}
+        func = entry.get('callback')
+        return getattr(func, '__name__', None) or callback_id
+
+    def start(self, callback_id):
+        samples = Counter() if self.profile_ms is not None else None
+        self._in_flight[threading.get_ident()] = (callback_id, time.perf_counter(), samples)
+
+    def finish(self, payload_bytes, error=False):
+        entry = self._in_flight.pop(threading.get_ident(), None)
+        if entry is None:
+            return
+        callback_id, start, samples = entry
+        elapsed_us = int((time.perf_counter() - start) * 1e6)
+        with self._lock:
+            stats = self._stats.get(callback_id)
+            if stats is None:
+                stats = self._stats[callback_id] = CallbackStats(self._name(callback_id))
+            stats.latency_us.record(elapsed_us)
+            stats.payload_bytes.record(payload_bytes)
+            stats.errors += error
+        if samples and elapsed_us >= self.profile_ms * 1000:
+            self.slow_profiles.append({'callback': callback_id, 'function': stats.name, 'elapsed_us': elapsed_us,
+                                       'at': time.time(), 'stacks': samples.most_common(25)})
+
+    def _sample(self):
+        # only looks at threads that are inside a callback, so it's idle when the app is
+        while True:
+            time.sleep(self.profile_interval)
+            if not self._in_flight:
+                continue
+            frames = sys._current_frames()
+            for thread_id, (_, _, samples) in list(self._in_flight.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < 40:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                    frame = frame.f_back
+                if stack:
+                    samples[';'.join(reversed(stack))] += 1
+
+    def snapshot(self):
+        with self._lock:
+            callbacks = {k: v.snapshot() for k, v in self._stats.items()}
+        return {'pid': os.getpid(), 'uptime_s': time.time() - self.started, 'callbacks': callbacks}
+
+    def prometheus(self):
+        lines = ['# TYPE dash_callback_latency_seconds summary', '# TYPE dash_callback_payload_bytes summary',
+                 '# TYPE dash_callback_errors_total counter']
+        with self._lock:
+            items = sorted(self._stats.items())
+            for callback_id, stats in items:
+                label = f'callback="{callback_id}",function="{stats.name}"'
+                for q in QUANTILES:
+                    lines.append(f'dash_callback_latency_seconds{{{label},quantile="{q}"}} '
+                                 f'{stats.latency_us.percentile(q) / 1e6:.6f}')
+                lines.append(f'dash_callback_latency_seconds_sum{{{label}}} {stats.latency_us.total / 1e6:.6f}')
+                lines.append(f'dash_callback_latency_seconds_count{{{label}}} {stats.latency_us.count}')
+                for q in QUANTILES:
+                    lines.append(f'dash_callback_payload_bytes{{{label},quantile="{q}"}} '
+                                 f'{stats.payload_bytes.percentile(q)}')
+                lines.append(f'dash_callback_payload_bytes_sum{{{label}}} {stats.payload_bytes.total}')
+                lines.append(f'dash_callback_payload_bytes_count{{{label}}} {stats.payload_bytes.count}')
+                lines.append(f'dash_callback_errors_total{{{label}}} {stats.errors}')
+        return '\n'.join(lines) + '\n'
+
+
+def instrument(app, profile_ms=None):
+    """Record every callback request that goes through app's server; returns the CallbackMetrics."""
+    metrics = CallbackMetrics(app.callback_map, profile_ms=profile_ms)
+    server = app.server
+
+    @server.before_request
+    def start_callback_timer():
+        if flask.request.path.endswith(UPDATE_PATH):
+            body = flask.request.get_json(silent=True) or {}
+            metrics.start(body.get('output', '?'))
+
+    @server.after_request
+    def record_callback(response):
+        if flask.request.path.endswith(UPDATE_PATH):
+            metrics.finish(response.calculate_content_length() or 0, error=response.status_code >= 500)
+        return response
+
+    @server.teardown_request
+    def drop_failed_callback(exc):
+        # an unhandled exception skips after_request; count it and forget the start time
+        if exc is not None and flask.request.path.endswith(UPDATE_PATH):
+            metrics.finish(0, error=True)
+
+    return metrics
@@ -0,0 +1,160 @@
+"""The "insights" leaderboards on page 2, computed from a Congress's tables.
+
+`python leaderboards.py build` writes one small JSON file per Congress to
+assets/leaderboards/, so the page only formats rows that were ranked at build
+time. Every table is an nlargest/nsmallest or groupby over
+bills_and_support, bill_title_text_for_model and overall_sponsorship_aggs.
+"""
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_pack import DATA_DIR, read_table
+
+LEADERBOARDS_VERSION = 1
+LEADERBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'leaderboards')
+TOP_N = 5
+# passage rates over fewer bills than this are mostly noise
+MIN_BILLS = 8
+# a full two-year term
+FULL_TERM_DAYS = 730
+# bills backed by nearly the whole chamber are condolence and commemoration resolutions
+UNANIMOUS_SHARE = 0.9
+CHAMBERS = {'house': ('h', 435), 'senate': ('s', 100)}
+BILL_PREFIXES = {'hr': 'H.R.', 'hres': 'H.Res.', 'hjres': 'H.J.Res.', 'hconres': 'H.Con.Res.',
+                 's': 'S.', 'sres': 'S.Res.', 'sjres': 'S.J.Res.', 'sconres': 'S.Con.Res.'}
+LEGISLATOR_COLUMNS = ['bioguide_id', 'name', 'type', 'state', 'district', 'party', 'overall_bills_sponsored',
+                      'overall_pass_rate']
+
+
+def leaderboard_path(congress_num, out_dir=LEADERBOARD_DIR):
+    return os.path.join(out_dir, f'leaderboards_{congress_num}.json')
+
+
+def bill_label(bill_id, bill_type):
+    number = bill_id.split('-')[0][len(bill_type):]
+    return BILL_PREFIXES.get(bill_type, bill_type.upper() + '.') + number
+
+
+# titles_text runs the official title straight into the short title, e.g. "...other purposes.Fix NICS Act of 2017"
+_SHORT_TITLE = re.compile(r'[.)](?=[A-Z0-9"][^.]*$)')
+
+
+def display_title(titles_text):
+    if not isinstance(titles_text, str):
+        return ''
+    parts = _SHORT_TITLE.split(titles_text, maxsplit=1)
+    return parts[-1].strip() if len(parts) > 1 and parts[-1].strip() else titles_text
+
+
+def _records(df):
+    # plain python values, so the result goes straight to json
+    return [{k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+            for row in df.to_dict('records')]
+
+
+def most_supported_bills(bills_df, titles_df, top_n=TOP_N):
+    bills = bills_df.merge(titles_df[['bill_id', 'titles_text']], on='bill_id', how='left')
+    out = {}
+    for chamber, (prefix, seats) in CHAMBERS.items():
+        chamber_bills = bills[bills['bill_type'].str.startswith(prefix) &
+                              (bills['num_support'] < UNANIMOUS_SHARE * seats)]
+        top = chamber_bills.nlargest(top_n, 'num_cosponsors')
+        out[chamber] = [{'bill': bill_label(b.bill_id, b.bill_type), 'title': display_title(b.titles_text),
+                         'num_cosponsors': int(b.num_cosponsors), 'enacted': bool(b.enacted_as)}
+                        for b in top.itertuples(index=False)]
+    return out
+
+
+def compute(bills_df, overall_df, titles_df, top_n=TOP_N, min_bills=MIN_BILLS):
+    legislators = overall_df[LEGISLATOR_COLUMNS + ['days_in_office']]
+    sponsored = legislators['overall_bills_sponsored']
+    active = legislators[sponsored > 0]
+
+    full_term = active[active['days_in_office'] >= FULL_TERM_DAYS]
+    fewest = full_term.nsmallest(1, 'overall_bills_sponsored', keep='all')
+    qualified = legislators[sponsored >= min_bills]
+    best = qualified.sort_values(['overall_pass_rate', 'overall_bills_sponsored'], ascending=False).head(top_n)
+    never_passed = int((active['overall_pass_rate'] == 0).sum())
+
+    # senators first, then districts in numeric order
+    ordered = legislators.assign(_district=pd.to_numeric(legislators['district'], errors='coerce')).sort_values(
+        ['type', '_district', 'name'], ascending=[False, True, True])
+    delegations = {state: _records(rows[LEGISLATOR_COLUMNS]) for state, rows in ordered.groupby('state', sort=False)}
+
+    return {
+        'version': LEADERBOARDS_VERSION,
+        'min_bills': min_bills,
+        'most_supported': most_supported_bills(bills_df, titles_df, top_n),
+        'most_sponsored': _records(legislators.nlargest(top_n, 'overall_bills_sponsored')[LEGISLATOR_COLUMNS]),
+        'sponsored_none': {k: int(v) for k, v in (sponsored == 0).groupby(legislators['type']).sum().items()},
+        'fewest_sponsored': _records(fewest[LEGISLATOR_COLUMNS]),
+        'best_passage_rate': _records(best[LEGISLATOR_COLUMNS]),
+        'never_passed': {'count': never_passed, 'share': never_passed / len(active) if len(active) else 0.0},
+        'delegations': delegations,
+    }
+
+
+SOURCES = ('bills_and_support', 'overall_sponsorship_aggs', 'bill_title_text_for_model')
+
+
+def source_stamp(data_dir):
+    stats = [os.stat(os.path.join(data_dir, name + '.csv')) for name in SOURCES]
+    return [[s.st_size, s.st_mtime_ns] for s in stats]
+
+
+def compute_from_tables(bills_df, legislators_df, titles_df):
+    """From a partition's schema tables instead of the files, i.e. from what the app has loaded."""
+    categories = [col for col in LEGISLATOR_COLUMNS if pd.api.types.is_categorical_dtype(legislators_df[col])]
+    return compute(bills_df, legislators_df.astype({col: object for col in categories}), titles_df)
+
+
+def compute_from_dir(data_dir):
+    pack_dir = os.path.join(data_dir, 'pack')
+    stamp = source_stamp(data_dir)
+    boards = compute(*(read_table(name, data_dir, pack_dir) for name in SOURCES))
+    boards['source'] = stamp
+    return boards
+
+
+def build(congress_num, data_dir=DATA_DIR, out_dir=LEADERBOARD_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    path = leaderboard_path(congress_num, out_dir)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(compute_from_dir(data_dir), f)
+    os.replace(tmp, path)
+    return path
+
+
+def load(congress_num, source=None, out_dir=LEADERBOARD_DIR):
+    """The built leaderboards for a Congress, or None if missing, outdated, or built from other files than `source`.
+
+    source is [size, mtime_ns] for each of SOURCES, as source_stamp() gives for a data dir.
+    """
+    path = leaderboard_path(congress_num, out_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        boards = json.load(f)
+    if boards.get('version') != LEADERBOARDS_VERSION:
+        return None
+    if source is not None and boards.get('source') != source:
+        return None
+    return boards
+
+
+if __name__ == '__main__':
+    from congress_data import available_congresses, partition_dir
+
+    parser = argparse.ArgumentParser(description='Precompute the page 2 leaderboards.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--congress', type=int, action='append', help='repeatable; defaults to every Congress on disk')
+    args = parser.parse_args()
+
+    for congress_num in args.congress or available_congresses():
+        print(build(congress_num, partition_dir(congress_num)))
@@ -0,0 +1,83 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+import numpy as np
+
+from schema import NOT_APPLICABLE
+
+# chamber dropdown label -> `type` column value
+CHAMBER_TYPES = {'Senate': 'sen', 'House of Representatives': 'rep'}
+
+SubjectBreakdown = namedtuple('SubjectBreakdown', ['subjects', 'sponsored', 'pass_rate', 'positions'])
+EMPTY_BREAKDOWN = SubjectBreakdown((), (), (), MappingProxyType({}))
+
+
+class LegislatorStore(object):
+    """Read-only lookups over the legislator tables, indexed once at load.
+
+    Every page-1 callback used to mask the whole frame with
+    `df.loc[df['bioguide_id'] == leg_id]`; here each of those is a dict hit.
+    """
+
+    def __init__(self, legislators, subject_stats):
+        """legislators and subject_stats are schema.legislators_table / subject_stats_table frames."""
+        self.summary_columns = tuple(legislators.columns)
+        leg_ids = legislators['bioguide_id'].values
+        self._summaries = MappingProxyType(dict(zip(leg_ids, legislators.itertuples(index=False, name=None))))
+
+        # (bioguide_id, name) in the same order as all_congress_reps.csv, under every
+        # (type, state) rollup so the chamber/state filters never touch the frame
+        rollups = {}
+        for leg_id, name, leg_type, state in zip(leg_ids, legislators['name'],
+                                                 legislators['type'], legislators['state']):
+            for key in ((None, None), (leg_type, None), (None, state), (leg_type, state)):
+                rollups.setdefault(key, []).append((leg_id, name))
+        self._legislators = MappingProxyType({k: tuple(v) for k, v in rollups.items()})
+        self.states = tuple(sorted(legislators['state'].dropna().unique()))
+
+        # dropdown payloads for every chamber/state filter, built once and shared by every request
+        self._options = MappingProxyType({
+            k: [{'label': name, 'value': leg_id} for leg_id, name in v] for k, v in self._legislators.items()})
+        self.state_options = [{'label': i, 'value': i} for i in self.states] + [{'label': 'All', 'value': 'All'}]
+
+        breakdowns = {}
+        sponsors_by_subject = {}
+        subjects = np.asarray(subject_stats['subject'].astype(object))
+        sponsored = subject_stats['bills_sponsored'].values
+        pass_rate = subject_stats['pass_rate'].values
+        for position, rows in subject_stats.groupby('legislator', sort=False).indices.items():
+            leg_id = leg_ids[position]
+            # NOT_APPLICABLE rows stand for "sponsored nothing", which is an empty breakdown
+            rows = rows[sponsored[rows] != NOT_APPLICABLE]
+            leg_subjects = tuple(subjects[rows])
+            breakdowns[leg_id] = SubjectBreakdown(
+                leg_subjects, tuple(sponsored[rows].tolist()), tuple(pass_rate[rows].tolist()),
+                MappingProxyType({s: i for i, s in enumerate(leg_subjects)}))
+            for subj in leg_subjects:
+                sponsors_by_subject.setdefault(subj, []).append(leg_id)
+        self._breakdowns = MappingProxyType(breakdowns)
+        self._sponsors_by_subject = MappingProxyType({k: tuple(v) for k, v in sponsors_by_subject.items()})
+
+    def __contains__(self, leg_id):
+        return leg_id in self._summaries
+
+    def __len__(self):
+        return len(self._summaries)
+
+    def summary(self, leg_id):
+        # same positions as a row of overall_sponsorship_aggs.csv
+        return self._summaries[leg_id]
+
+    def legislators(self, leg_type=None, state=None):
+        return self._legislators.get((leg_type, state), ())
+
+    def options(self, leg_type=None, state=None):
+        # shared between requests, so don't mutate it
+        return self._options.get((leg_type, state), [])
+
+    def subject_breakdown(self, leg_id):
+        # empty for anyone who sponsored nothing
+        return self._breakdowns.get(leg_id, EMPTY_BREAKDOWN)
+
+    def sponsors_of(self, subject):
+        return self._sponsors_by_subject.get(subject, ())
@@ -0,0 +1,87 @@
+"""Typed, normalized in-memory tables for a Congress, built from the CSVs as loaded.
+
+The CSVs stay as they are. Loading converts them into the shape the app keeps:
+
+- legislators: one row per legislator, with all_congress_reps' details and the
+  overall_sponsorship_aggs numbers, repeated text as categoricals, and
+  days_in_office as whole days (all_congress_reps has "2191 days 00:00:00.000000000")
+- subject_stats: sponsorship_by_subj_agg without the nine legislator columns it
+  repeats on every row, just a row number into legislators. Legislators who
+  sponsored nothing have bills_sponsored == NOT_APPLICABLE and a NaN rate and
+  subject, not the string 'not applicable' in numeric columns.
+- bills: bills_and_support with categorical type and subject, small ints, and
+  without the stringified cosponsor lists once the cosponsor matrix has them.
+"""
+import numpy as np
+import pandas as pd
+
+# by_subj_bills_sponsored for a legislator who sponsored no bills at all
+NOT_APPLICABLE = -1
+LEGISLATOR_CATEGORIES = ['gender', 'type', 'state', 'district', 'party', 'start', 'end']
+SUMMARY_COLUMNS = ['bioguide_id', 'name', 'gender', 'type', 'state', 'district', 'party', 'start', 'end',
+                   'days_in_office', 'overall_bills_sponsored', 'overall_pass_rate']
+
+
+def _small_int(values):
+    values = np.asarray(values)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def whole_days(values):
+    """Day counts from ints or timedelta strings like '2191 days 00:00:00.000000000'; unknown is 0."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return _small_int(values.fillna(0).values)
+    days = pd.to_timedelta(values.replace('', np.nan), errors='coerce')
+    numeric = pd.to_numeric(values, errors='coerce')
+    return _small_int(days.dt.days.fillna(numeric).fillna(0).values)
+
+
+def legislators_table(reps_df, overall_df):
+    """One row per legislator, in all_congress_reps order; columns (and tuple positions) of overall_sponsorship_aggs."""
+    stats = overall_df.set_index('bioguide_id')[['overall_bills_sponsored', 'overall_pass_rate']]
+    legislators = reps_df[SUMMARY_COLUMNS[:9]].join(stats, on='bioguide_id')
+    out = pd.DataFrame({'bioguide_id': legislators['bioguide_id'].astype(object).values,
+                        'name': legislators['name'].astype(object).values})
+    for col in LEGISLATOR_CATEGORIES:
+        out[col] = pd.Categorical(legislators[col].astype(object).values)
+    out['days_in_office'] = whole_days(reps_df['days_in_office'].values)
+    out['overall_bills_sponsored'] = _small_int(legislators['overall_bills_sponsored'].fillna(0).values)
+    out['overall_pass_rate'] = legislators['overall_pass_rate'].astype(np.float32).values
+    return out[SUMMARY_COLUMNS]
+
+
+def subject_stats_table(by_subj_df, legislators):
+    """(legislator row, subject, bills sponsored, pass rate), with NOT_APPLICABLE for legislators who sponsored none."""
+    positions = pd.Index(legislators['bioguide_id']).get_indexer(by_subj_df['bioguide_id'])
+    sponsored = pd.to_numeric(by_subj_df['by_subj_bills_sponsored'], errors='coerce')
+    keep = positions >= 0
+    subjects = by_subj_df['subjects_top_term'].where(sponsored.notna())
+    return pd.DataFrame({
+        'legislator': _small_int(positions[keep]),
+        'subject': pd.Categorical(subjects[keep].values),
+        'bills_sponsored': _small_int(sponsored[keep].fillna(NOT_APPLICABLE).values),
+        'pass_rate': pd.to_numeric(by_subj_df['by_subj_pass_rate'], errors='coerce')[keep].astype(np.float32).values,
+    })
+
+
+def bills_table(bills_df, keep_cosponsors=False):
+    out = pd.DataFrame({
+        'bill_id': bills_df['bill_id'].astype(object).values,
+        'bill_type': pd.Categorical(bills_df['bill_type'].astype(object).values),
+        'subjects_top_term': pd.Categorical(bills_df['subjects_top_term'].astype(object).values),
+        'num_cosponsors': _small_int(bills_df['num_cosponsors'].values),
+        'num_support': _small_int(bills_df['num_support'].values),
+        'enacted_as': _small_int(bills_df['enacted_as'].values),
+    })
+    if keep_cosponsors:
+        out['cosponsors'] = bills_df['cosponsors'].values
+    return out
+
+
+def nbytes(*frames):
+    return sum(int(df.memory_usage(deep=True).sum()) for df in frames)
@@ -0,0 +1,226 @@
+"""Similar-legislator lookups over cosponsorship records.
+
+Each legislator is the (L2-normalised) row of bills they cosponsored. Truncated
+SVD squeezes those ~13.5k-wide rows down to 256 dimensions, and the
+resulting float16 embeddings are the whole index: a query is one small
+matrix-vector product plus a partial sort.
+
+`python similarity.py build` writes the index to similarity/ next to the
+Congress's CSVs, and `python similarity.py neighbours` precomputes the exact
+top-15 table the "Similar Legislators" tab actually reads, since the data is
+static per Congress. Both record the size and mtime of the CSVs they were built
+from, so a partition can tell whether they match the files it loaded.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'data')
+N_COMPONENTS = 256
+NEIGHBOURS_K = 15
+NEIGHBOURS_VERSION = 1
+SOURCES = ('all_congress_reps', 'bills_and_support')
+
+
+def index_path(congress_num, data_dir=DATA_DIR):
+    return os.path.join(data_dir, 'similarity', f'index_{congress_num}.npz')
+
+
+def neighbours_path(congress_num, data_dir=DATA_DIR):
+    return os.path.join(data_dir, 'similarity', f'neighbours_{congress_num}.npz')
+
+
+def source_stamp(data_dir):
+    stats = [os.stat(os.path.join(data_dir, name + '.csv')) for name in SOURCES]
+    return [[s.st_size, s.st_mtime_ns] for s in stats]
+
+
+def built_from(path):
+    """The source stamp an index or neighbour table was built from, or None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        return f['source'].tolist() if 'source' in f.files else None
+
+
+def legislator_vectors(cosponsor_matrix, legislator_ids=None):
+    # legislator x bill rows, restricted to (and ordered like) legislator_ids
+    from sklearn.preprocessing import normalize
+
+    if legislator_ids is None:
+        legislator_ids = cosponsor_matrix.legislator_ids
+    cols = [cosponsor_matrix.legislator_index[l] for l in legislator_ids if l in cosponsor_matrix.legislator_index]
+    ids = cosponsor_matrix.legislator_ids[cols]
+    vectors = cosponsor_matrix.csc[:, cols].T.tocsr().astype(np.float32)
+    return ids, normalize(vectors)
+
+
+class SimilarityIndex(object):
+
+    def __init__(self, legislator_ids, embeddings):
+        self.legislator_ids = np.asarray(legislator_ids, dtype=object)
+        self.legislator_index = {l: i for i, l in enumerate(self.legislator_ids)}
+        # stored as float16, searched in float32
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    @classmethod
+    def build(cls, cosponsor_matrix, legislator_ids=None, n_components=N_COMPONENTS, random_state=115):
+        # sklearn is only needed to build an index, not to serve one
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.preprocessing import normalize
+
+        ids, vectors = legislator_vectors(cosponsor_matrix, legislator_ids)
+        n_components = min(n_components, min(vectors.shape) - 1)
+        svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+        embeddings = normalize(svd.fit_transform(vectors))
+        return cls(ids, embeddings.astype(np.float16))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f['legislator_ids'].astype(object), f['embeddings'])
+
+    def save(self, path, source=()):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, legislator_ids=self.legislator_ids.astype(str),
+                            embeddings=self.embeddings.astype(np.float16), source=np.array(source, dtype=np.int64))
+
+    def __contains__(self, leg_id):
+        return leg_id in self.legislator_index
+
+    def query(self, leg_id, k=5):
+        """The k most similar legislators to leg_id as [(bioguide_id, cosine similarity), ...]."""
+        row = self.legislator_index[leg_id]
+        scores = self.embeddings @ self.embeddings[row]
+        scores[row] = -np.inf
+        k = min(k, len(scores) - 1)
+        top = np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind='mergesort')]
+        return [(self.legislator_ids[i], float(scores[i])) for i in top]
+
+
+class NeighbourTable(object):
+    """Precomputed neighbours: bioguide_id -> ((bioguide_id, similarity), ...), most similar first."""
+
+    def __init__(self, legislator_ids, neighbours, scores, congress_num=None):
+        legislator_ids = np.asarray(legislator_ids, dtype=object)
+        self.congress_num = congress_num
+        self.k = neighbours.shape[1]
+        self._rows = {
+            leg_id: tuple((legislator_ids[j], float(score)) for j, score in zip(row, row_scores) if j >= 0)
+            for leg_id, row, row_scores in zip(legislator_ids, neighbours, scores)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            if int(f['version']) != NEIGHBOURS_VERSION:
+                raise ValueError(f'{path} is neighbour table version {int(f["version"])}, expected {NEIGHBOURS_VERSION}')
+            return cls(f['legislator_ids'].astype(object), f['neighbours'], f['scores'], int(f['congress_num']))
+
+    def __contains__(self, leg_id):
+        return leg_id in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, leg_id, k=5):
+        return self._rows[leg_id][:k]
+
+
+# worker state for the parallel neighbour build, set once per process
+_vectors = None
+
+
+def _init_worker(vectors):
+    global _vectors
+    _vectors = vectors
+
+
+def _top_k_chunk(args):
+    start, stop, k = args
+    sims = (_vectors[start:stop] @ _vectors.T).toarray()
+    sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    top = np.argpartition(-sims, k, axis=1)[:, :k]
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='mergesort')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    # a legislator with no cosponsorships has nobody similar
+    empty = _vectors[start:stop].getnnz(axis=1) == 0
+    top[empty] = -1
+    top_scores[empty] = 0
+    return start, top, top_scores
+
+
+def compute_neighbours(vectors, k=NEIGHBOURS_K, workers=None, chunk_size=64):
+    """Exact cosine top-k for every row of the L2-normalised sparse `vectors`, in parallel."""
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    neighbours = np.empty((n, k), dtype=np.int16 if n < 2 ** 15 else np.int32)
+    scores = np.empty((n, k), dtype=np.float16)
+    chunks = [(start, min(start + chunk_size, n), k) for start in range(0, n, chunk_size)]
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(vectors,)) as pool:
+        for start, top, top_scores in pool.imap_unordered(_top_k_chunk, chunks):
+            neighbours[start:start + len(top)] = top
+            scores[start:start + len(top)] = top_scores
+    return neighbours, scores
+
+
+def _load_matrix(data_dir):
+    from cosponsors import CosponsorMatrix
+    from data_pack import read_table
+
+    reps = read_table('all_congress_reps', data_dir=data_dir, pack_dir=os.path.join(data_dir, 'pack'))
+    bills = read_table('bills_and_support', data_dir=data_dir, pack_dir=os.path.join(data_dir, 'pack'))
+    return reps['bioguide_id'], CosponsorMatrix.from_frame(bills, legislator_ids=reps['bioguide_id'])
+
+
+def build_neighbour_table(congress_num=115, data_dir=DATA_DIR, k=NEIGHBOURS_K, workers=None):
+    # stamped before reading, so a file replaced mid-build shows up as a mismatch
+    source = source_stamp(data_dir)
+    legislator_ids, matrix = _load_matrix(data_dir)
+    ids, vectors = legislator_vectors(matrix, legislator_ids)
+    neighbours, scores = compute_neighbours(vectors, k, workers)
+    path = neighbours_path(congress_num, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write next to the old table and swap, so a running app never reads half a file
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, version=NEIGHBOURS_VERSION, congress_num=congress_num,
+                        legislator_ids=ids.astype(str), neighbours=neighbours, scores=scores,
+                        source=np.array(source, dtype=np.int64))
+    os.replace(tmp, path)
+    return NeighbourTable(ids, neighbours, scores, congress_num)
+
+
+def build_index(congress_num=115, n_components=N_COMPONENTS, data_dir=DATA_DIR):
+    source = source_stamp(data_dir)
+    legislator_ids, matrix = _load_matrix(data_dir)
+    index = SimilarityIndex.build(matrix, legislator_ids, n_components=n_components)
+    index.save(index_path(congress_num, data_dir), source)
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the similar-legislators index or neighbour table.')
+    parser.add_argument('command', choices=['build', 'neighbours'])
+    parser.add_argument('--congress', type=int, default=115)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--components', type=int, default=N_COMPONENTS)
+    parser.add_argument('--k', type=int, default=NEIGHBOURS_K)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per CPU core')
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == 'build':
+        index = build_index(args.congress, args.components, args.data_dir)
+        path = index_path(args.congress, args.data_dir)
+        print(f'{len(index.legislator_ids)} legislators x {index.embeddings.shape[1]} dims -> '
+              f'{path} ({os.path.getsize(path) / 1024:.0f} KB)')
+    else:
+        table = build_neighbour_table(args.congress, args.data_dir, args.k, args.workers)
+        path = neighbours_path(args.congress, args.data_dir)
+        print(f'{len(table)} legislators x top {table.k} -> {path} ({os.path.getsize(path) / 1024:.0f} KB)')
+    print(f'built in {time.time() - start:.2f}s')
@@ -0,0 +1,141 @@
+"""Compact bill-title model: hashed TF-IDF features and a logistic regression.
+
+The whole model is a few NumPy arrays (per-bucket idf and weight), so loading
+it is instant and scoring a title is a tokenize, a hash per token and a dot
+product. No training titles are kept around, unlike the old KNN model.
+
+`python title_model.py train` fits it on bill_title_text_for_model.csv and
+writes assets/title_model.npz.
+"""
+import argparse
+import math
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+MODEL_VERSION = 1
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'title_model.npz')
+N_FEATURES = 2 ** 18
+
+# same as sklearn's default token_pattern
+_TOKEN = re.compile(r'(?u)\b\w\w+\b')
+
+
+def normalize_title(title):
+    """The token sequence the model actually sees; titles that normalise the same score the same."""
+    return ' '.join(_TOKEN.findall(str(title).lower()))
+
+
+def hash_title(title, n_features=N_FEATURES):
+    """Unique feature buckets for a title's unigrams and bigrams."""
+    tokens = _TOKEN.findall(str(title).lower())
+    grams = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+    mask = n_features - 1
+    return np.unique(np.fromiter((zlib.crc32(g.encode('utf-8')) & mask for g in grams),
+                                 dtype=np.int64, count=len(grams)))
+
+
+def hash_titles(titles, n_features=N_FEATURES):
+    """Binary bag of hashed n-grams for many titles, as a CSR matrix."""
+    rows = [hash_title(t, n_features) for t in titles]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=indptr[1:])
+    indices = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    return sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                             shape=(len(rows), n_features))
+
+
+def _tfidf(counts, idf):
+    # binary tf * idf, rows L2 normalised
+    X = counts @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ X
+
+
+class TitleModel(object):
+
+    def __init__(self, idf, coef, intercept, threshold=0.5):
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.coef = np.asarray(coef, dtype=np.float32)
+        self.intercept = float(intercept)
+        self.threshold = threshold
+        self.n_features = len(self.idf)
+
+    @classmethod
+    def train(cls, titles, labels, n_features=N_FEATURES, C=1.0):
+        from sklearn.linear_model import LogisticRegression
+
+        counts = hash_titles(titles, n_features)
+        df = np.bincount(counts.indices, minlength=n_features)
+        idf = (np.log((1 + counts.shape[0]) / (1 + df)) + 1).astype(np.float32)
+        # passed bills are a few percent of the data, so weight them up
+        clf = LogisticRegression(C=C, solver='liblinear', class_weight='balanced')
+        clf.fit(_tfidf(counts, idf), np.asarray(labels))
+        return cls(idf, clf.coef_.ravel(), clf.intercept_[0])
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path, allow_pickle=False) as f:
+            if int(f['version']) != MODEL_VERSION:
+                raise ValueError(f'{path} is title model version {int(f["version"])}, expected {MODEL_VERSION}')
+            n_features = int(f['n_features'])
+            # only buckets seen in training are stored; the rest share the max idf and weigh nothing
+            idf = np.full(n_features, float(f['default_idf']), dtype=np.float32)
+            coef = np.zeros(n_features, dtype=np.float32)
+            idf[f['buckets']] = f['idf']
+            coef[f['buckets']] = f['coef']
+            return cls(idf, coef, f['intercept'])
+
+    def save(self, path=MODEL_PATH):
+        default_idf = self.idf.max()
+        buckets = np.flatnonzero((self.coef != 0) | (self.idf != default_idf)).astype(np.uint32)
+        np.savez_compressed(path, version=MODEL_VERSION, n_features=self.n_features,
+                            default_idf=default_idf, intercept=self.intercept, buckets=buckets,
+                            idf=self.idf[buckets], coef=self.coef[buckets].astype(np.float32))
+
+    def decision_function(self, title):
+        buckets = hash_title(title, self.n_features)
+        weights = self.idf[buckets]
+        norm = np.sqrt(np.dot(weights, weights))
+        if norm == 0:
+            return self.intercept
+        return float(np.dot(weights, self.coef[buckets]) / norm) + self.intercept
+
+    def predict_proba(self, title):
+        return 1 / (1 + math.exp(-self.decision_function(title)))
+
+    def predict(self, title):
+        return int(self.predict_proba(title) >= self.threshold)
+
+    def decision_function_many(self, titles):
+        return _tfidf(hash_titles(titles, self.n_features), self.idf) @ self.coef + self.intercept
+
+    def predict_proba_many(self, titles):
+        return 1 / (1 + np.exp(-self.decision_function_many(titles)))
+
+    def predict_many(self, titles):
+        return (self.predict_proba_many(titles) >= self.threshold).astype(np.int8)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the bill-title model.')
+    parser.add_argument('command', choices=['train'])
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(MODEL_PATH), 'data', 'bill_title_text_for_model.csv'))
+    parser.add_argument('--out', default=MODEL_PATH)
+    parser.add_argument('--features', type=int, default=N_FEATURES, help='number of hash buckets, a power of 2')
+    parser.add_argument('-C', type=float, default=1.0)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    bill_text = pd.read_csv(args.data)
+    start = time.time()
+    model = TitleModel.train(bill_text['titles_text'], bill_text['enacted_as'], args.features, args.C)
+    model.save(args.out)
+    print(f'trained on {len(bill_text)} titles in {time.time() - start:.2f}s -> '
+          f'{args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)')
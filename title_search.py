@@ -0,0 +1,123 @@
+"""Full-text search over bill titles: an inverted index ranked with BM25.
+
+The index is a sorted vocabulary plus CSR-style postings (doc ids and term
+frequencies in flat arrays), so it holds ~100k titles in a few MB. The last word of a
+query is treated as a prefix, which is what a search-as-you-type box sends:
+it expands to the vocabulary range starting with it, found by binary search.
+Subject, bill type and enacted filters are boolean masks over the documents.
+"""
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+_WORD = re.compile(r'(?u)\w+')
+BM25_K1 = 1.2
+BM25_B = 0.75
+# shorter prefixes match too much to be useful, so they only match whole words
+MIN_PREFIX = 2
+# and a prefix only expands to its most common completions
+MAX_PREFIX_TERMS = 16
+
+
+def tokenize(text):
+    return _WORD.findall(str(text).lower())
+
+
+class TitleSearchIndex(object):
+
+    def __init__(self, bill_ids, titles, bill_types, subjects, enacted):
+        self.bill_ids = np.asarray(bill_ids, dtype=object)
+        self.titles = np.asarray(titles, dtype=object)
+        self.bill_type_codes, self.bill_types = pd.factorize(pd.Series(bill_types), sort=True)
+        self.subject_codes, self.subjects = pd.factorize(pd.Series(subjects), sort=True)
+        self.enacted = np.asarray(enacted, dtype=bool)
+
+        docs = [tokenize(t) for t in self.titles]
+        self.doc_len = np.array([len(d) for d in docs], dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if len(docs) else 0.0
+        words = np.array([w for d in docs for w in d], dtype=object)
+        doc_of_word = np.repeat(np.arange(len(docs), dtype=np.int64), self.doc_len.astype(np.int64))
+
+        term_codes, vocabulary = pd.factorize(words, sort=True)
+        self.vocabulary = list(vocabulary)
+        # one posting per (term, doc), sorted by term then doc
+        pairs, tf = np.unique(term_codes.astype(np.int64) * max(len(docs), 1) + doc_of_word, return_counts=True)
+        terms = pairs // max(len(docs), 1)
+        self.postings_doc = (pairs % max(len(docs), 1)).astype(np.int32)
+        self.postings_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=self.postings_ptr[1:])
+
+        self.doc_freq = np.diff(self.postings_ptr)
+        idf = np.log(1 + (len(docs) - self.doc_freq + 0.5) / (self.doc_freq + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avg_len or 1))
+        # nothing in a posting's BM25 score depends on the query, so a query is just adds
+        self.postings_weight = (idf[terms] * tf * (BM25_K1 + 1) /
+                                (tf + norm[self.postings_doc])).astype(np.float32)
+
+    @classmethod
+    def from_frames(cls, titles_df, bills_df):
+        """titles from bill_title_text_for_model, filters from bills_and_passage_subject_and_type (or bills_and_support)."""
+        meta = titles_df[['bill_id', 'titles_text']].merge(
+            bills_df[['bill_id', 'bill_type', 'subjects_top_term']], on='bill_id', how='left')
+        return cls(meta['bill_id'].values, meta['titles_text'].fillna('').values, meta['bill_type'].values,
+                   meta['subjects_top_term'].values, titles_df['enacted_as'].fillna(0).values)
+
+    def __len__(self):
+        return len(self.bill_ids)
+
+    @property
+    def nbytes(self):
+        arrays = (self.postings_doc, self.postings_weight, self.postings_ptr, self.doc_freq, self.doc_len,
+                  self.bill_type_codes, self.subject_codes, self.enacted)
+        return sum(a.nbytes for a in arrays)
+
+    def _term_ids(self, word, prefix=False):
+        lo = bisect_left(self.vocabulary, word)
+        if not prefix or len(word) < MIN_PREFIX:
+            return [lo] if lo < len(self.vocabulary) and self.vocabulary[lo] == word else []
+        hi = bisect_left(self.vocabulary, word + '\U0010ffff', lo)
+        ids = np.arange(lo, hi)
+        if len(ids) > MAX_PREFIX_TERMS:
+            ids = ids[np.argsort(-self.doc_freq[ids], kind='stable')[:MAX_PREFIX_TERMS]]
+        return ids
+
+    def _mask(self, subject=None, bill_type=None, enacted=None):
+        mask = None
+        for codes, values, wanted in ((self.subject_codes, self.subjects, subject),
+                                      (self.bill_type_codes, self.bill_types, bill_type)):
+            if wanted is not None:
+                code = values.get_loc(wanted) if wanted in values else -2
+                mask = (codes == code) if mask is None else mask & (codes == code)
+        if enacted is not None:
+            mask = (self.enacted == bool(enacted)) if mask is None else mask & (self.enacted == bool(enacted))
+        return mask
+
+    def search(self, query, k=10, subject=None, bill_type=None, enacted=None, prefix=True):
+        """Top k (bill_id, title, score), best first. The last query word is a prefix unless prefix=False."""
+        words = tokenize(query)
+        if not words:
+            return []
+        scores = np.zeros(len(self.bill_ids), dtype=np.float32)
+        for word in words[:-1] if prefix else words:
+            for term in self._term_ids(word):
+                start, end = self.postings_ptr[term], self.postings_ptr[term + 1]
+                # postings are unique per doc, so fancy-index add is safe
+                scores[self.postings_doc[start:end]] += self.postings_weight[start:end]
+        if prefix:
+            # a title with "insurance" and "insurer" only matches "insur" once, at its best
+            best = np.zeros_like(scores)
+            for term in self._term_ids(words[-1], prefix=True):
+                start, end = self.postings_ptr[term], self.postings_ptr[term + 1]
+                docs = self.postings_doc[start:end]
+                best[docs] = np.maximum(best[docs], self.postings_weight[start:end])
+            scores += best
+        mask = self._mask(subject, bill_type, enacted)
+        if mask is not None:
+            scores[~mask] = 0
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        return [(self.bill_ids[i], self.titles[i], float(scores[i])) for i in hits]